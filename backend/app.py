@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory, request
+from flask import Flask, request, abort
 from flask_cors import CORS
 from config import Config
 from models import db
@@ -7,29 +7,49 @@ from routes.noticias_routes import noticias_bp
 from routes.upload_routes import upload_bp
 from routes.comentarios_routes import comentarios_bp
 from routes.eventos_routes import eventos_bp
+import auth
+import tareas
+import cache
+import archivos
+import migraciones
+import conexiones
+import replicas
+import metricas
+import compresion
+import hmac
 import os
 
-def create_app():
-    """Factory function para crear la aplicación Flask"""
+def create_app(esquema_al_iniciar=None):
+    """Factory function para crear la aplicación Flask
+
+    esquema_al_iniciar sobrescribe ESQUEMA_AL_INICIAR (migrar.py usa 'no').
+    """
     app = Flask(__name__, static_folder='public', static_url_path='')
     app.config.from_object(Config)
+    auth.validar_config(app.config)   # AUTH_MODO=claims exige caché compartida
     
     # Configuración para uploads
-    app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max file size
+    app.config['MAX_CONTENT_LENGTH'] = app.config['UPLOAD_MAX_BYTES'] + 64 * 1024  # imagen + encabezados multipart
+    
+    # Pool de conexiones según DB_POOL_* (SQLite usa el de SQLAlchemy)
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', conexiones.opciones_motor(app.config))
+    replicas.configurar(app)
     
     # Inicializar extensiones
     db.init_app(app)
+    metricas.configurar(app)   # su after_request corre último y mide la respuesta final
+    compresion.configurar(app)   # gzip/br según Accept-Encoding (antes de que metricas mida)
     
     # Configurar CORS para todos los /api/* routes
     CORS(app,
          resources={r"/api/*": {
              "origins": ["https://webcomunitariajjr.netlify.app", "http://localhost:4200", "https://cavernous-assumption-fur.osk.dom.my.id"],
              "methods": ["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-             "allow_headers": ["Content-Type", "Authorization"],
+             "allow_headers": ["Content-Type", "Authorization", "Upload-Offset"],
              "supports_credentials": True,
              "max_age": 3600
          }},
-         expose_headers=["Content-Type"])
+         expose_headers=["Content-Type", "Upload-Offset", "Upload-Length", "Server-Timing"])
     
     # Handler adicional para garantizar headers CORS
     @app.after_request
@@ -45,7 +65,7 @@ def create_app():
             response.headers['Access-Control-Allow-Origin'] = origin
             response.headers['Access-Control-Allow-Credentials'] = 'true'
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, PATCH, DELETE, OPTIONS'
-            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, Upload-Offset'
 
         return response
 
@@ -57,25 +77,63 @@ def create_app():
     app.register_blueprint(comentarios_bp, url_prefix='/api')
     app.register_blueprint(eventos_bp, url_prefix='/api/eventos')
     
-    # Ruta para servir archivos subidos
+    # Ruta para servir archivos subidos (caché immutable, Range y offload opcional)
     @app.route('/uploads/<filename>')
     def uploaded_file(filename):
-        return send_from_directory('uploads', filename)
+        return archivos.servir(filename)
     
     # Health check
     @app.route('/api/health')
     def health():
         return {'status': 'healthy'}, 200
+
+    # Estado de la cola de tareas (profundidad y latencia) para monitoreo
+    @app.route('/api/tareas/estado')
+    def tareas_estado():
+        return tareas.estadisticas(), 200
+
+    # Conexiones en uso, esperas y timeouts del pool (y salud de las réplicas)
+    @app.route('/api/db/estado')
+    def db_estado():
+        estado = conexiones.estadisticas(db.engine)
+        if replicas.obtener_replicas():
+            estado['replicas'] = replicas.obtener_replicas().estado()
+        return estado, 200
+
+    # Métricas en formato Prometheus (HTTP, tareas, pool, caché y réplicas)
+    @app.route('/api/metrics')
+    def metrics():
+        token = app.config['METRICAS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            abort(401)
+        return metricas.exportar(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+    # Aciertos, fallos y desalojos de la caché de resultados por espacio
+    @app.route('/api/cache/estado')
+    def cache_estado():
+        return cache.obtener_cache().estadisticas(), 200
+
+    # Trabajadores de tareas dentro del proceso web (se arrancan con la primera petición
+    # para que los scripts que llaman a create_app() no levanten hilos)
+    if app.config['TAREAS_MODO'] == 'hilos':
+        @app.before_request
+        def arrancar_trabajadores():
+            if 'tareas_pool' not in app.extensions:
+                tareas.iniciar_trabajadores(app)
     
     # Ruta raíz informativa
     @app.route('/')
     def index():
         return {'message': 'Backend WebComunitaria funcionando segun'}, 200
     
-    # Crear tablas y carpeta de uploads si no existen
+    # Comprobar que el esquema está migrado (el DDL lo ejecuta migrar.py) y crear carpetas
     with app.app_context():
-        db.create_all()
-        os.makedirs('uploads', exist_ok=True)
+        modo = esquema_al_iniciar or app.config['ESQUEMA_AL_INICIAR']
+        if modo == 'migrar':
+            migraciones.migrar(db.engine)
+        elif modo == 'verificar':
+            migraciones.verificar(db.engine)
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
         os.makedirs('public', exist_ok=True)
     
     return app
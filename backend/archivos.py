@@ -0,0 +1,146 @@
+import mimetypes
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from flask import current_app, request, abort
+from werkzeug.security import safe_join
+from werkzeug.utils import send_file
+from sqlalchemy import select, union
+from models import db, Usuario, Noticia, Evento, Imagen
+
+# Almacenamiento de uploads direccionado por contenido: el nombre es el
+# SHA-256 de los bytes subidos, así dos subidas iguales comparten archivo y
+# una URL nunca cambia de contenido (se puede cachear como immutable).
+#
+# El archivo recién subido espera en pendientes/ (sin servirse) hasta que
+# procesar_imagen escribe la versión limpia (sin metadatos) con el nombre
+# definitivo; las variantes usan el mismo hash con sufijo: <hash>_400.jpg,
+# <hash>.webp...
+
+CARPETA_PENDIENTES = 'pendientes'
+NOMBRE_CONTENIDO = re.compile(r'^[0-9a-f]{64}(_\d+)?\.(jpg|png|gif|webp)$')
+BLOQUE = 64 * 1024
+
+
+def carpeta():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def ruta(nombre):
+    return os.path.join(carpeta(), nombre)
+
+
+def ruta_pendiente(nombre):
+    return os.path.join(carpeta(), CARPETA_PENDIENTES, nombre)
+
+
+def url(nombre):
+    return f'/uploads/{nombre}'
+
+
+def es_inmutable(nombre):
+    return bool(NOMBRE_CONTENIDO.match(nombre))
+
+
+# ─── SERVIR ──────────────────────────────────────────────────────────────────
+
+UN_ANIO = 365 * 24 * 3600
+
+
+def servir(nombre):
+    """Respuesta para /uploads/<nombre>
+
+    Nombres por contenido: Cache-Control immutable y ETag fuerte (el nombre).
+    Con UPLOADS_OFFLOAD='x-accel' o 'x-sendfile' los bytes los envía el
+    servidor web (nginx/apache) y el trabajador de gunicorn queda libre.
+    """
+    config = current_app.config
+    final = safe_join(os.path.abspath(carpeta()), nombre)
+    if final is None:
+        abort(404)
+
+    if not os.path.isfile(final):
+        # Recién subida y todavía sin procesar: el original aún tiene EXIF/GPS,
+        # no se sirve (404 sin cachear; el cliente vuelve a pedirla)
+        pendiente = safe_join(os.path.abspath(os.path.join(carpeta(), CARPETA_PENDIENTES)), nombre)
+        if not pendiente or not os.path.isfile(pendiente):
+            abort(404)
+        return current_app.response_class(status=404, headers={'Cache-Control': 'no-store', 'Retry-After': '2'})
+
+    if es_inmutable(nombre):
+        etag, cache_control = nombre, f'public, max-age={UN_ANIO}, immutable'
+    else:
+        etag, cache_control = True, f"public, max-age={config['UPLOADS_MAX_AGE']}"
+
+    if config['UPLOADS_OFFLOAD'] == 'x-accel':
+        respuesta = current_app.response_class(mimetype=mimetypes.guess_type(nombre)[0])
+        respuesta.headers['X-Accel-Redirect'] = config['UPLOADS_ACCEL_PREFIJO'].rstrip('/') + '/' + nombre
+        if isinstance(etag, str):
+            respuesta.set_etag(etag)
+            respuesta.make_conditional(request)
+    else:
+        respuesta = send_file(final, request.environ, etag=etag, conditional=True,
+                              use_x_sendfile=config['UPLOADS_OFFLOAD'] == 'x-sendfile',
+                              response_class=current_app.response_class)
+
+    respuesta.headers['Cache-Control'] = cache_control
+    return respuesta
+
+
+# ─── LIMPIEZA ────────────────────────────────────────────────────────────────
+
+def urls_referenciadas():
+    """URLs de /uploads usadas por noticias, eventos o avatares"""
+    consulta = union(
+        select(Noticia.imagen.label('url')),
+        select(Evento.imagen.label('url')),
+        select(Usuario.avatar.label('url')),
+    )
+    return {u for (u,) in db.session.execute(consulta) if u and u.startswith('/uploads/')}
+
+
+def _raiz(nombre):
+    """'<hash>_400.webp' -> '<hash>' (agrupa un original con sus variantes)"""
+    base = nombre.split('.', 1)[0]
+    return base.split('_', 1)[0] if es_inmutable(nombre) else base
+
+
+def limpiar(horas_gracia=24, borrar=False):
+    """Archivos y filas de `imagenes` que ya nadie referencia
+
+    Solo se consideran los más viejos que horas_gracia: una imagen se sube
+    antes de publicar la noticia que la usa.
+    Devuelve (lista de archivos, bytes, filas de imagenes).
+    """
+    en_uso = {_raiz(u.rsplit('/', 1)[-1]) for u in urls_referenciadas()}
+    limite = time.time() - horas_gracia * 3600
+
+    huerfanos = []
+    for directorio in (carpeta(), os.path.join(carpeta(), CARPETA_PENDIENTES)):
+        if not os.path.isdir(directorio):
+            continue
+        for nombre in os.listdir(directorio):
+            completa = os.path.join(directorio, nombre)
+            if not os.path.isfile(completa) or os.path.getmtime(completa) > limite:
+                continue
+            if _raiz(nombre) not in en_uso:
+                huerfanos.append(completa)
+
+    total = sum(os.path.getsize(a) for a in huerfanos)
+
+    fecha_limite = datetime.utcnow() - timedelta(hours=horas_gracia)
+    filas = [i for i in Imagen.query.filter(Imagen.creada_en < fecha_limite)
+             if _raiz(i.url.rsplit('/', 1)[-1]) not in en_uso]
+
+    if borrar:
+        for archivo in huerfanos:
+            try:
+                os.remove(archivo)
+            except FileNotFoundError:
+                pass
+        for fila in filas:
+            db.session.delete(fila)
+        db.session.commit()
+
+    return huerfanos, total, len(filas)
@@ -1,60 +1,163 @@
+import json
 import jwt
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, current_app
+from sqlalchemy.orm import make_transient_to_detached
 from config import Config
 from models import db, Usuario
 
-def generate_token(usuario_id):
-    """Generar token JWT"""
+def generate_token(usuario):
+    """Generar token JWT (id, rol y versión de token como claims)"""
     payload = {
-        'usuario_id': usuario_id,
+        'usuario_id': usuario.id,
+        'rol': usuario.rol,
+        'tv': usuario.token_version or 0,
         'exp': datetime.utcnow() + timedelta(hours=Config.JWT_EXPIRATION_HOURS),
         'iat': datetime.utcnow()
     }
     return jwt.encode(payload, Config.SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
 
-def verify_token(token):
-    """Verificar token JWT"""
+def generate_stream_token(usuario, segundos):
+    """Token solo para el stream ('uso': 'sse') y de vida corta para abrir el stream de notificaciones
+
+    Viaja en la URL (EventSource no manda headers) y termina en los logs de
+    accesos: no sirve para el resto de la API y expira en segundos.
+    """
+    payload = {
+        'usuario_id': usuario.id,
+        'tv': usuario.token_version or 0,
+        'uso': 'sse',
+        'exp': datetime.utcnow() + timedelta(seconds=segundos),
+        'iat': datetime.utcnow()
+    }
+    return jwt.encode(payload, Config.SECRET_KEY, algorithm=Config.JWT_ALGORITHM)
+
+def decode_token(token):
+    """Claims del token JWT o None si es inválido o expiró"""
     try:
-        payload = jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
-        return payload['usuario_id']
+        return jwt.decode(token, Config.SECRET_KEY, algorithms=[Config.JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
+def verify_token(token):
+    """Verificar token JWT"""
+    payload = decode_token(token)
+    return payload['usuario_id'] if payload else None
+
+def _token_de_request():
+    """Extraer el token del header Authorization: (token, error)"""
+    if 'Authorization' not in request.headers:
+        return None, None
+
+    auth_header = request.headers['Authorization']
+    try:
+        return auth_header.split(' ')[1], None  # Bearer <token>
+    except IndexError:
+        return None, 'Token inválido'
+
+# ─── CACHÉ DE USUARIOS (AUTH_MODO=claims) ────────────────────────────────────
+# Se guardan las columnas del usuario (sin password_hash) y se reconstruye
+# la instancia sin consultar; cualquier cambio en la fila invalida la
+# etiqueta 'usuario:<id>' al confirmar (ver cache.py).
+
+_COLUMNAS_CACHE = ('id', 'nombre', 'email', 'rol', 'avatar', 'fecha_registro', 'token_version')
+# Con 'local' cada worker tiene su copia: un cambio de rol o una revocación
+# solo invalidaría la del worker que la confirmó ('memoria' es el sustituto
+# de redis en las pruebas; 'ninguno' siempre consulta)
+BACKENDS_CLAIMS = ('redis', 'memoria', 'ninguno')
+
+def validar_config(config):
+    """AUTH_MODO=claims solo con una caché compartida entre procesos"""
+    if config['AUTH_MODO'] == 'claims' and config['CACHE_BACKEND'] not in BACKENDS_CLAIMS:
+        raise ValueError(f"AUTH_MODO=claims requiere CACHE_BACKEND en {BACKENDS_CLAIMS} "
+                         f"(actual: {config['CACHE_BACKEND']})")
+
+def _usuario_cacheado(usuario_id):
+    from cache import obtener_cache
+
+    def calcular():
+        usuario = db.session.get(Usuario, usuario_id)
+        if usuario is None:
+            return None
+        datos = {c: getattr(usuario, c) for c in _COLUMNAS_CACHE}
+        datos['fecha_registro'] = datos['fecha_registro'].isoformat() if datos['fecha_registro'] else None
+        return json.dumps(datos)
+
+    texto = obtener_cache().obtener_o_calcular('usuario', usuario_id, [f'usuario:{usuario_id}'], calcular,
+                                               ttl=current_app.config['AUTH_CACHE_TTL'])
+    if texto is None:
+        return None
+
+    datos = json.loads(texto)
+    if datos['fecha_registro']:
+        datos['fecha_registro'] = datetime.fromisoformat(datos['fecha_registro'])
+    usuario = Usuario(**datos)
+    make_transient_to_detached(usuario)
+    # load=False: se incorpora a la sesión como persistente sin SELECT
+    # (password_hash y las relaciones se cargan solo si se usan)
+    return db.session.merge(usuario, load=False)
+
+def usuario_de_token(token, uso=None):
+    """(usuario, error) a partir de un token ya extraído
+
+    uso: None para el token de sesión, 'sse' para el del stream (no se aceptan cruzados).
+    """
+    payload = decode_token(token)
+    if not payload or payload.get('uso') != uso:
+        return None, 'Token inválido o expirado'
+
+    usuario_id = payload['usuario_id']
+    if current_app.config['AUTH_MODO'] == 'claims':
+        usuario = _usuario_cacheado(usuario_id)
+    else:
+        usuario = db.session.get(Usuario, usuario_id)
+    if not usuario:
+        return None, 'Usuario no encontrado'
+
+    # Tokens anteriores a las versiones no traen 'tv': valen mientras no se revoque
+    if payload.get('tv', 0) != (usuario.token_version or 0):
+        return None, 'Token revocado'
+    return usuario, None
+
 def token_required(f):
     """Decorador para rutas que requieren autenticación"""
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
-        # Obtener token del header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]  # Bearer <token>
-            except IndexError:
-                return jsonify({'detail': 'Token inválido'}), 401
+        token, error = _token_de_request()
+        if error:
+            return jsonify({'detail': error}), 401
         
         if not token:
             return jsonify({'detail': 'Token requerido'}), 401
         
-        # Verificar token
-        usuario_id = verify_token(token)
-        if not usuario_id:
-            return jsonify({'detail': 'Token inválido o expirado'}), 401
-        
-        # Obtener usuario
-        usuario = Usuario.query.get(usuario_id)
-        if not usuario:
-            return jsonify({'detail': 'Usuario no encontrado'}), 401
+        # Verificar token y obtener usuario
+        usuario, error = usuario_de_token(token)
+        if error:
+            return jsonify({'detail': error}), 401
         
         return f(usuario, *args, **kwargs)
     
     return decorated
 
+def usuario_opcional():
+    """Usuario autenticado de la petición actual o None (token inválido = anónimo)"""
+    token, _ = _token_de_request()
+    if not token:
+        return None
+    usuario, _ = usuario_de_token(token)
+    return usuario
+
+def token_optional(f):
+    """Decorador para rutas públicas que personalizan la respuesta si hay sesión"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        return f(usuario_opcional(), *args, **kwargs)
+
+    return decorated
+
 def admin_required(f):
     """Decorador para rutas que requieren rol de administrador"""
     @wraps(f)
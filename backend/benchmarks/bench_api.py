@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la API con mezclas de tráfico realistas sobre la app Flask
+Reporta p50/p95/p99, peticiones/segundo y consultas SQL por endpoint y
+guarda el resultado en benchmarks/resultados/ para comparar entre corridas
+Ejecutar: python benchmarks/bench_api.py --mezcla mixta --sesiones 500 [--sembrar] [--comparar anterior.json]
+Usa DATABASE_URL; sin ella, SQLite en benchmarks/bench.db (ver datos.py)
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos  # noqa: E402
+
+CARPETA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Peso de cada escenario por mezcla
+MEZCLAS = {
+    'lectura': {'navegar': 90, 'buscar': 10},
+    'mixta': {'navegar': 70, 'buscar': 10, 'reaccionar': 10, 'comentar': 7, 'publicar': 3},
+    'escritura': {'navegar': 40, 'reaccionar': 30, 'comentar': 20, 'publicar': 10},
+}
+
+PATRON_CONSULTAS = re.compile(r'db;dur=[\d.]+;desc="(\d+) consultas"')
+
+
+# ─── ESCENARIOS ──────────────────────────────────────────────────────────────
+# Cada uno recibe (cliente, contexto, azar) y devuelve [(endpoint, respuesta, segundos)]
+
+def _pedir(cliente, endpoint, metodo, url, **kwargs):
+    inicio = time.perf_counter()
+    respuesta = getattr(cliente, metodo)(url, **kwargs)
+    return endpoint, respuesta, time.perf_counter() - inicio
+
+
+def navegar(cliente, ctx, azar):
+    """Visitante anónimo: feed, interacciones de la página, una noticia y a veces eventos"""
+    pagina = 1 if azar.random() < 0.7 else azar.randint(2, 5)
+    url = f'/api/noticias?pagina={pagina}'
+    if azar.random() < 0.3:
+        url += f'&categoria={azar.choice(datos.CATEGORIAS_NOTICIAS)}'
+    feed = _pedir(cliente, 'GET /api/noticias', 'get', url)
+    pasos = [feed]
+
+    ids = [n['id'] for n in (feed[1].get_json() or {}).get('items', [])] or azar.sample(ctx['noticias'], 4)
+    pasos.append(_pedir(cliente, 'GET /api/noticias/interacciones', 'get',
+                        f"/api/noticias/interacciones?ids={','.join(map(str, ids))}"))
+
+    noticia_id = azar.choice(ids)
+    pasos.append(_pedir(cliente, 'GET /api/noticias/<id>', 'get', f'/api/noticias/{noticia_id}'))
+    pasos.append(_pedir(cliente, 'GET /api/noticias/<id>/comentarios', 'get',
+                        f'/api/noticias/{noticia_id}/comentarios'))
+    pasos.append(_pedir(cliente, 'GET /api/noticias/<id>/reacciones', 'get',
+                        f'/api/noticias/{noticia_id}/reacciones'))
+    if azar.random() < 0.3:
+        pasos.append(_pedir(cliente, 'GET /api/eventos', 'get', '/api/eventos'))
+    return pasos
+
+
+def buscar(cliente, ctx, azar):
+    termino = ' '.join(azar.sample(datos.PALABRAS, azar.randint(1, 2)))
+    return [_pedir(cliente, 'GET /api/noticias?busqueda', 'get', '/api/noticias',
+                   query_string={'busqueda': termino})]
+
+
+def reaccionar(cliente, ctx, azar):
+    return [_pedir(cliente, 'POST /api/noticias/<id>/reacciones', 'post',
+                   f"/api/noticias/{azar.choice(ctx['noticias'])}/reacciones",
+                   headers=azar.choice(ctx['headers']), json={'tipo': azar.choice(datos.TIPOS_REACCION)})]
+
+
+def comentar(cliente, ctx, azar):
+    return [_pedir(cliente, 'POST /api/noticias/<id>/comentarios', 'post',
+                   f"/api/noticias/{azar.choice(ctx['noticias'])}/comentarios",
+                   headers=azar.choice(ctx['headers']), json={'texto': datos._frase(azar, 4, 30)})]
+
+
+def publicar(cliente, ctx, azar):
+    """Noticia nueva: incluye el fan-out de la notificación (TAREAS_MODO=sincrono)"""
+    return [_pedir(cliente, 'POST /api/noticias', 'post', '/api/noticias', headers=ctx['admin'], json={
+        'titulo': datos._frase(azar, 3, 8), 'descripcion': datos._frase(azar, 10, 25),
+        'contenido': datos._frase(azar, 40, 120), 'categoria': azar.choice(datos.CATEGORIAS_NOTICIAS)})]
+
+
+ESCENARIOS = {'navegar': navegar, 'buscar': buscar, 'reaccionar': reaccionar,
+              'comentar': comentar, 'publicar': publicar}
+
+
+# ─── EJECUCIÓN ───────────────────────────────────────────────────────────────
+
+def preparar_contexto(app, usuarios_con_token=50):
+    from auth import generate_token
+    from models import Usuario, Noticia
+
+    with app.app_context():
+        usuarios = Usuario.query.filter(Usuario.rol == 'usuario').order_by(Usuario.id).limit(usuarios_con_token).all()
+        admin = Usuario.query.filter_by(email=datos.EMAIL_ADMIN).first()
+        if admin is None or not usuarios:
+            return None
+        return {
+            'headers': [{'Authorization': f'Bearer {generate_token(u)}'} for u in usuarios],
+            'admin': {'Authorization': f'Bearer {generate_token(admin)}'},
+            'noticias': [i for (i,) in Noticia.query.with_entities(Noticia.id).all()],
+        }
+
+
+def correr(app, ctx, mezcla, sesiones, hilos, semilla):
+    """Ejecutar `sesiones` escenarios repartidos en `hilos`; devuelve (muestras, segundos)"""
+    nombres = list(MEZCLAS[mezcla])
+    pesos = [MEZCLAS[mezcla][n] for n in nombres]
+    muestras = []
+    candado = threading.Lock()
+
+    def trabajador(indice, cantidad):
+        azar = random.Random(semilla * 1000 + indice)
+        cliente = app.test_client()
+        propias = []
+        for _ in range(cantidad):
+            escenario = azar.choices(nombres, pesos)[0]
+            for endpoint, respuesta, segundos in ESCENARIOS[escenario](cliente, ctx, azar):
+                consultas = PATRON_CONSULTAS.search(', '.join(respuesta.headers.getlist('Server-Timing')))
+                propias.append((endpoint, segundos, respuesta.status_code,
+                                int(consultas.group(1)) if consultas else None))
+        with candado:
+            muestras.extend(propias)
+
+    reparto = [sesiones // hilos + (1 if i < sesiones % hilos else 0) for i in range(hilos)]
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador, args=(i, n)) for i, n in enumerate(reparto)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return muestras, time.perf_counter() - inicio
+
+
+def percentil(ordenados, p):
+    """Percentil con interpolación lineal (ordenados no vacío)"""
+    posicion = (len(ordenados) - 1) * p / 100
+    bajo = int(posicion)
+    alto = min(bajo + 1, len(ordenados) - 1)
+    return ordenados[bajo] + (ordenados[alto] - ordenados[bajo]) * (posicion - bajo)
+
+
+def resumir(muestras, segundos):
+    por_endpoint = {}
+    for endpoint, duracion, estado, consultas in muestras:
+        por_endpoint.setdefault(endpoint, []).append((duracion, estado, consultas))
+
+    resumen = {}
+    for endpoint, filas in sorted(por_endpoint.items()):
+        duraciones = sorted(d for d, _, _ in filas)
+        consultas = [c for _, _, c in filas if c is not None]
+        resumen[endpoint] = {
+            'peticiones': len(filas),
+            'errores': sum(1 for _, e, _ in filas if e >= 400),
+            'p50_ms': round(percentil(duraciones, 50) * 1000, 2),
+            'p95_ms': round(percentil(duraciones, 95) * 1000, 2),
+            'p99_ms': round(percentil(duraciones, 99) * 1000, 2),
+            'max_ms': round(duraciones[-1] * 1000, 2),
+            'peticiones_por_segundo': round(len(filas) / segundos, 1),
+            'consultas_promedio': round(sum(consultas) / len(consultas), 2) if consultas else None,
+        }
+    return resumen
+
+
+def imprimir(resumen, total, segundos):
+    print(f"\n{'Endpoint':<40} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'SQL':>6}")
+    print('-' * 94)
+    for endpoint, r in resumen.items():
+        consultas = '-' if r['consultas_promedio'] is None else f"{r['consultas_promedio']:.1f}"
+        print(f"{endpoint:<40} {r['peticiones']:>6} {r['errores']:>4} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['peticiones_por_segundo']:>8.1f} {consultas:>6}")
+    print('-' * 94)
+    print(f"Total: {total} peticiones en {segundos:.1f}s = {total / segundos:.1f} req/s (latencias en ms)")
+
+
+def comparar(resumen, anterior, umbral, corrida):
+    """Imprimir diferencias contra una corrida guardada; devuelve las regresiones"""
+    print(f"\nComparación con {anterior['fecha']} ({anterior.get('commit') or 'sin commit'}):")
+    if (anterior['mezcla'], anterior['hilos']) != (corrida['mezcla'], corrida['hilos']):
+        print(f"⚠️  La corrida anterior usó mezcla '{anterior['mezcla']}' con {anterior['hilos']} hilo(s)")
+    regresiones = []
+    for endpoint, r in resumen.items():
+        previo = anterior['endpoints'].get(endpoint)
+        if not previo:
+            continue
+        cambio = (r['p95_ms'] - previo['p95_ms']) / previo['p95_ms'] * 100 if previo['p95_ms'] else 0
+        # Los aciertos de caché varían un poco entre corridas: solo cuenta un aumento claro
+        mas_consultas = (r['consultas_promedio'] or 0) > (previo['consultas_promedio'] or 0) * 1.1 + 0.1
+        marca = '⚠️ ' if cambio > umbral or mas_consultas else '  '
+        if marca.strip():
+            regresiones.append(endpoint)
+        print(f"{marca}{endpoint:<40} p95 {previo['p95_ms']:>7.1f} -> {r['p95_ms']:>7.1f} ms ({cambio:+.0f}%)  "
+              f"SQL {previo['consultas_promedio']} -> {r['consultas_promedio']}")
+    return regresiones
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de la API por mezclas de tráfico')
+    parser.add_argument('--mezcla', choices=sorted(MEZCLAS), default='mixta')
+    parser.add_argument('--sesiones', type=int, default=300, help='Escenarios a ejecutar (cada uno hace 1-6 peticiones)')
+    parser.add_argument('--calentamiento', type=int, default=30, help='Escenarios previos que no se miden')
+    parser.add_argument('--hilos', type=int, default=1)
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sembrar', action='store_true', help='Volver a sembrar los datos antes de medir')
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--noticias', type=int, default=1000)
+    parser.add_argument('--comentarios', type=int, default=5000)
+    parser.add_argument('--reacciones', type=int, default=10000)
+    parser.add_argument('--eventos', type=int, default=200)
+    parser.add_argument('--guardar', default=None, help='Archivo de resultados (por omisión en benchmarks/resultados/)')
+    parser.add_argument('--comparar', default=None, help='Resultado anterior (.json) contra el cual comparar')
+    parser.add_argument('--umbral', type=float, default=15, help='%% de aumento del p95 que cuenta como regresión')
+    args = parser.parse_args()
+
+    datos.preparar_entorno()
+    from app import create_app
+    from models import db
+
+    app = create_app()
+    conteos = None
+    with app.app_context():
+        if args.sembrar or not db.session.query(db.func.count()).select_from(db.metadata.tables['noticias']).scalar():
+            print("🌱 Sembrando datos...")
+            conteos = datos.sembrar(args.usuarios, args.noticias, args.comentarios, args.reacciones,
+                                    args.eventos, args.semilla)
+        dialecto = db.engine.dialect.name
+
+    ctx = preparar_contexto(app)
+    if ctx is None:
+        print("❌ La base de datos no tiene los usuarios del benchmark (usa --sembrar)")
+        return False
+
+    print(f"🔥 Calentamiento: {args.calentamiento} escenarios")
+    correr(app, ctx, args.mezcla, args.calentamiento, 1, args.semilla + 1)
+
+    print(f"⏱️  Mezcla '{args.mezcla}': {args.sesiones} escenarios con {args.hilos} hilo(s)")
+    muestras, segundos = correr(app, ctx, args.mezcla, args.sesiones, args.hilos, args.semilla)
+    resumen = resumir(muestras, segundos)
+    imprimir(resumen, len(muestras), segundos)
+
+    resultado = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'commit': _commit_actual(),
+        'mezcla': args.mezcla,
+        'sesiones': args.sesiones,
+        'hilos': args.hilos,
+        'semilla': args.semilla,
+        'datos': conteos,
+        'entorno': {'python': platform.python_version(), 'base_de_datos': dialecto,
+                    'cache': app.config['CACHE_BACKEND'], 'auth': app.config['AUTH_MODO']},
+        'peticiones': len(muestras),
+        'segundos': round(segundos, 3),
+        'peticiones_por_segundo': round(len(muestras) / segundos, 1),
+        'endpoints': resumen,
+    }
+    ruta = args.guardar or os.path.join(
+        CARPETA_RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}_{args.mezcla}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    with open(ruta, 'w') as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"💾 Resultado guardado en {ruta}")
+
+    if args.comparar:
+        with open(args.comparar) as f:
+            regresiones = comparar(resumen, json.load(f), args.umbral, resultado)
+        if regresiones:
+            print(f"❌ {len(regresiones)} endpoint(s) con regresión")
+            return False
+        print("✅ Sin regresiones")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
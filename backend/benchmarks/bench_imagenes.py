@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark del procesamiento de imágenes (imagenes.procesar)
+Mide imágenes/segundo y bytes antes/después con 1..N hilos
+Ejecutar: python benchmarks/bench_imagenes.py --cantidad 20 --ancho 3000 --alto 2000
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw, ImageFilter  # noqa: E402
+from imagenes import procesar  # noqa: E402
+
+
+def generar_foto(ruta, ancho, alto, semilla):
+    """Foto sintética con degradado, figuras y ruido (se comprime como una real)"""
+    imagen = Image.linear_gradient('L').resize((ancho, alto)).convert('RGB')
+    dibujo = ImageDraw.Draw(imagen)
+    for i in range(30):
+        x, y = (semilla * 97 + i * 131) % ancho, (semilla * 53 + i * 71) % alto
+        dibujo.ellipse((x, y, x + ancho // 8, y + alto // 8), fill=((i * 40) % 255, (i * 90) % 255, semilla % 255))
+    ruido = Image.effect_noise((ancho, alto), 40).convert('RGB')
+    imagen = Image.blend(imagen, ruido, 0.25).filter(ImageFilter.SMOOTH)
+    imagen.save(ruta, 'JPEG', quality=95)
+
+
+def correr(carpeta, originales, hilos, anchos, calidad):
+    copias = []
+    for i, origen in enumerate(originales):
+        copias.append((origen, os.path.join(carpeta, f'h{hilos}_{i}.jpg')))
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        resultados = list(pool.map(lambda par: procesar(par[0], par[1], 'jpeg', anchos, calidad), copias))
+    duracion = time.perf_counter() - inicio
+
+    salida = sum(os.path.getsize(os.path.join(carpeta, v['archivo']))
+                 for r in resultados for v in r['variantes'])
+    return duracion, salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del pipeline de imágenes')
+    parser.add_argument('--cantidad', type=int, default=10, help='Imágenes por corrida')
+    parser.add_argument('--ancho', type=int, default=3000)
+    parser.add_argument('--alto', type=int, default=2000)
+    parser.add_argument('--hilos', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--anchos', type=int, nargs='+', default=[400, 800, 1200])
+    parser.add_argument('--calidad', type=int, default=82)
+    args = parser.parse_args()
+
+    carpeta = tempfile.mkdtemp(prefix='bench_imagenes_')
+    try:
+        print(f"🖼️  Generando {args.cantidad} fotos de {args.ancho}x{args.alto}...")
+        originales = []
+        for i in range(args.cantidad):
+            ruta = os.path.join(carpeta, f'original_{i}.jpg')
+            generar_foto(ruta, args.ancho, args.alto, i)
+            originales.append(ruta)
+        entrada = sum(os.path.getsize(r) for r in originales)
+
+        print(f"\n{'hilos':>6} {'segundos':>10} {'img/s':>8} {'ms/img':>8} {'MB entrada':>11} {'MB variantes':>13}")
+        for hilos in args.hilos:
+            duracion, salida = correr(carpeta, originales, hilos, args.anchos, args.calidad)
+            print(f"{hilos:>6} {duracion:>10.2f} {args.cantidad / duracion:>8.2f} "
+                  f"{duracion * 1000 / args.cantidad:>8.1f} {entrada / 1e6:>11.2f} {salida / 1e6:>13.2f}")
+    finally:
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+    print("\n✅ Benchmark terminado")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark de logins bajo carga mixta: una ráfaga de logins mientras otros
+hilos leen el feed, con el hash en línea (PASSWORD_PROCESOS=0) y en el pool
+Reporta logins/segundo, 503 y p50/p95 del feed en cada modo
+Ejecutar: python benchmarks/bench_login.py --segundos 10 --hilos-login 8 --hilos-feed 4 [--procesos 2]
+Usa DATABASE_URL; sin ella, SQLite en benchmarks/bench.db (ver datos.py)
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos  # noqa: E402
+from bench_api import percentil  # noqa: E402
+
+
+def correr(app, emails, segundos, hilos_login, hilos_feed, semilla):
+    """Logins y lecturas del feed en paralelo durante `segundos`"""
+    fin = time.perf_counter() + segundos
+    logins, feed = [], []
+    candado = threading.Lock()
+
+    def iniciar_sesion(indice):
+        azar = random.Random(semilla * 1000 + indice)
+        cliente = app.test_client()
+        propias = []
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            respuesta = cliente.post('/api/auth/login',
+                                     json={'email': azar.choice(emails), 'password': datos.PASSWORD})
+            propias.append((respuesta.status_code, time.perf_counter() - inicio))
+        with candado:
+            logins.extend(propias)
+
+    def leer_feed(indice):
+        azar = random.Random(semilla * 2000 + indice)
+        cliente = app.test_client()
+        propias = []
+        while time.perf_counter() < fin:
+            inicio = time.perf_counter()
+            cliente.get(f'/api/noticias?pagina={azar.randint(1, 5)}')
+            propias.append(time.perf_counter() - inicio)
+        with candado:
+            feed.extend(propias)
+
+    threads = [threading.Thread(target=iniciar_sesion, args=(i,)) for i in range(hilos_login)]
+    threads += [threading.Thread(target=leer_feed, args=(i,)) for i in range(hilos_feed)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return logins, feed
+
+
+def resumir(logins, feed, segundos):
+    exitosos = sorted(d for estado, d in logins if estado == 200)
+    feed = sorted(feed)
+    return {
+        'logins_por_segundo': round(len(exitosos) / segundos, 1),
+        'login_p95_ms': round(percentil(exitosos, 95) * 1000, 1) if exitosos else None,
+        'rechazados_503': sum(1 for estado, _ in logins if estado == 503),
+        'otros_errores': sum(1 for estado, _ in logins if estado not in (200, 503)),
+        'feed_por_segundo': round(len(feed) / segundos, 1),
+        'feed_p50_ms': round(percentil(feed, 50) * 1000, 1) if feed else None,
+        'feed_p95_ms': round(percentil(feed, 95) * 1000, 1) if feed else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de logins contra lecturas del feed')
+    parser.add_argument('--segundos', type=float, default=10, help='Duración de cada modo')
+    parser.add_argument('--hilos-login', type=int, default=8)
+    parser.add_argument('--hilos-feed', type=int, default=4)
+    parser.add_argument('--procesos', type=int, default=2, help='PASSWORD_PROCESOS del modo con pool')
+    parser.add_argument('--max-en-curso', type=int, default=None,
+                        help='PASSWORD_MAX_EN_CURSO (por omisión, el doble de procesos)')
+    parser.add_argument('--metodo', default=None, help='PASSWORD_METODO (por omisión el de config.py)')
+    parser.add_argument('--semilla', type=int, default=42)
+    parser.add_argument('--sembrar', action='store_true', help='Volver a sembrar los datos antes de medir')
+    args = parser.parse_args()
+
+    datos.preparar_entorno()
+    from app import create_app
+    from models import db, Usuario
+    import contrasenas
+
+    app = create_app()
+    if args.metodo:
+        app.config['PASSWORD_METODO'] = args.metodo
+    with app.app_context():
+        if args.sembrar or not Usuario.query.filter_by(email=datos.EMAIL_ADMIN).first():
+            print("🌱 Sembrando datos...")
+            datos.sembrar(semilla=args.semilla)
+        # El login recalcula los hashes con otro método: se deja todo con el actual
+        hash_actual = contrasenas.hashear(datos.PASSWORD)
+        db.session.query(Usuario).update({Usuario.password_hash: hash_actual})
+        db.session.commit()
+        emails = [e for (e,) in Usuario.query.with_entities(Usuario.email).filter(Usuario.rol == 'usuario')]
+
+    modos = [('en línea', 0), (f'pool de {args.procesos}', args.procesos)]
+    resultados = []
+    for nombre, procesos in modos:
+        app.config['PASSWORD_PROCESOS'] = procesos
+        app.config['PASSWORD_MAX_EN_CURSO'] = args.max_en_curso or max(procesos, 1) * 2
+        contrasenas.cerrar()
+        with app.app_context():
+            contrasenas.verificar(hash_actual, datos.PASSWORD)   # arrancar el pool fuera de la medición
+        print(f"⏱️  {nombre}: {args.hilos_login} hilo(s) de login y {args.hilos_feed} de feed "
+              f"durante {args.segundos:.0f}s")
+        logins, feed = correr(app, emails, args.segundos, args.hilos_login, args.hilos_feed, args.semilla)
+        resultados.append((nombre, resumir(logins, feed, args.segundos)))
+    contrasenas.cerrar()
+
+    print(f"\n{'Modo':<14} {'login/s':>8} {'login p95':>10} {'503':>6} {'feed/s':>8} {'feed p50':>9} {'feed p95':>9}")
+    print('-' * 70)
+    for nombre, r in resultados:
+        print(f"{nombre:<14} {r['logins_por_segundo']:>8.1f} {r['login_p95_ms'] or 0:>10.1f} "
+              f"{r['rechazados_503']:>6} {r['feed_por_segundo']:>8.1f} {r['feed_p50_ms'] or 0:>9.1f} "
+              f"{r['feed_p95_ms'] or 0:>9.1f}")
+    print('-' * 70)
+    print("Latencias en ms; los 503 son logins rechazados por PASSWORD_MAX_EN_CURSO")
+    return not any(r['otros_errores'] for _, r in resultados)
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización: instancias ORM + to_dict() contra la proyección
+de columnas (serializacion.proyectar) con todos los campos y con ?campos=
+Reporta filas/segundo y memoria pico (tracemalloc) por modelo
+Ejecutar: python benchmarks/bench_serializacion.py --filas 500 --repeticiones 20 [--sembrar]
+Usa DATABASE_URL; sin ella, SQLite en benchmarks/bench.db (ver datos.py)
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import datos  # noqa: E402
+
+# Campos de una tarjeta del listado (lo que pediría el frontend con ?campos=)
+CAMPOS_TARJETA = {
+    'Noticia': 'id,titulo,descripcion,categoria,imagen,fecha,autor_nombre,imagen_srcset',
+    'Comentario': 'id,texto,fecha,usuario_nombre,usuario_avatar',
+    'Evento': 'id,titulo,categoria,fecha_evento,lugar,dias_restantes',
+}
+
+
+def medir(funcion, repeticiones):
+    """(filas por segundo, KiB pico) de funcion() -> lista de dicts ya en JSON"""
+    from models import db
+
+    filas = 0
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        filas += len(json.loads(funcion()))
+        db.session.expunge_all()   # cada repetición hidrata de cero, como una petición nueva
+    segundos = time.perf_counter() - inicio
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return filas / segundos, pico / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de to_dict() contra la proyección de columnas')
+    parser.add_argument('--filas', type=int, default=500, help='Filas por consulta')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--sembrar', action='store_true', help='Volver a sembrar los datos antes de medir')
+    args = parser.parse_args()
+
+    datos.preparar_entorno()
+    from app import create_app
+    from models import db, Noticia, Comentario, Evento
+    from serializacion import con_autores, parsear_campos, proyectar, serializar, PROYECCIONES
+
+    app = create_app()
+    resultados = []
+    with app.app_context(), app.test_request_context():
+        if args.sembrar or not db.session.query(Noticia.id).first():
+            print("🌱 Sembrando datos...")
+            datos.sembrar(semilla=42)
+
+        hoy = date.today()
+        ordenes = {Noticia: Noticia.fecha.desc(), Comentario: Comentario.fecha.asc(), Evento: Evento.fecha_evento.asc()}
+        contexto = {Evento: {'hoy': hoy}}
+        for modelo in (Noticia, Comentario, Evento):
+            orden = ordenes[modelo]
+            extra = (hoy,) if modelo is Evento else ()
+
+            def orm():
+                filas = con_autores(modelo.query, modelo).order_by(orden).limit(args.filas).all()
+                return json.dumps([f.to_dict(*extra) for f in filas])
+
+            def proyeccion(campos):
+                def correr():
+                    filas = proyectar(modelo.query, modelo, campos).order_by(orden).limit(args.filas).all()
+                    return json.dumps(serializar(filas, modelo, campos, **contexto.get(modelo, {})))
+                return correr
+
+            variantes = (('to_dict()', orm),
+                         ('proyección completa', proyeccion(tuple(PROYECCIONES[modelo]))),
+                         ('proyección tarjeta', proyeccion(parsear_campos(modelo, CAMPOS_TARJETA[modelo.__name__]))))
+            for nombre, funcion in variantes:
+                funcion()   # calentamiento
+                por_segundo, pico = medir(funcion, args.repeticiones)
+                resultados.append((modelo.__name__, nombre, por_segundo, pico))
+
+    print(f"\n{'Modelo':<12} {'Camino':<22} {'filas/s':>10} {'vs to_dict':>11} {'KiB pico':>10}")
+    print('-' * 70)
+    base = {}
+    for modelo, nombre, por_segundo, pico in resultados:
+        base.setdefault(modelo, por_segundo)
+        print(f"{modelo:<12} {nombre:<22} {por_segundo:>10.0f} {por_segundo / base[modelo]:>10.2f}x {pico:>10.0f}")
+    print('-' * 70)
+    print(f"{args.filas} filas por consulta, {args.repeticiones} repeticiones (incluye SQL y json.dumps)")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
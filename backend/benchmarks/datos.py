@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Sembrar un conjunto de datos reproducible para los benchmarks
+(usuarios, noticias, comentarios, reacciones y eventos)
+Ejecutar: python benchmarks/datos.py --usuarios 200 --noticias 1000 --comentarios 5000
+Usa DATABASE_URL; sin ella, SQLite en benchmarks/bench.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BD_POR_OMISION = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench.db')
+
+
+def preparar_entorno():
+    """Variables para correr la app en el benchmark (antes de importar config)"""
+    os.environ.setdefault('DATABASE_URL', f'sqlite:///{BD_POR_OMISION}')
+    os.environ.setdefault('ESQUEMA_AL_INICIAR', 'migrar')
+    os.environ.setdefault('TAREAS_MODO', 'sincrono')          # el fan-out corre dentro de la petición
+    os.environ.setdefault('METRICAS_SERVER_TIMING', 'True')   # de ahí salen las consultas por petición
+    os.environ.setdefault('METRICAS_LENTA_MS', '60000')
+
+
+PALABRAS = (
+    'feria vecinos parque agua luz escuela deporte fútbol mercado cultura música salud vacunación '
+    'reciclaje seguridad transporte calle biblioteca taller concurso posada limpieza jardín becas '
+    'computación curso inscripciones alumbrado drenaje bacheo campaña festival danza teatro torneo '
+    'béisbol maratón clínica farmacia comedor voluntarios donación colecta reunión asamblea cabildo '
+    'tianguis cosecha agricultura riego presa carretera ciclovía mascotas adopción rescate lluvia'
+).split()
+CATEGORIAS_NOTICIAS = ('Eventos', 'Comunidad', 'Educación', 'Deportes', 'Salud', 'Cultura')
+CATEGORIAS_EVENTOS = ('Cultural', 'Deportivo', 'Cívico', 'Comunitario', 'Educativo', 'General')
+TIPOS_REACCION = ('like', 'love', 'wow', 'sad', 'angry')
+PASSWORD = 'bench1234'
+EMAIL_ADMIN = 'admin@bench.local'
+
+
+def _frase(azar, minimo, maximo):
+    return ' '.join(azar.choice(PALABRAS) for _ in range(azar.randint(minimo, maximo))).capitalize()
+
+
+def _en_lotes(db, objetos, tamano=500):
+    for i in range(0, len(objetos), tamano):
+        db.session.add_all(objetos[i:i + tamano])
+        db.session.commit()
+
+
+def sembrar(usuarios=200, noticias=1000, comentarios=5000, reacciones=10000, eventos=200, semilla=42):
+    """Borrar y volver a llenar la base de datos; devuelve los conteos creados
+
+    Requiere un contexto de aplicación. Las reacciones se insertan sin ORM y
+    los contadores se recalculan al final (como verificar_contadores.py).
+    """
+    from sqlalchemy import insert
+    from models import db, Usuario, Noticia, Comentario, Reaccion, Evento
+    from contadores import verificar_contadores
+    import migraciones
+
+    azar = random.Random(semilla)
+    ahora = datetime.utcnow()
+
+    db.drop_all(bind_key=None)
+    migraciones.metadata_version.drop_all(db.engine)
+    migraciones.migrar(db.engine)
+
+    # Un solo hash para todos: calcularlo por usuario tardaría minutos
+    plantilla = Usuario(nombre='x', email='x')
+    plantilla.set_password(PASSWORD)
+    lista_usuarios = [Usuario(nombre='Admin Bench', email=EMAIL_ADMIN, rol='admin',
+                              password_hash=plantilla.password_hash,
+                              fecha_registro=ahora - timedelta(days=400))]
+    for i in range(1, usuarios):
+        lista_usuarios.append(Usuario(nombre=f'Vecino {i}', email=f'vecino{i}@bench.local', rol='usuario',
+                                      password_hash=plantilla.password_hash,
+                                      fecha_registro=ahora - timedelta(days=azar.randint(1, 400))))
+    _en_lotes(db, lista_usuarios)
+    ids_usuarios = [u.id for u in lista_usuarios]
+
+    lista_noticias = [Noticia(
+        titulo=_frase(azar, 3, 8),
+        descripcion=_frase(azar, 10, 25),
+        contenido=_frase(azar, 40, 120),
+        categoria=azar.choice(CATEGORIAS_NOTICIAS),
+        fecha=ahora - timedelta(minutes=azar.randint(0, 365 * 24 * 60)),
+        autor_id=azar.choice(ids_usuarios[:max(1, usuarios // 10)])   # publica el 10 %
+    ) for _ in range(noticias)]
+    _en_lotes(db, lista_noticias)
+    fechas = {n.id: n.fecha for n in lista_noticias}
+    ids_noticias = list(fechas)
+
+    lista_comentarios = []
+    for _ in range(comentarios):
+        noticia_id = azar.choice(ids_noticias)
+        lista_comentarios.append(Comentario(
+            noticia_id=noticia_id, usuario_id=azar.choice(ids_usuarios), texto=_frase(azar, 4, 30),
+            fecha=fechas[noticia_id] + timedelta(minutes=azar.randint(1, 7 * 24 * 60))))
+    _en_lotes(db, lista_comentarios)
+
+    # Una reacción por (noticia, usuario)
+    pares = set()
+    reacciones = min(reacciones, noticias * usuarios)
+    while len(pares) < reacciones:
+        pares.add((azar.choice(ids_noticias), azar.choice(ids_usuarios)))
+    filas = [{'noticia_id': n, 'usuario_id': u, 'tipo': azar.choice(TIPOS_REACCION), 'fecha': fechas[n]}
+             for n, u in sorted(pares)]
+    for i in range(0, len(filas), 2000):
+        db.session.execute(insert(Reaccion), filas[i:i + 2000])
+    db.session.commit()
+    verificar_contadores(reparar=True)
+
+    _en_lotes(db, [Evento(
+        titulo=_frase(azar, 3, 7),
+        descripcion=_frase(azar, 10, 30),
+        categoria=azar.choice(CATEGORIAS_EVENTOS),
+        fecha_evento=ahora + timedelta(hours=azar.randint(-90 * 24, 180 * 24)),
+        lugar=_frase(azar, 1, 3),
+        autor_id=ids_usuarios[0]
+    ) for _ in range(eventos)])
+
+    return {'usuarios': usuarios, 'noticias': noticias, 'comentarios': comentarios,
+            'reacciones': reacciones, 'eventos': eventos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sembrar datos para los benchmarks')
+    parser.add_argument('--usuarios', type=int, default=200)
+    parser.add_argument('--noticias', type=int, default=1000)
+    parser.add_argument('--comentarios', type=int, default=5000)
+    parser.add_argument('--reacciones', type=int, default=10000)
+    parser.add_argument('--eventos', type=int, default=200)
+    parser.add_argument('--semilla', type=int, default=42)
+    args = parser.parse_args()
+
+    preparar_entorno()
+    from app import create_app
+
+    app = create_app()
+    inicio = time.perf_counter()
+    with app.app_context():
+        conteos = sembrar(args.usuarios, args.noticias, args.comentarios, args.reacciones,
+                          args.eventos, args.semilla)
+
+    print(f"✅ Datos sembrados en {time.perf_counter() - inicio:.1f}s: "
+          + ', '.join(f'{v} {k}' for k, v in conteos.items()))
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
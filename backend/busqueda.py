@@ -0,0 +1,349 @@
+import logging
+import re
+import time
+import unicodedata
+from flask import current_app
+from sqlalchemy import case, event, func, or_, select, text
+from models import db, Noticia, Comentario, TerminoBusqueda
+
+# Búsqueda de noticias (y de sus comentarios) con ranking.
+# - Índice invertido propio (tabla busqueda_terminos), mantenido en el mismo
+#   flush que inserta/edita/borra noticias y comentarios. Funciona en SQLite.
+# - FULLTEXT nativo cuando la base es MySQL o PostgreSQL. Los índices los crea
+#   la migración 0006; mientras falten se usa el índice propio.
+# El ranking, el total y la página (LIMIT/OFFSET) salen de una sola consulta
+# agrupada: un término común no trae su lista completa de noticias a Python.
+
+logger = logging.getLogger(__name__)
+
+PESOS = {'titulo': 3.0, 'descripcion': 2.0, 'contenido': 1.0, 'comentario': 0.5}
+MIN_PREFIJO = 3          # el último término se busca como prefijo (búsqueda mientras se escribe)
+MAX_TERMINO = 64
+MAX_TERMINOS_CONSULTA = 8   # los demás se ignoran (cada uno es otra condición en la consulta)
+REVISAR_NATIVO = 60      # segundos antes de volver a buscar índices nativos que faltaban
+
+STOPWORDS = {
+    'a', 'al', 'ante', 'como', 'con', 'de', 'del', 'desde', 'e', 'el', 'en', 'entre',
+    'es', 'esta', 'este', 'esto', 'fue', 'ha', 'hay', 'la', 'las', 'le', 'les', 'lo',
+    'los', 'mas', 'me', 'mi', 'muy', 'no', 'o', 'para', 'pero', 'por', 'que', 'se',
+    'sin', 'sobre', 'su', 'sus', 'te', 'tu', 'u', 'un', 'una', 'unas', 'uno', 'unos',
+    'y', 'ya', 'son', 'ser', 'si', 'sea', 'tambien', 'nos', 'ni', 'hasta'
+}
+
+
+# ─── TOKENIZACIÓN ────────────────────────────────────────────────────────────
+
+def normalizar(texto):
+    """Minúsculas y sin acentos: 'Educación' -> 'educacion'"""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower()
+
+
+def _raiz(palabra):
+    # Plural simple: 'noticias' -> 'noticia', 'luces' -> 'luz'
+    if len(palabra) > 4 and palabra.endswith('ces'):
+        return palabra[:-3] + 'z'
+    if len(palabra) > 3 and palabra.endswith('s'):
+        return palabra[:-1]
+    return palabra
+
+
+def tokenizar(texto, raiz=True):
+    palabras = re.findall(r'[a-z0-9]+', normalizar(texto))
+    return [
+        (_raiz(p) if raiz else p)[:MAX_TERMINO]
+        for p in palabras if p not in STOPWORDS
+    ]
+
+
+def _pesos_terminos(campos):
+    """{termino: peso} a partir de [(texto, peso_del_campo)]"""
+    pesos = {}
+    for texto, peso in campos:
+        for termino in tokenizar(texto):
+            pesos[termino] = pesos.get(termino, 0.0) + peso
+    return pesos
+
+
+# ─── MOTOR ───────────────────────────────────────────────────────────────────
+
+def motor_preferido(bind=None):
+    """'indice' o el dialecto nativo según BUSQUEDA_MOTOR (sin mirar si los índices existen)"""
+    configurado = current_app.config.get('BUSQUEDA_MOTOR', 'auto')
+    dialecto = (bind or db.engine).dialect.name
+
+    if configurado == 'indice':
+        return 'indice'
+    if dialecto in ('mysql', 'postgresql'):
+        return dialecto
+    if configurado == 'nativo':
+        raise RuntimeError(f'FULLTEXT nativo no disponible para {dialecto}')
+    return 'indice'
+
+
+_nativo = {}   # url del motor -> (índices nativos disponibles, momento de la comprobación)
+
+
+def _nativo_disponible(conexion):
+    """Los índices FULLTEXT/GIN existen (si faltaban se vuelve a mirar cada REVISAR_NATIVO segundos)"""
+    clave = str(conexion.engine.url)
+    disponible, revisado = _nativo.get(clave, (False, None))
+    if disponible or (revisado is not None and time.monotonic() - revisado < REVISAR_NATIVO):
+        return disponible
+
+    disponible = _indices_nativos(conexion) >= set(INDICES_NATIVOS)
+    if not disponible:
+        logger.warning('Faltan los índices de búsqueda nativos (migración 0006): se usa el índice propio')
+    _nativo[clave] = (disponible, time.monotonic())
+    return disponible
+
+
+def motor(bind=None):
+    """'indice' o el dialecto nativo ('mysql' / 'postgresql') si sus índices existen
+
+    Sin los índices, MATCH ... AGAINST falla (error 1191 en MySQL): se usa el
+    índice propio, y el listener lo mantiene con lo que se escriba mientras tanto.
+    """
+    preferido = motor_preferido(bind)
+    if preferido == 'indice':
+        return preferido
+    return preferido if _nativo_disponible(bind if bind is not None else db.session.connection()) else 'indice'
+
+
+def consulta_mysql(consulta):
+    """Consulta en modo booleano: todos los términos obligatorios y prefijo en cada uno
+
+    Sin raíz: el índice FULLTEXT guarda las palabras tal cual ('luces', no 'luz').
+    """
+    return ' '.join(f'+{t}*' for t in terminos_consulta(consulta, raiz=False))
+
+
+def terminos_consulta(consulta, raiz=True):
+    """Términos de la consulta sin repetir, a lo sumo MAX_TERMINOS_CONSULTA"""
+    return list(dict.fromkeys(tokenizar(consulta, raiz)))[:MAX_TERMINOS_CONSULTA]
+
+
+def buscar(consulta, categoria=None, limite=20, desde=0):
+    """(ids de la página ordenados por relevancia, total de coincidencias)"""
+    terminos = terminos_consulta(consulta)
+    if not terminos:
+        return [], 0
+
+    actual = motor()
+    if actual == 'mysql':
+        return _buscar_mysql(consulta_mysql(consulta), categoria, limite, desde)
+    if actual == 'postgresql':
+        # PostgreSQL aplica su propio stemming en español
+        return _buscar_postgresql(terminos_consulta(consulta, raiz=False), categoria, limite, desde)
+    return _buscar_indice(terminos, categoria, limite, desde)
+
+
+def _pagina(filas, contar, desde):
+    """filas: (noticia_id, puntaje, total con COUNT(*) OVER ()); contar() solo si la página quedó vacía"""
+    if filas:
+        return [fila[0] for fila in filas], filas[0][2]
+    return [], contar() if desde else 0
+
+
+def _buscar_indice(terminos, categoria, limite, desde):
+    # El último término se busca como prefijo (salvo que ya lo cubra otro término)
+    exactos, ultimo = terminos[:-1], terminos[-1]
+    condiciones = [TerminoBusqueda.termino == t for t in exactos]
+    if len(ultimo) >= MIN_PREFIJO:
+        if not any(t.startswith(ultimo) for t in exactos):
+            condiciones.append(TerminoBusqueda.termino.like(f'{ultimo}%'))
+    elif ultimo not in exactos:
+        condiciones.append(TerminoBusqueda.termino == ultimo)
+
+    puntaje = func.sum(TerminoBusqueda.peso)
+    agrupada = select(TerminoBusqueda.noticia_id).where(or_(*condiciones))
+    if categoria:
+        agrupada = agrupada.join(Noticia, Noticia.id == TerminoBusqueda.noticia_id)\
+            .where(Noticia.categoria == categoria)
+    agrupada = agrupada.group_by(TerminoBusqueda.noticia_id)
+    if len(condiciones) > 1:
+        # Todos los términos deben aparecer en la noticia (o en sus comentarios)
+        termino = case(*[(c, i) for i, c in enumerate(condiciones)])
+        agrupada = agrupada.having(func.count(func.distinct(termino)) == len(condiciones))
+
+    pagina = agrupada.add_columns(puntaje, func.count().over())\
+        .order_by(puntaje.desc(), TerminoBusqueda.noticia_id.desc()).limit(limite).offset(desde)
+    contar = lambda: db.session.execute(select(func.count()).select_from(agrupada.subquery())).scalar()
+    return _pagina(db.session.execute(pagina).all(), contar, desde)
+
+
+def _buscar_texto(coincidencias, params, limite, desde):
+    """Página y total a partir de un UNION ALL de (id, puntaje) de noticias y comentarios"""
+    agrupada = f'SELECT r.id, SUM(r.puntaje) AS puntaje FROM ({coincidencias}) r GROUP BY r.id'
+    filas = db.session.execute(text(
+        f'SELECT p.id, p.puntaje, COUNT(*) OVER () FROM ({agrupada}) p '
+        f'ORDER BY p.puntaje DESC, p.id DESC LIMIT :limite OFFSET :desde'),
+        {**params, 'limite': limite, 'desde': desde}).all()
+    contar = lambda: db.session.execute(text(f'SELECT COUNT(*) FROM ({agrupada}) p'), params).scalar()
+    return _pagina(filas, contar, desde)
+
+
+def _buscar_mysql(consulta, categoria, limite, desde):
+    # La collation utf8mb4_unicode_ci ya ignora acentos
+    filtro = 'AND n.categoria = :categoria' if categoria else ''
+    return _buscar_texto(f"""
+        SELECT n.id, MATCH(n.titulo, n.descripcion, n.contenido) AGAINST (:q IN BOOLEAN MODE) AS puntaje
+        FROM noticias n
+        WHERE MATCH(n.titulo, n.descripcion, n.contenido) AGAINST (:q IN BOOLEAN MODE) {filtro}
+        UNION ALL
+        SELECT c.noticia_id, MATCH(c.texto) AGAINST (:q IN BOOLEAN MODE) * :peso_comentario
+        FROM comentarios c JOIN noticias n ON n.id = c.noticia_id
+        WHERE MATCH(c.texto) AGAINST (:q IN BOOLEAN MODE) {filtro}
+    """, {'q': consulta, 'categoria': categoria, 'peso_comentario': PESOS['comentario']}, limite, desde)
+
+
+def _buscar_postgresql(terminos, categoria, limite, desde):
+    filtro = 'AND n.categoria = :categoria' if categoria else ''
+    return _buscar_texto(f"""
+        SELECT n.id, ts_rank({_VECTOR_NOTICIAS_PG}, to_tsquery('spanish', :q)) AS puntaje
+        FROM noticias n
+        WHERE {_VECTOR_NOTICIAS_PG} @@ to_tsquery('spanish', :q) {filtro}
+        UNION ALL
+        SELECT c.noticia_id, ts_rank({_VECTOR_COMENTARIOS_PG}, to_tsquery('spanish', :q)) * :peso_comentario
+        FROM comentarios c JOIN noticias n ON n.id = c.noticia_id
+        WHERE {_VECTOR_COMENTARIOS_PG} @@ to_tsquery('spanish', :q) {filtro}
+    """, {'q': ' & '.join(f'{t}:*' for t in terminos), 'categoria': categoria,
+          'peso_comentario': PESOS['comentario']}, limite, desde)
+
+
+_VECTOR_NOTICIAS_PG = (
+    "(setweight(to_tsvector('spanish', f_unaccent(coalesce(n.titulo, ''))), 'A') || "
+    "setweight(to_tsvector('spanish', f_unaccent(coalesce(n.descripcion, ''))), 'B') || "
+    "setweight(to_tsvector('spanish', f_unaccent(coalesce(n.contenido, ''))), 'C'))"
+)
+_VECTOR_COMENTARIOS_PG = "to_tsvector('spanish', f_unaccent(coalesce(c.texto, '')))"
+
+INDICES_NATIVOS = ('ft_noticias', 'ft_comentarios')
+
+# (índice que crea o None, sentencia); las que tienen índice se saltan si ya existe
+DDL_NATIVO = {
+    'mysql': [
+        ('ft_noticias', "ALTER TABLE noticias ADD FULLTEXT INDEX ft_noticias (titulo, descripcion, contenido)"),
+        ('ft_comentarios', "ALTER TABLE comentarios ADD FULLTEXT INDEX ft_comentarios (texto)"),
+    ],
+    'postgresql': [
+        (None, "CREATE EXTENSION IF NOT EXISTS unaccent"),
+        # unaccent() no es IMMUTABLE y no se puede usar en un índice directamente
+        (None, "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text AS "
+               "$$ SELECT public.unaccent('public.unaccent', $1) $$ LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT"),
+        ('ft_noticias',
+         f"CREATE INDEX IF NOT EXISTS ft_noticias ON noticias USING gin ({_VECTOR_NOTICIAS_PG.replace('n.', '')})"),
+        ('ft_comentarios',
+         f"CREATE INDEX IF NOT EXISTS ft_comentarios ON comentarios USING gin ({_VECTOR_COMENTARIOS_PG.replace('c.', '')})"),
+    ],
+}
+
+_SQL_INDICES_NATIVOS = {
+    'mysql': "SELECT DISTINCT index_name FROM information_schema.statistics "
+             "WHERE table_schema = DATABASE() AND index_name IN ('ft_noticias', 'ft_comentarios')",
+    'postgresql': "SELECT indexname FROM pg_indexes "
+                  "WHERE schemaname = current_schema() AND indexname IN ('ft_noticias', 'ft_comentarios')",
+}
+
+
+def _indices_nativos(conexion):
+    """Cuáles de INDICES_NATIVOS existen ya en la base"""
+    return {fila[0] for fila in conexion.execute(text(_SQL_INDICES_NATIVOS[conexion.dialect.name]))}
+
+
+def crear_indices_nativos(conexion):
+    """DDL de los índices FULLTEXT/GIN; se puede repetir (ADD FULLTEXT no tiene IF NOT EXISTS)"""
+    existentes = _indices_nativos(conexion)
+    for indice, sentencia in DDL_NATIVO[conexion.dialect.name]:
+        if indice not in existentes:
+            conexion.execute(text(sentencia))
+    _nativo.clear()
+
+
+# ─── MANTENIMIENTO DEL ÍNDICE PROPIO ─────────────────────────────────────────
+
+def _campos_noticia(noticia):
+    return [(noticia.titulo, PESOS['titulo']),
+            (noticia.descripcion, PESOS['descripcion']),
+            (noticia.contenido, PESOS['contenido'])]
+
+
+def _filas(pesos, noticia_id, comentario_id=None):
+    return [
+        {'termino': termino, 'noticia_id': noticia_id, 'comentario_id': comentario_id, 'peso': peso}
+        for termino, peso in pesos.items()
+    ]
+
+
+def _reindexar(conexion, noticias=(), comentarios=(), borrar_noticias=(), borrar_comentarios=()):
+    tabla = TerminoBusqueda.__table__
+
+    if borrar_noticias:
+        # Al borrar una noticia se van también los términos de sus comentarios
+        conexion.execute(tabla.delete().where(tabla.c.noticia_id.in_(list(borrar_noticias))))
+    if noticias:
+        conexion.execute(tabla.delete().where(
+            tabla.c.noticia_id.in_([n.id for n in noticias]) & tabla.c.comentario_id.is_(None)
+        ))
+
+    ids_comentarios = [c.id for c in comentarios] + list(borrar_comentarios)
+    if ids_comentarios:
+        conexion.execute(tabla.delete().where(tabla.c.comentario_id.in_(ids_comentarios)))
+
+    filas = []
+    for n in noticias:
+        filas += _filas(_pesos_terminos(_campos_noticia(n)), n.id)
+    for c in comentarios:
+        filas += _filas(_pesos_terminos([(c.texto, PESOS['comentario'])]), c.noticia_id, c.id)
+    if filas:
+        conexion.execute(tabla.insert(), filas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _actualizar_indice(sesion, contexto):
+    noticias, comentarios, borrar_n, borrar_c = [], [], [], []
+
+    for obj in list(sesion.new) + list(sesion.dirty):
+        if isinstance(obj, Noticia) and (obj in sesion.new or sesion.is_modified(obj)):
+            noticias.append(obj)
+        elif isinstance(obj, Comentario) and (obj in sesion.new or sesion.is_modified(obj)):
+            comentarios.append(obj)
+    for obj in sesion.deleted:
+        if isinstance(obj, Noticia):
+            borrar_n.append(obj.id)
+        elif isinstance(obj, Comentario):
+            borrar_c.append(obj.id)
+
+    if not (noticias or comentarios or borrar_n or borrar_c):
+        return
+
+    conexion = sesion.connection()
+    if motor(conexion) != 'indice':
+        return
+    _reindexar(conexion, noticias, comentarios, borrar_n, borrar_c)
+
+
+def reindexar_todo(lote=500):
+    """Reconstruir el índice propio o crear los índices FULLTEXT nativos"""
+    actual = motor_preferido()
+    if actual != 'indice':
+        crear_indices_nativos(db.session.connection())
+        db.session.commit()
+        return actual, 0
+
+    db.session.execute(TerminoBusqueda.__table__.delete())
+    total = 0
+    for modelo in (Noticia, Comentario):
+        ultimo = 0
+        while True:
+            bloque = modelo.query.filter(modelo.id > ultimo).order_by(modelo.id).limit(lote).all()
+            if not bloque:
+                break
+            if modelo is Noticia:
+                _reindexar(db.session.connection(), noticias=bloque)
+            else:
+                _reindexar(db.session.connection(), comentarios=bloque)
+            ultimo = bloque[-1].id
+            total += len(bloque)
+    db.session.commit()
+    return actual, total
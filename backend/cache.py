@@ -0,0 +1,387 @@
+import base64
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+from flask import current_app, request, abort
+from sqlalchemy import event
+from models import db, Usuario, Noticia, Comentario, Reaccion, Evento, Imagen
+from cache_http import cambio_visible
+from replicas import ttl_replica
+import compresion
+
+try:
+    import redis
+except ImportError:  # opcional: solo para CACHE_BACKEND=redis
+    redis = None
+
+# Caché de respuestas serializadas (JSON ya generado) por espacio:
+# 'feed', 'noticia', 'comentarios', 'reacciones', 'eventos' y 'usuario'
+# (autenticación con AUTH_MODO=claims, ver auth.py).
+#
+# Invalidación por etiquetas con generaciones: cada entrada se guarda bajo
+# espacio|clave|generación de sus etiquetas ('feed:Educación', 'usuarios').
+# Al confirmar una transacción que toca Noticia/Comentario/Reaccion/Evento se
+# renueva la generación de sus etiquetas y las entradas viejas quedan
+# inalcanzables hasta que el LRU o el TTL las saque. Funciona igual con un
+# backend compartido (redis) sin tener que buscar claves por prefijo.
+
+
+# ─── BACKENDS ────────────────────────────────────────────────────────────────
+
+class BackendCache:
+    """Interfaz de almacenamiento: valores str, TTL en segundos"""
+
+    def obtener_varios(self, claves):
+        raise NotImplementedError
+
+    def guardar(self, clave, valor, ttl):
+        raise NotImplementedError
+
+    def agregar(self, clave, valor):
+        """Guardar sin TTL solo si no existe; devuelve el valor que quedó"""
+        raise NotImplementedError
+
+    def reemplazar(self, clave, valor):
+        """Guardar sin TTL (generaciones de etiquetas)"""
+        raise NotImplementedError
+
+    def info(self):
+        return {}
+
+
+class CacheLocal(BackendCache):
+    """LRU con TTL dentro del proceso (cada trabajador web tiene la suya)
+
+    Las generaciones de etiquetas van en su propio LRU (max_etiquetas): hay
+    una por entidad ('noticia:<id>', 'usuario:<id>'...) y sin límite crecerían
+    toda la vida del proceso. Desalojar una es seguro: se vuelve a crear con
+    un valor al azar nuevo y las entradas que la usaban ya no se alcanzan.
+    """
+
+    def __init__(self, max_items=2048, al_desalojar=None, max_etiquetas=None):
+        self.max_items = max_items
+        self.max_etiquetas = max_etiquetas or max_items * 4
+        self.al_desalojar = al_desalojar or (lambda clave, motivo: None)
+        self._datos = OrderedDict()          # clave -> (valor, expira)
+        self._generaciones = OrderedDict()   # gen:<etiqueta> -> generación
+        self._etiquetas_desalojadas = 0
+        self._lock = threading.Lock()
+
+    def obtener_varios(self, claves):
+        ahora = time.monotonic()
+        resultado = []
+        with self._lock:
+            for clave in claves:
+                if clave in self._generaciones:
+                    self._generaciones.move_to_end(clave)
+                    resultado.append(self._generaciones[clave])
+                    continue
+                guardado = self._datos.get(clave)
+                if guardado and guardado[1] < ahora:
+                    del self._datos[clave]
+                    self.al_desalojar(clave, 'expiradas')
+                    guardado = None
+                if guardado:
+                    self._datos.move_to_end(clave)
+                resultado.append(guardado[0] if guardado else None)
+        return resultado
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._datos[clave] = (valor, time.monotonic() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                viejo, _ = self._datos.popitem(last=False)
+                self.al_desalojar(viejo, 'desalojos')
+
+    def _guardar_generacion(self, clave, valor):
+        self._generaciones[clave] = valor
+        self._generaciones.move_to_end(clave)
+        while len(self._generaciones) > self.max_etiquetas:
+            self._generaciones.popitem(last=False)
+            self._etiquetas_desalojadas += 1
+
+    def agregar(self, clave, valor):
+        with self._lock:
+            if clave not in self._generaciones:
+                self._guardar_generacion(clave, valor)
+            return self._generaciones[clave]
+
+    def reemplazar(self, clave, valor):
+        with self._lock:
+            self._guardar_generacion(clave, valor)
+
+    def info(self):
+        return {'tipo': 'local', 'items': len(self._datos), 'max_items': self.max_items,
+                'etiquetas': len(self._generaciones), 'max_etiquetas': self.max_etiquetas,
+                'etiquetas_desalojadas': self._etiquetas_desalojadas}
+
+
+class CacheRedis(BackendCache):
+    """Backend compartido entre procesos (requiere el paquete redis)"""
+
+    def __init__(self, url, prefijo='webcomunitaria:'):
+        if redis is None:
+            raise RuntimeError('CACHE_BACKEND=redis requiere instalar el paquete redis')
+        self.cliente = redis.Redis.from_url(url, decode_responses=True)
+        self.prefijo = prefijo
+
+    def obtener_varios(self, claves):
+        return self.cliente.mget([self.prefijo + c for c in claves])
+
+    def guardar(self, clave, valor, ttl):
+        self.cliente.set(self.prefijo + clave, valor, ex=max(int(ttl), 1))
+
+    def agregar(self, clave, valor):
+        self.cliente.set(self.prefijo + clave, valor, nx=True)
+        return self.cliente.get(self.prefijo + clave) or valor
+
+    def reemplazar(self, clave, valor):
+        self.cliente.set(self.prefijo + clave, valor)
+
+    def info(self):
+        return {'tipo': 'redis'}
+
+
+class CacheMemoriaCompartida(BackendCache):
+    """Sustituto de redis para pruebas: un almacén por proceso compartido
+    por todas las instancias, sin LRU (como redis sin maxmemory)"""
+
+    _almacen = {}
+    _lock = threading.Lock()
+
+    def obtener_varios(self, claves):
+        ahora = time.monotonic()
+        with self._lock:
+            guardados = [self._almacen.get(c) for c in claves]
+        return [g[0] if g and (g[1] is None or g[1] >= ahora) else None for g in guardados]
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._almacen[clave] = (str(valor), time.monotonic() + ttl)
+
+    def agregar(self, clave, valor):
+        with self._lock:
+            return self._almacen.setdefault(clave, (str(valor), None))[0]
+
+    def reemplazar(self, clave, valor):
+        with self._lock:
+            self._almacen[clave] = (str(valor), None)
+
+    @classmethod
+    def vaciar(cls):
+        with cls._lock:
+            cls._almacen.clear()
+
+    def info(self):
+        return {'tipo': 'memoria', 'items': len(self._almacen)}
+
+
+# ─── CACHÉ CON ESTADÍSTICAS ──────────────────────────────────────────────────
+
+class Cache:
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _contar(self, espacio, campo, n=1):
+        with self._lock:
+            stats = self._stats.setdefault(espacio, {
+                'aciertos': 0, 'fallos': 0, 'guardadas': 0, 'desalojos': 0, 'expiradas': 0, 'invalidaciones': 0
+            })
+            stats[campo] += n
+
+    def al_desalojar(self, clave, motivo):
+        self._contar(clave.split('|', 1)[0], motivo)
+
+    def _generaciones(self, etiquetas):
+        if not etiquetas:
+            return []
+        claves = [f'gen:{e}' for e in etiquetas]
+        actuales = self.backend.obtener_varios(claves)
+        return [g if g is not None else self.backend.agregar(c, uuid.uuid4().hex[:12])
+                for c, g in zip(claves, actuales)]
+
+    def obtener_o_calcular(self, espacio, clave, etiquetas, calcular, ttl=None):
+        """Texto cacheado o el de calcular() (None no se guarda)
+
+        La generación se lee antes de consultar la base de datos: si una
+        escritura llega en medio, lo calculado queda bajo la generación vieja.
+        Lo leído de una réplica (que puede ir atrasada) se guarda aparte y
+        con TTL corto: quien lee de la primaria no lo ve.
+        """
+        generaciones = self._generaciones(etiquetas)
+        completa = f"{espacio}|{clave}|{'.'.join(generaciones)}"
+        ttl = self.ttl if ttl is None else ttl
+
+        claves = [completa]
+        ttl_maximo = ttl_replica()
+        if ttl_maximo is not None:
+            completa, ttl = completa + '|replica', min(ttl, ttl_maximo)
+            claves.append(completa)
+
+        valor = next((v for v in self.backend.obtener_varios(claves) if v is not None), None)
+        if valor is not None:
+            self._contar(espacio, 'aciertos')
+            return valor
+
+        self._contar(espacio, 'fallos')
+        valor = calcular()
+        if valor is not None:
+            self.backend.guardar(completa, valor, ttl)
+            self._contar(espacio, 'guardadas')
+        return valor
+
+    def invalidar(self, etiquetas):
+        for etiqueta in etiquetas:
+            self.backend.reemplazar(f'gen:{etiqueta}', uuid.uuid4().hex[:12])
+            self._contar(etiqueta.split(':', 1)[0], 'invalidaciones')
+
+    def estadisticas(self):
+        with self._lock:
+            espacios = {}
+            for espacio, stats in self._stats.items():
+                consultas = stats['aciertos'] + stats['fallos']
+                espacios[espacio] = {**stats, 'tasa_aciertos': round(stats['aciertos'] / consultas, 3) if consultas else None}
+        return {'backend': self.backend.info(), 'ttl': self.ttl, 'espacios': espacios}
+
+
+class SinCache(Cache):
+    """CACHE_BACKEND=ninguno: siempre calcula"""
+
+    def __init__(self):
+        super().__init__(None, 0)
+
+    def obtener_o_calcular(self, espacio, clave, etiquetas, calcular, ttl=None):
+        self._contar(espacio, 'fallos')
+        return calcular()
+
+    def invalidar(self, etiquetas):
+        pass
+
+    def estadisticas(self):
+        return {'backend': {'tipo': 'ninguno'}, 'espacios': {}}
+
+
+def crear_cache(config):
+    tipo = config['CACHE_BACKEND']
+    if tipo == 'ninguno':
+        return SinCache()
+
+    cache = Cache(None, config['CACHE_TTL'])
+    if tipo == 'local':
+        cache.backend = CacheLocal(config['CACHE_MAX_ITEMS'], cache.al_desalojar, config['CACHE_MAX_ETIQUETAS'])
+    elif tipo == 'redis':
+        cache.backend = CacheRedis(config['CACHE_REDIS_URL'])
+    elif tipo == 'memoria':
+        cache.backend = CacheMemoriaCompartida()
+    else:
+        raise ValueError(f'CACHE_BACKEND desconocido: {tipo}')
+    return cache
+
+
+def obtener_cache():
+    extensiones = current_app.extensions
+    if 'cache' not in extensiones:
+        extensiones['cache'] = crear_cache(current_app.config)
+    return extensiones['cache']
+
+
+def clave_peticion():
+    """Query string normalizada (mismo orden de parámetros = misma clave)"""
+    return urlencode(sorted(request.args.items(multi=True)))
+
+
+def _comprimida(espacio, texto, codificacion):
+    """Variante comprimida del texto cacheado (se comprime una vez por contenido)
+
+    La clave es la huella del texto, no su generación: una variante nunca
+    puede quedar desfasada del JSON y no necesita etiquetas. Los backends
+    guardan texto, así que va en base64.
+    """
+    crudo = texto.encode()
+    calculada = []
+
+    def comprimir():
+        calculada.append(True)
+        return base64.b64encode(compresion.comprimir(crudo, codificacion, origen='cache')).decode('ascii')
+
+    huella = hashlib.sha1(crudo).hexdigest()
+    cuerpo = base64.b64decode(obtener_cache().obtener_o_calcular(f'{espacio}.{codificacion}', huella, [], comprimir))
+    if not calculada:
+        compresion.registrar(codificacion, 'precomprimida', len(crudo), len(cuerpo))   # sin CPU de compresión
+    return cuerpo
+
+
+def respuesta_cacheada(espacio, clave, etiquetas, calcular):
+    """Respuesta JSON desde la caché; calcular() devuelve datos o None (404)
+
+    Si el cliente acepta gzip/br se responde con la variante comprimida
+    guardada junto al JSON (el middleware de compresion.py la deja pasar).
+    """
+    def serializar():
+        datos = calcular()
+        return None if datos is None else current_app.json.dumps(datos)
+
+    texto = obtener_cache().obtener_o_calcular(espacio, clave, etiquetas, serializar)
+    if texto is None:
+        abort(404)
+    respuesta = current_app.response_class(texto, mimetype='application/json')
+    codificacion = compresion.negociar(len(texto))
+    if codificacion is not None:
+        respuesta.set_data(_comprimida(espacio, texto, codificacion))
+        respuesta.headers['Content-Encoding'] = codificacion
+        respuesta.vary.add('Accept-Encoding')
+    return respuesta
+
+
+# ─── INVALIDACIÓN ────────────────────────────────────────────────────────────
+
+def etiquetas_de(obj, borrado=False):
+    if isinstance(obj, Noticia):
+        etiquetas = {f'noticia:{obj.id}', 'feed:*', f'feed:{obj.categoria}'}
+        anteriores = db.inspect(obj).attrs['categoria'].history.deleted or ()
+        etiquetas.update(f'feed:{c}' for c in anteriores)
+        if borrado:
+            etiquetas.update({f'comentarios:{obj.id}', f'reacciones:{obj.id}'})
+        return etiquetas
+    if isinstance(obj, Comentario):
+        return {f'comentarios:{obj.noticia_id}'}
+    if isinstance(obj, Reaccion):
+        return {f'reacciones:{obj.noticia_id}'}
+    if isinstance(obj, Evento):
+        return {'eventos'}
+    if isinstance(obj, Usuario):
+        return {'usuarios', f'usuario:{obj.id}'}
+    if isinstance(obj, Imagen):
+        return {'imagenes'}
+    return set()
+
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_etiquetas(sesion, contexto):
+    etiquetas = sesion.info.setdefault('cache_etiquetas', set())
+    for obj in list(sesion.new) + list(sesion.dirty):
+        if cambio_visible(sesion, obj):
+            etiquetas.update(etiquetas_de(obj))
+        elif isinstance(obj, Usuario) and obj not in sesion.new and sesion.is_modified(obj):
+            etiquetas.add(f'usuario:{obj.id}')   # rol, versión de token... (caché de auth)
+    for obj in sesion.deleted:
+        etiquetas.update(etiquetas_de(obj, borrado=True))
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_tras_commit(sesion):
+    etiquetas = sesion.info.pop('cache_etiquetas', None)
+    if etiquetas:
+        obtener_cache().invalidar(etiquetas)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_etiquetas(sesion):
+    sesion.info.pop('cache_etiquetas', None)
@@ -0,0 +1,180 @@
+import hashlib
+from datetime import datetime
+from functools import wraps
+from flask import current_app, request, make_response
+from sqlalchemy import event, select, update
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from models import db, Usuario, Noticia, Comentario, Reaccion, Evento, Imagen, VersionDatos
+
+# Validadores HTTP (ETag / Last-Modified) a partir de sellos de versión.
+# Cada escritura incrementa en su misma transacción los sellos de lo que
+# cambió ('noticias' y 'noticia:5', por ejemplo); las lecturas calculan el
+# ETag con una sola consulta a `versiones` y responden 304 sin tocar el ORM.
+# Reacciones y comentarios solo sellan su noticia ('reacciones:5'): un sello
+# global sería una fila que serializa todas las escrituras e invalida todos
+# los listados. Los sellos globales quedan para lo que cambia los listados.
+
+_tabla = VersionDatos.__table__
+
+
+def claves_de(obj):
+    """Sellos que invalida un objeto modificado"""
+    if isinstance(obj, Noticia):
+        return ['noticias', f'noticia:{obj.id}']
+    if isinstance(obj, Comentario):
+        return [f'comentarios:{obj.noticia_id}']
+    if isinstance(obj, Reaccion):
+        return [f'reacciones:{obj.noticia_id}']
+    if isinstance(obj, Evento):
+        return ['eventos', f'evento:{obj.id}']
+    if isinstance(obj, Usuario):
+        # Nombre y avatar aparecen en noticias, comentarios y eventos
+        return ['usuarios']
+    if isinstance(obj, Imagen):
+        # imagen_srcset de noticias y eventos (variantes recién generadas)
+        return ['imagenes']
+    return []
+
+
+def cambio_visible(sesion, obj):
+    if obj in sesion.new:
+        # Un usuario nuevo no aparece en ninguna respuesta pública todavía
+        return not isinstance(obj, Usuario)
+    if isinstance(obj, Usuario):
+        estado = db.inspect(obj)
+        return any(estado.attrs[a].history.has_changes() for a in ('nombre', 'avatar'))
+    return sesion.is_modified(obj)
+
+
+def incrementar(conexion, claves):
+    """UPDATE/INSERT atómico de los sellos (upsert según el dialecto)"""
+    ahora = datetime.utcnow()
+    filas = [{'clave': c, 'version': 1, 'actualizado': ahora} for c in sorted(set(claves))]
+    dialecto = conexion.dialect.name
+
+    if dialecto in ('sqlite', 'postgresql'):
+        modulo = sqlite if dialecto == 'sqlite' else postgresql
+        sentencia = modulo.insert(_tabla)
+        sentencia = sentencia.on_conflict_do_update(
+            index_elements=[_tabla.c.clave],
+            set_={'version': _tabla.c.version + 1, 'actualizado': sentencia.excluded.actualizado}
+        )
+    elif dialecto in ('mysql', 'mariadb'):
+        sentencia = mysql.insert(_tabla)
+        sentencia = sentencia.on_duplicate_key_update(
+            version=_tabla.c.version + 1, actualizado=sentencia.inserted.actualizado
+        )
+    else:
+        for fila in filas:
+            resultado = conexion.execute(update(_tabla).where(_tabla.c.clave == fila['clave'])
+                                         .values(version=_tabla.c.version + 1, actualizado=ahora))
+            if not resultado.rowcount:
+                conexion.execute(_tabla.insert().values(**fila))
+        return
+
+    conexion.execute(sentencia, filas)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sellar_cambios(sesion, contexto):
+    claves = set()
+    for obj in list(sesion.new) + list(sesion.dirty):
+        if cambio_visible(sesion, obj):
+            claves.update(claves_de(obj))
+    for obj in sesion.deleted:
+        claves.update(claves_de(obj))
+
+    if claves:
+        incrementar(sesion.connection(), claves)
+
+
+def leer_versiones(claves):
+    """{clave: (version, actualizado)} con una consulta Core"""
+    filas = db.session.execute(
+        select(_tabla.c.clave, _tabla.c.version, _tabla.c.actualizado).where(_tabla.c.clave.in_(claves))
+    ).all()
+    return {clave: (version, actualizado) for clave, version, actualizado in filas}
+
+
+# ─── DECORADOR ───────────────────────────────────────────────────────────────
+
+def _resolver_claves(claves, kwargs):
+    resultado = []
+    for clave in claves:
+        if callable(clave):
+            resultado.extend(clave(kwargs))
+        else:
+            resultado.append(clave.format(**kwargs))
+    return resultado
+
+
+def _cache_control(privado):
+    if privado:
+        return 'private, no-cache'
+    config = current_app.config
+    return (f"public, max-age={config['HTTP_CACHE_MAX_AGE']}, "
+            f"s-maxage={config['HTTP_CACHE_S_MAXAGE']}, "
+            f"stale-while-revalidate={config['HTTP_CACHE_STALE_WHILE_REVALIDATE']}")
+
+
+def condicional(*claves, variar=None, por_contenido=None):
+    """GET condicional para una vista de solo lectura
+
+    claves: sellos de los que depende la respuesta; cadenas con formato
+    sobre los argumentos de la ruta ('noticia:{id}') o funciones
+    kwargs -> [claves] para las que dependen de la query string.
+    variar: función sin argumentos con un valor extra para el ETag
+    (p. ej. la fecha de hoy si la respuesta depende de ella).
+    por_contenido: función sin argumentos; si devuelve True la respuesta
+    depende de sellos por noticia que no se conocen antes de calcularla,
+    así que se calcula siempre y el ETag incluye el cuerpo (el 304 ahorra
+    solo la transferencia).
+    """
+    def decorador(f):
+        @wraps(f)
+        def vista(*args, **kwargs):
+            lista = _resolver_claves(claves, kwargs)
+            versiones = leer_versiones(lista)
+            privado = 'Authorization' in request.headers
+
+            huella = hashlib.sha1()
+            huella.update(request.full_path.encode())
+            for clave in sorted(lista):
+                huella.update(f'|{clave}={versiones.get(clave, (0, None))[0]}'.encode())
+            if variar:
+                huella.update(f'|{variar()}'.encode())
+            if privado:
+                huella.update(request.headers['Authorization'].encode())
+
+            calculada = None
+            if por_contenido and por_contenido():
+                calculada = make_response(f(*args, **kwargs))
+                if calculada.status_code != 200:
+                    return calculada
+                huella.update(calculada.get_data())
+            etag = huella.hexdigest()
+
+            fechas = [actualizado for _, actualizado in versiones.values()]
+            ultima = max(fechas).replace(microsecond=0) if fechas and not variar and not calculada else None
+
+            no_modificado = request.if_none_match.contains_weak(etag) if request.if_none_match else (
+                ultima is not None and request.if_modified_since is not None
+                and ultima <= request.if_modified_since.replace(tzinfo=None)
+            )
+            if no_modificado:
+                respuesta = make_response('', 304)
+            elif calculada is not None:
+                respuesta = calculada
+            else:
+                respuesta = make_response(f(*args, **kwargs))
+                if respuesta.status_code != 200:
+                    return respuesta
+
+            respuesta.set_etag(etag, weak=True)
+            if ultima is not None:
+                respuesta.last_modified = ultima
+            respuesta.headers['Cache-Control'] = _cache_control(privado)
+            respuesta.vary.add('Authorization')
+            return respuesta
+        return vista
+    return decorador
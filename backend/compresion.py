@@ -0,0 +1,161 @@
+import threading
+import time
+import zlib
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:  # opcional: sin el paquete solo se ofrece gzip
+    brotli = None
+
+# Compresión de respuestas negociada con Accept-Encoding (br o gzip).
+#
+# El middleware (after_request) comprime las respuestas de COMPRESION_TIPOS
+# de al menos COMPRESION_MIN_BYTES; las que se generan por partes se
+# comprimen al vuelo, vaciando el compresor en cada parte. No se tocan:
+#   - text/event-stream: el buffer del compresor retrasaría los eventos
+#   - archivos (send_file, Range) y respuestas con Content-Encoding propio
+#   - Cache-Control: no-transform
+#
+# Las respuestas de la caché de resultados llegan ya comprimidas: la
+# variante se guarda junto al JSON (cache.respuesta_cacheada) y una página
+# del feed se comprime una vez por contenido, no en cada petición.
+#
+# Los contadores (CPU comprimiendo y bytes ahorrados) son por proceso.
+
+_lock = threading.Lock()
+# (codificación, origen) -> {'respuestas', 'bytes_originales', 'bytes_comprimidos', 'cpu_segundos'}
+# origen: 'respuesta' (middleware), 'stream', 'cache' (variante comprimida al
+# guardarla) o 'precomprimida' (variante leída de la caché, sin CPU)
+_stats = {}
+
+
+def codificaciones():
+    """Las que puede producir este proceso, en orden de preferencia"""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negociar(tamano=None):
+    """Codificación para la petición actual (None = sin comprimir)
+
+    tamano: bytes del cuerpo si se conocen (por debajo del mínimo no vale la pena).
+    """
+    config = current_app.config
+    if not config['COMPRESION_ACTIVA']:
+        return None
+    if tamano is not None and tamano < config['COMPRESION_MIN_BYTES']:
+        return None
+    return request.accept_encodings.best_match(codificaciones())
+
+
+def registrar(codificacion, origen, originales, comprimidos, cpu_segundos=0.0):
+    with _lock:
+        stats = _stats.setdefault((codificacion, origen), {
+            'respuestas': 0, 'bytes_originales': 0, 'bytes_comprimidos': 0, 'cpu_segundos': 0.0
+        })
+        stats['respuestas'] += 1
+        stats['bytes_originales'] += originales
+        stats['bytes_comprimidos'] += comprimidos
+        stats['cpu_segundos'] += cpu_segundos
+
+
+def _compresor(codificacion):
+    """(procesar(parte), vaciar(), terminar()) de un compresor nuevo"""
+    config = current_app.config
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=config['COMPRESION_NIVEL_BROTLI'])
+        return compresor.process, compresor.flush, compresor.finish
+    # wbits=31: formato gzip (encabezado y CRC) en lugar de zlib
+    compresor = zlib.compressobj(config['COMPRESION_NIVEL_GZIP'], zlib.DEFLATED, 31)
+    return compresor.compress, lambda: compresor.flush(zlib.Z_SYNC_FLUSH), compresor.flush
+
+
+def comprimir(datos, codificacion, origen='respuesta'):
+    """Cuerpo completo comprimido (cuenta el tiempo de CPU de este hilo)"""
+    inicio = time.thread_time()
+    procesar, _, terminar = _compresor(codificacion)
+    resultado = procesar(datos) + terminar()
+    registrar(codificacion, origen, len(datos), len(resultado), time.thread_time() - inicio)
+    return resultado
+
+
+def _comprimir_partes(partes, codificacion):
+    """Generador que comprime y vacía el compresor en cada parte (el cliente no espera al final)"""
+    procesar, vaciar, terminar = _compresor(codificacion)
+    originales = comprimidos = 0
+    cpu = 0.0
+    try:
+        for parte in partes:
+            if not parte:
+                continue
+            if isinstance(parte, str):
+                parte = parte.encode()
+            inicio = time.thread_time()
+            salida = procesar(parte) + vaciar()
+            cpu += time.thread_time() - inicio
+            originales += len(parte)
+            comprimidos += len(salida)
+            yield salida
+        salida = terminar()
+        comprimidos += len(salida)
+        yield salida
+    finally:
+        if hasattr(partes, 'close'):
+            partes.close()
+        registrar(codificacion, 'stream', originales, comprimidos, cpu)
+
+
+# ─── MIDDLEWARE ──────────────────────────────────────────────────────────────
+
+def _comprimible(response):
+    if response.status_code < 200 or response.status_code in (204, 206, 304):
+        return False
+    if response.direct_passthrough or 'Content-Encoding' in response.headers or 'Content-Range' in response.headers:
+        return False
+    if response.mimetype == 'text/event-stream' or 'no-transform' in response.cache_control:
+        return False
+    return response.mimetype in current_app.config['COMPRESION_TIPOS']
+
+
+def _comprimir_respuesta(response):
+    if not current_app.config['COMPRESION_ACTIVA'] or not _comprimible(response):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if response.is_streamed:
+        codificacion = negociar()
+        if codificacion is None:
+            return response
+        # El iterable original: al cerrar la respuesta se cierra también (stream_with_context)
+        response.response = _comprimir_partes(response.response, codificacion)
+        response.headers.pop('Content-Length', None)
+    else:
+        datos = response.get_data()
+        codificacion = negociar(len(datos))
+        if codificacion is None:
+            return response
+        response.set_data(comprimir(datos, codificacion))
+
+    response.headers['Content-Encoding'] = codificacion
+    etag, debil = response.get_etag()
+    if etag and not debil:
+        response.set_etag(etag, weak=True)   # otro cuerpo: ya no es idéntico byte a byte
+    return response
+
+
+def configurar(app):
+    """Registrar el middleware (después de metricas.configurar: el tamaño medido es el comprimido)"""
+    app.after_request(_comprimir_respuesta)
+
+
+def estadisticas():
+    with _lock:
+        resultado = []
+        for (codificacion, origen), stats in sorted(_stats.items()):
+            ahorrados = stats['bytes_originales'] - stats['bytes_comprimidos']
+            resultado.append({
+                'codificacion': codificacion, 'origen': origen, **stats, 'bytes_ahorrados': ahorrados,
+                'proporcion': round(stats['bytes_comprimidos'] / stats['bytes_originales'], 3)
+                if stats['bytes_originales'] else None,
+            })
+    return {'codificaciones': list(codificaciones()), 'series': resultado}
@@ -0,0 +1,136 @@
+import bisect
+import threading
+import time
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as TiempoAgotadoPool
+from sqlalchemy.pool import QueuePool
+
+# Pool de conexiones a la base de datos: opciones del motor desde la
+# configuración (DB_POOL_*) y un QueuePool que mide cuánto espera cada
+# petición por una conexión y qué tan lleno está el pool.
+#
+# Con gunicorn cada proceso tiene su propio pool: el máximo de conexiones
+# abiertas es workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW), y debe quedar por
+# debajo de max_connections del servidor (ver gunicorn.conf.py).
+
+# Límites (segundos) del histograma de esperas
+LIMITES_ESPERA = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)
+
+
+class MetricasPool:
+    """Contadores de checkouts, esperas y saturación (seguros entre hilos)"""
+
+    def __init__(self):
+        self._candado = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.en_uso_max = 0
+        self.histograma = [0] * (len(LIMITES_ESPERA) + 1)
+
+    def registrar(self, espera, en_uso=None, agotado=False):
+        with self._candado:
+            if agotado:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.en_uso_max = max(self.en_uso_max, en_uso)
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            self.histograma[bisect.bisect_left(LIMITES_ESPERA, espera)] += 1
+
+    def resumen(self, pool):
+        capacidad = pool.size() + max(pool._max_overflow, 0)
+        with self._candado:
+            intentos = self.checkouts + self.timeouts
+            return {
+                'pool': type(pool).__name__,
+                'tamano': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'en_uso': pool.checkedout(),
+                'en_uso_max': self.en_uso_max,
+                'disponibles': pool.checkedin(),
+                'saturacion': round(pool.checkedout() / capacidad, 3) if capacidad > 0 else 0,
+                'saturacion_max': round(self.en_uso_max / capacidad, 3) if capacidad > 0 else 0,
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'espera_promedio_ms': round(self.espera_total / intentos * 1000, 3) if intentos else 0,
+                'espera_max_ms': round(self.espera_max * 1000, 3),
+                'espera_total_segundos': round(self.espera_total, 6),
+                'histograma_espera': {
+                    **{str(l): n for l, n in zip(LIMITES_ESPERA, self.histograma)},
+                    '+Inf': self.histograma[-1]
+                }
+            }
+
+
+class QueuePoolMedido(QueuePool):
+    """QueuePool que registra el tiempo de cada checkout
+
+    La espera incluye abrir una conexión nueva cuando el pool crece hasta
+    max_overflow; el pre-ping ocurre después y no se cuenta.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except TiempoAgotadoPool:
+            self.metricas.registrar(time.perf_counter() - inicio, agotado=True)
+            raise
+        self.metricas.registrar(time.perf_counter() - inicio, self.checkedout())
+        return conexion
+
+    def recreate(self):
+        # dispose()/invalidación crean un pool nuevo: se conservan las métricas
+        nuevo = super().recreate()
+        nuevo.metricas = self.metricas
+        return nuevo
+
+
+def opciones_motor(config):
+    """SQLALCHEMY_ENGINE_OPTIONS a partir de DB_POOL_* y DB_*_TIMEOUT
+
+    SQLite (pruebas/desarrollo) usa el pool por defecto de SQLAlchemy.
+    """
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    dialecto = url.get_backend_name()
+    if dialecto == 'sqlite':
+        return {}
+
+    opciones = {
+        'poolclass': QueuePoolMedido,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+    conexion = {}
+    tiempo_consulta = config['DB_STATEMENT_TIMEOUT_MS']
+    if dialecto == 'mysql':
+        conexion['connect_timeout'] = config['DB_CONNECT_TIMEOUT']
+        if tiempo_consulta:
+            # Solo limita SELECT (MySQL 5.7.8+); escrituras y DDL no se cortan
+            conexion['init_command'] = f'SET SESSION max_execution_time={int(tiempo_consulta)}'
+    elif dialecto == 'postgresql':
+        conexion['connect_timeout'] = config['DB_CONNECT_TIMEOUT']
+        if tiempo_consulta:
+            conexion['options'] = f'-c statement_timeout={int(tiempo_consulta)}'
+    if conexion:
+        opciones['connect_args'] = conexion
+    return opciones
+
+
+def estadisticas(engine):
+    """Estado del pool del motor (solo nombre si no es QueuePoolMedido)"""
+    pool = engine.pool
+    if isinstance(pool, QueuePoolMedido):
+        return pool.metricas.resumen(pool)
+    return {'pool': type(pool).__name__}
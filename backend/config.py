@@ -3,20 +3,24 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def normalizar_url(url):
+    """Corrección de protocolos para SQLAlchemy"""
+    if url.startswith('mysql://'):
+        return url.replace('mysql://', 'mysql+pymysql://', 1)
+    if url.startswith('postgres://'):
+        # SQLAlchemy requiere 'postgresql://' en lugar de 'postgres://'
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
 class Config:
     # --- BASE DE DATOS ---
     # Soporta DATABASE_URL (Railway/DOM Cloud) y fallback a MySQL local
     DATABASE_URL = os.getenv('DATABASE_URL')
     
     if DATABASE_URL:
-        # Corrección de protocolos para SQLAlchemy
-        if DATABASE_URL.startswith('mysql://'):
-            SQLALCHEMY_DATABASE_URI = DATABASE_URL.replace('mysql://', 'mysql+pymysql://', 1)
-        elif DATABASE_URL.startswith('postgres://'):
-            # SQLAlchemy requiere 'postgresql://' en lugar de 'postgres://'
-            SQLALCHEMY_DATABASE_URI = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
-        else:
-            SQLALCHEMY_DATABASE_URI = DATABASE_URL
+        SQLALCHEMY_DATABASE_URI = normalizar_url(DATABASE_URL)
     else:
         # Configuración para Desarrollo Local
         DB_HOST = os.getenv('DB_HOST', 'localhost')
@@ -27,11 +31,159 @@ class Config:
         SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # 'verificar': no arranca si faltan migraciones (python migrar.py);
+    # 'migrar': las aplica al iniciar (pruebas/desarrollo); 'no': ninguna comprobación
+    ESQUEMA_AL_INICIAR = os.getenv('ESQUEMA_AL_INICIAR', 'verificar')
+    
+    # --- POOL DE CONEXIONES ---
+    # Por proceso de gunicorn (ver gunicorn.conf.py y conexiones.py). Cada hilo de
+    # peticiones (GUNICORN_THREADS) o de tareas (TAREAS_HILOS) usa una conexión a la vez
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE',
+                                 int(os.getenv('GUNICORN_THREADS', 4)) + int(os.getenv('TAREAS_HILOS', 2))))
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 5))
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 10))        # segundos esperando una conexión libre
+    # Cerrar conexiones con más de N segundos: el proxy de Railway corta las inactivas
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 280))
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    DB_CONNECT_TIMEOUT = int(os.getenv('DB_CONNECT_TIMEOUT', 10))
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0))   # 0 = sin límite
+    
+    # --- RÉPLICAS DE LECTURA ---
+    # URLs separadas por comas; las vistas @solo_lectura leen de ellas (ver replicas.py)
+    DB_REPLICAS = [normalizar_url(u.strip()) for u in os.getenv('DB_REPLICAS', '').split(',') if u.strip()]
+    DB_REPLICA_RETRASO_MAX = float(os.getenv('DB_REPLICA_RETRASO_MAX', 5))   # segundos; más = leer de la primaria
+    DB_REPLICA_INTERVALO = float(os.getenv('DB_REPLICA_INTERVALO', 5))       # cada cuánto se mide el retraso
+    DB_REPLICA_REINTENTO = float(os.getenv('DB_REPLICA_REINTENTO', 30))      # segundos fuera tras un error
+    # Tras escribir, el mismo cliente lee de la primaria durante estos segundos
+    DB_LECTURA_PROPIA_SEGUNDOS = int(os.getenv('DB_LECTURA_PROPIA_SEGUNDOS', 10))
+
+    # --- SERIALIZACIÓN ---
+    # Carga del autor/usuario en listados: 'joined', 'selectin' o 'lazy'
+    SERIALIZACION_ESTRATEGIA = os.getenv('SERIALIZACION_ESTRATEGIA', 'joined')
+    # Sobrescribir por endpoint, p. ej. {'comentarios.get_comentarios': 'selectin'}
+    SERIALIZACION_ESTRATEGIAS = {}
+    
+    # --- PAGINACIÓN ---
+    # Segundos que se reutiliza un COUNT(*) de total_items/total (se invalida al insertar/borrar)
+    PAGINACION_TOTAL_TTL = int(os.getenv('PAGINACION_TOTAL_TTL', 60))
+    
+    # --- CACHÉ HTTP ---
+    # Cache-Control de las lecturas públicas: el navegador revalida (ETag) y
+    # la CDN puede servir la copia S_MAXAGE segundos
+    HTTP_CACHE_MAX_AGE = int(os.getenv('HTTP_CACHE_MAX_AGE', 0))
+    HTTP_CACHE_S_MAXAGE = int(os.getenv('HTTP_CACHE_S_MAXAGE', 30))
+    HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv('HTTP_CACHE_STALE_WHILE_REVALIDATE', 60))
+    
+    # --- CACHÉ DE RESULTADOS ---
+    # 'local': LRU en memoria de cada proceso; 'redis': compartida entre procesos
+    # (CACHE_REDIS_URL); 'memoria': sustituto de redis para pruebas; 'ninguno'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'local')
+    CACHE_MAX_ITEMS = int(os.getenv('CACHE_MAX_ITEMS', 2048))
+    # Generaciones de etiquetas (una por noticia/usuario...) que guarda cada proceso con 'local'
+    CACHE_MAX_ETIQUETAS = int(os.getenv('CACHE_MAX_ETIQUETAS', 8192))
+    CACHE_TTL = int(os.getenv('CACHE_TTL', 60))
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    
+    # --- UPLOADS E IMÁGENES ---
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 5 * 1024 * 1024))   # por imagen
+    # Anchos de las variantes (además del original) y calidad JPEG/WebP
+    IMAGENES_ANCHOS = [int(a) for a in os.getenv('IMAGENES_ANCHOS', '400,800,1200').split(',') if a.strip()]
+    IMAGENES_CALIDAD = int(os.getenv('IMAGENES_CALIDAD', 82))
+    IMAGENES_MAX_PIXELES = int(os.getenv('IMAGENES_MAX_PIXELES', 40_000_000))
+    # '' (Flask envía el archivo), 'x-sendfile' (apache/lighttpd) o 'x-accel' (nginx,
+    # con una location internal en UPLOADS_ACCEL_PREFIJO que apunte a UPLOAD_FOLDER)
+    UPLOADS_OFFLOAD = os.getenv('UPLOADS_OFFLOAD', '')
+    UPLOADS_ACCEL_PREFIJO = os.getenv('UPLOADS_ACCEL_PREFIJO', '/uploads-internos/')
+    UPLOADS_MAX_AGE = int(os.getenv('UPLOADS_MAX_AGE', 86400))   # archivos con nombres antiguos (no hash)
+    # Subidas reanudables abiertas: cupo por IP y total (sesiones y bytes declarados).
+    # Las sesiones sin actividad en SUBIDAS_SESION_HORAS se borran y liberan su cupo.
+    SUBIDAS_SESIONES_POR_IP = int(os.getenv('SUBIDAS_SESIONES_POR_IP', 5))
+    SUBIDAS_BYTES_POR_IP = int(os.getenv('SUBIDAS_BYTES_POR_IP', 50 * 1024 * 1024))
+    SUBIDAS_SESIONES_TOTAL = int(os.getenv('SUBIDAS_SESIONES_TOTAL', 500))
+    SUBIDAS_BYTES_TOTAL = int(os.getenv('SUBIDAS_BYTES_TOTAL', 1024 * 1024 * 1024))
+    SUBIDAS_SESION_HORAS = float(os.getenv('SUBIDAS_SESION_HORAS', 24))
+    
+    # --- BÚSQUEDA ---
+    # 'auto': FULLTEXT nativo en MySQL/PostgreSQL e índice propio en otros (SQLite);
+    # 'indice' o 'nativo' para forzar uno
+    BUSQUEDA_MOTOR = os.getenv('BUSQUEDA_MOTOR', 'auto')
+    
+    # --- TAREAS EN SEGUNDO PLANO ---
+    # 'hilos': trabajadores dentro del proceso web; 'externo': solo con worker.py;
+    # 'sincrono': se ejecutan al confirmar la transacción (pruebas/desarrollo)
+    TAREAS_MODO = os.getenv('TAREAS_MODO', 'hilos')
+    TAREAS_HILOS = int(os.getenv('TAREAS_HILOS', 2))
+    TAREAS_INTERVALO = float(os.getenv('TAREAS_INTERVALO', 2))          # segundos entre sondeos
+    TAREAS_REINTENTO_BASE = float(os.getenv('TAREAS_REINTENTO_BASE', 5))  # backoff: base * 2^(intento-1)
+    TAREAS_REINTENTO_MAX = float(os.getenv('TAREAS_REINTENTO_MAX', 600))
+    TAREAS_TIMEOUT = int(os.getenv('TAREAS_TIMEOUT', 300))              # sin latido más tiempo = trabajador caído
+    TAREAS_RETENCION_HORAS = int(os.getenv('TAREAS_RETENCION_HORAS', 24))
+    
+    # --- MÉTRICAS ---
+    # Latencia, SQL y tamaños por endpoint en /api/metrics (Prometheus) y Server-Timing
+    METRICAS_ACTIVAS = os.getenv('METRICAS_ACTIVAS', 'True').lower() == 'true'
+    METRICAS_SERVER_TIMING = os.getenv('METRICAS_SERVER_TIMING', 'True').lower() == 'true'
+    METRICAS_LENTA_MS = float(os.getenv('METRICAS_LENTA_MS', 500))   # log 'lentas' con las sentencias SQL
+    # Si se define, /api/metrics exige Authorization: Bearer <METRICAS_TOKEN>
+    METRICAS_TOKEN = os.getenv('METRICAS_TOKEN', '')
+    
+    # --- CONTRASEÑAS ---
+    # Método de werkzeug ('scrypt:N:r:p' o 'pbkdf2:sha256:iteraciones'); al cambiarlo
+    # los hashes viejos se recalculan en el siguiente login
+    PASSWORD_METODO = os.getenv('PASSWORD_METODO', 'scrypt:32768:8:1')
+    PASSWORD_SAL = int(os.getenv('PASSWORD_SAL', 16))
+    # Procesos que calculan los hashes (0 = en el hilo de la petición) y cuántos
+    # pueden estar en curso por proceso web; quien espere más de PASSWORD_ESPERA recibe 503
+    PASSWORD_PROCESOS = int(os.getenv('PASSWORD_PROCESOS', 2))
+    PASSWORD_MAX_EN_CURSO = int(os.getenv('PASSWORD_MAX_EN_CURSO', 4))
+    PASSWORD_ESPERA = float(os.getenv('PASSWORD_ESPERA', 3))
+    
+    # --- LÍMITES DE PETICIONES ---
+    # 'local': por proceso; 'redis': compartido (LIMITES_REDIS_URL); 'memoria': pruebas; 'ninguno'
+    LIMITES_BACKEND = os.getenv('LIMITES_BACKEND', 'local')
+    LIMITES_REDIS_URL = os.getenv('LIMITES_REDIS_URL', CACHE_REDIS_URL)
+    LIMITES_MAX_CLAVES = int(os.getenv('LIMITES_MAX_CLAVES', 10000))
+    # Proxies de confianza delante de la app (X-Forwarded-For); 0 = usar la IP de la conexión
+    LIMITES_PROXIES = int(os.getenv('LIMITES_PROXIES', 0))
+    # Reglas por blueprint 'dimension:N/segundos[:ventana]' (ver limites.py)
+    LIMITES_AUTH = os.getenv('LIMITES_AUTH', 'ip:20/60,ip:200/3600:ventana,email:10/300:ventana')
+    
+    # --- NOTIFICACIONES EN VIVO (SSE) ---
+    # 'local': solo las conexiones del mismo proceso; 'redis': entre workers (SSE_REDIS_URL)
+    SSE_BACKEND = os.getenv('SSE_BACKEND', 'local')
+    SSE_REDIS_URL = os.getenv('SSE_REDIS_URL', CACHE_REDIS_URL)
+    # Con gthread cada conexión ocupa un hilo: por omisión la mitad de GUNICORN_THREADS
+    SSE_MAX_CONEXIONES = int(os.getenv('SSE_MAX_CONEXIONES',
+                                       1000 if os.getenv('GUNICORN_WORKER_CLASS') == 'gevent'
+                                       else max(int(os.getenv('GUNICORN_THREADS', 4)) // 2, 1)))
+    SSE_MAX_POR_USUARIO = int(os.getenv('SSE_MAX_POR_USUARIO', 3))
+    SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15))        # segundos entre comentarios ': ping'
+    SSE_DURACION_MAX = float(os.getenv('SSE_DURACION_MAX', 600))  # luego el cliente reconecta (y revalida el token)
+    SSE_REINTENTO_MS = int(os.getenv('SSE_REINTENTO_MS', 5000))
+    # Vida del token de ?token= (POST /api/auth/notificaciones/stream/token): solo abre el stream
+    SSE_TOKEN_TTL = int(os.getenv('SSE_TOKEN_TTL', 60))
+    
+    # --- COMPRESIÓN ---
+    # gzip o brotli (si está instalado el paquete) según Accept-Encoding, para
+    # respuestas de texto de al menos COMPRESION_MIN_BYTES (ver compresion.py)
+    COMPRESION_ACTIVA = os.getenv('COMPRESION_ACTIVA', 'True').lower() == 'true'
+    COMPRESION_MIN_BYTES = int(os.getenv('COMPRESION_MIN_BYTES', 1024))
+    COMPRESION_NIVEL_GZIP = int(os.getenv('COMPRESION_NIVEL_GZIP', 6))       # 1-9
+    COMPRESION_NIVEL_BROTLI = int(os.getenv('COMPRESION_NIVEL_BROTLI', 5))   # 0-11
+    COMPRESION_TIPOS = [t.strip() for t in os.getenv(
+        'COMPRESION_TIPOS', 'application/json,text/plain,text/html,text/css,application/javascript,image/svg+xml'
+    ).split(',') if t.strip()]
     
     # --- SEGURIDAD (JWT) ---
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     JWT_ALGORITHM = 'HS256'
     JWT_EXPIRATION_HOURS = 24
+    # 'db': se consulta el usuario en cada petición; 'claims': el token lleva
+    # id/rol/versión y el usuario sale de la caché (CACHE_BACKEND, TTL propio).
+    # 'claims' exige CACHE_BACKEND=redis: con 'local' la app no arranca
+    AUTH_MODO = os.getenv('AUTH_MODO', 'db')
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 30))
     
     # --- CORS ---
     # Orígenes permitidos - prioriza hardcoded, luego variables de entorno
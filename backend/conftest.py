@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+# Base de datos en memoria para las pruebas (antes de importar config)
+os.environ['DATABASE_URL'] = 'sqlite://'
+os.environ['TAREAS_MODO'] = 'sincrono'
+os.environ['ESQUEMA_AL_INICIAR'] = 'migrar'
+os.environ['PASSWORD_PROCESOS'] = '0'
+os.environ['UPLOAD_FOLDER'] = tempfile.mkdtemp(prefix='uploads_test_')
+
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db, Usuario
+from auth import generate_token
+
+# Scripts manuales que requieren una base de datos o servidor real
+collect_ignore = ['test_db.py', 'test_register.py']
+
+
+@pytest.fixture
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.drop_all(bind_key=None)   # solo la primaria (las réplicas son binds sin tablas propias)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def crear_usuario(app):
+    """Crear un usuario y devolver (usuario, headers con su token)"""
+    def _crear(email='usuario@test.com', rol='usuario', nombre='Usuario'):
+        usuario = Usuario(nombre=nombre, email=email, rol=rol)
+        usuario.set_password('secreto123')
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario, {'Authorization': f'Bearer {generate_token(usuario)}'}
+    return _crear
+
+
+@pytest.fixture
+def contar_consultas(app):
+    """Contar las sentencias SQL ejecutadas durante una llamada"""
+    def _contar(fn, *args, **kwargs):
+        sentencias = []
+
+        def registrar(conn, cursor, statement, parameters, context, executemany):
+            sentencias.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', registrar)
+        try:
+            resultado = fn(*args, **kwargs)
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', registrar)
+        return resultado, sentencias
+    return _contar
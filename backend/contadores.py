@@ -0,0 +1,169 @@
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from models import db, Noticia, Reaccion, ReaccionConteo, Comentario
+
+TIPOS_REACCION = ('like', 'love', 'wow', 'sad', 'angry')
+INCLUIR_VALIDOS = ('reacciones', 'comentarios', 'mi_reaccion')
+
+
+def _columna(tipo):
+    return getattr(ReaccionConteo, f'total_{tipo}')
+
+
+def conteo_vacio():
+    return {'conteo': {t: 0 for t in TIPOS_REACCION}, 'total': 0}
+
+
+def ajustar_reaccion(noticia_id, anterior=None, nuevo=None):
+    """Actualizar los contadores dentro de la transacción actual
+
+    anterior/nuevo son el tipo de reacción antes y después del cambio
+    (None si no había o si se quitó). El UPDATE es relativo (col = col + 1),
+    así dos peticiones concurrentes no se pisan.
+    """
+    if anterior == nuevo:
+        return
+
+    cambios = {}
+    if anterior:
+        cambios[f'total_{anterior}'] = _columna(anterior) - 1
+    if nuevo:
+        cambios[f'total_{nuevo}'] = _columna(nuevo) + 1
+    delta = (nuevo is not None) - (anterior is not None)
+    if delta:
+        cambios['total'] = ReaccionConteo.total + delta
+
+    consulta = ReaccionConteo.query.filter_by(noticia_id=noticia_id)
+    if consulta.update(cambios, synchronize_session=False):
+        return
+
+    # Noticia sin fila de contadores (anterior a esta tabla): crearla desde
+    # la tabla reacciones, que ya incluye el cambio de esta transacción
+    db.session.flush()
+    try:
+        with db.session.begin_nested():
+            db.session.add(ReaccionConteo(noticia_id=noticia_id, **_contar_por_tipo(noticia_id)))
+    except IntegrityError:
+        # Otra petición la creó en paralelo sin ver nuestro cambio
+        consulta.update(cambios, synchronize_session=False)
+
+
+def _contar_por_tipo(noticia_id):
+    filas = db.session.query(Reaccion.tipo, func.count(Reaccion.id))\
+        .filter(Reaccion.noticia_id == noticia_id)\
+        .group_by(Reaccion.tipo).all()
+    valores = {f'total_{t}': 0 for t in TIPOS_REACCION}
+    for tipo, cantidad in filas:
+        valores[f'total_{tipo}'] = cantidad
+    valores['total'] = sum(cantidad for _, cantidad in filas)
+    return valores
+
+
+def resumen_reacciones(noticia_id):
+    """Conteo de reacciones de una noticia con una sola consulta por PK
+
+    Devuelve None si la noticia no existe.
+    """
+    fila = db.session.query(Noticia.id, ReaccionConteo)\
+        .outerjoin(ReaccionConteo, ReaccionConteo.noticia_id == Noticia.id)\
+        .filter(Noticia.id == noticia_id).first()
+
+    if fila is None:
+        return None
+    _, conteo = fila
+    # Sin fila = sin reacciones (la migración 0007 creó las de noticias anteriores)
+    return conteo.to_dict() if conteo else conteo_vacio()
+
+
+def parsear_incluir(valor):
+    """Convertir 'reacciones,comentarios' en una tupla validada"""
+    incluir = tuple(i.strip() for i in (valor or '').split(',') if i.strip())
+    invalidos = [i for i in incluir if i not in INCLUIR_VALIDOS]
+    if invalidos:
+        raise ValueError(f'Valores de incluir inválidos: {invalidos}. Válidos: {list(INCLUIR_VALIDOS)}')
+    return incluir
+
+
+def resumen_interacciones(noticia_ids, usuario=None, incluir=INCLUIR_VALIDOS):
+    """Reacciones, comentarios y reacción propia de varias noticias a la vez
+
+    Una consulta agrupada por dato pedido en `incluir`, sin importar cuántas
+    noticias sean. Devuelve {noticia_id: {...}} solo con las noticias que existen.
+    """
+    noticia_ids = set(noticia_ids)
+    if not noticia_ids:
+        return {}
+
+    # Existencia + contadores de reacciones en la misma consulta
+    filas = db.session.query(Noticia.id, ReaccionConteo)\
+        .outerjoin(ReaccionConteo, ReaccionConteo.noticia_id == Noticia.id)\
+        .filter(Noticia.id.in_(noticia_ids)).all()
+
+    resultado = {}
+    for noticia_id, conteo in filas:
+        datos = resultado[noticia_id] = {}
+        if 'reacciones' in incluir:
+            datos['reacciones'] = conteo.to_dict() if conteo else conteo_vacio()
+
+    if 'comentarios' in incluir:
+        totales = dict(
+            db.session.query(Comentario.noticia_id, func.count(Comentario.id))
+            .filter(Comentario.noticia_id.in_(resultado.keys()))
+            .group_by(Comentario.noticia_id).all()
+        )
+        for noticia_id, datos in resultado.items():
+            datos['total_comentarios'] = totales.get(noticia_id, 0)
+
+    if 'mi_reaccion' in incluir:
+        propias = {}
+        if usuario is not None:
+            propias = dict(
+                db.session.query(Reaccion.noticia_id, Reaccion.tipo)
+                .filter(Reaccion.usuario_id == usuario.id,
+                        Reaccion.noticia_id.in_(resultado.keys())).all()
+            )
+        for noticia_id, datos in resultado.items():
+            datos['mi_reaccion'] = propias.get(noticia_id)
+
+    return resultado
+
+
+def verificar_contadores(reparar=False):
+    """Recalcular los contadores desde la tabla reacciones y reportar diferencias
+
+    Devuelve una lista de {'noticia_id', 'esperado', 'actual'} con cada noticia
+    cuyo contador no coincide. Con reparar=True se corrigen y se confirma.
+    """
+    esperados = {}
+    filas = db.session.query(Reaccion.noticia_id, Reaccion.tipo, func.count(Reaccion.id))\
+        .group_by(Reaccion.noticia_id, Reaccion.tipo).all()
+    for noticia_id, tipo, cantidad in filas:
+        valores = esperados.setdefault(noticia_id, conteo_vacio())
+        valores['conteo'][tipo] = cantidad
+        valores['total'] += cantidad
+
+    actuales = {c.noticia_id: c for c in ReaccionConteo.query.all()}
+    ids_noticias = {i for (i,) in db.session.query(Noticia.id).all()}
+
+    diferencias = []
+    for noticia_id in sorted(ids_noticias):
+        esperado = esperados.get(noticia_id, conteo_vacio())
+        fila = actuales.get(noticia_id)
+        actual = fila.to_dict() if fila else None
+
+        # Una noticia sin reacciones puede no tener fila todavía
+        if actual == esperado or (actual is None and esperado['total'] == 0):
+            continue
+
+        diferencias.append({'noticia_id': noticia_id, 'esperado': esperado, 'actual': actual})
+        if reparar:
+            if fila is None:
+                fila = ReaccionConteo(noticia_id=noticia_id)
+                db.session.add(fila)
+            for tipo, cantidad in esperado['conteo'].items():
+                setattr(fila, f'total_{tipo}', cantidad)
+            fila.total = esperado['total']
+
+    if reparar:
+        db.session.commit()
+    return diferencias
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+# Hash de contraseñas fuera de los hilos que atienden peticiones.
+#
+# scrypt/pbkdf2 son CPU puro a propósito: en línea, una ráfaga de logins
+# ocupa el GIL y los workers, y el feed se queda esperando. Aquí el cálculo
+# corre en un pool de PASSWORD_PROCESOS procesos y a lo sumo
+# PASSWORD_MAX_EN_CURSO hashes por proceso web están en curso; si no hay
+# lugar en PASSWORD_ESPERA segundos se responde 503 (HasherOcupado) en vez
+# de encolar sin límite.
+#
+# Los parámetros (PASSWORD_METODO) se pueden cambiar: los hashes con otros
+# parámetros se siguen aceptando y se recalculan en el siguiente login.
+
+METODO_POR_OMISION = 'scrypt:32768:8:1'
+
+
+class HasherOcupado(Exception):
+    """No hubo lugar para hashear a tiempo (la ruta responde 503)"""
+
+
+_lock = threading.Lock()
+_estado = {'pool': None, 'pid': None, 'semaforo': None}
+_stats = {'hashes': 0, 'verificaciones': 0, 'rechazadas': 0, 'segundos': 0.0, 'en_curso': 0}
+
+
+def _config(clave, omision):
+    return current_app.config.get(clave, omision) if has_app_context() else omision
+
+
+def _recursos():
+    """(pool o None, semáforo) de este proceso (se recrean tras el fork de gunicorn)"""
+    with _lock:
+        if _estado['pid'] != os.getpid():
+            procesos = _config('PASSWORD_PROCESOS', 0)
+            _estado['pool'] = ProcessPoolExecutor(
+                max_workers=procesos, mp_context=multiprocessing.get_context('spawn')) if procesos > 0 else None
+            _estado['semaforo'] = threading.BoundedSemaphore(_config('PASSWORD_MAX_EN_CURSO', max(procesos, 1) * 2))
+            _estado['pid'] = os.getpid()
+        return _estado['pool'], _estado['semaforo']
+
+
+def _ejecutar(funcion, *args):
+    pool, semaforo = _recursos()
+    if not semaforo.acquire(timeout=_config('PASSWORD_ESPERA', 3)):
+        with _lock:
+            _stats['rechazadas'] += 1
+        raise HasherOcupado()
+
+    inicio = time.perf_counter()
+    with _lock:
+        _stats['en_curso'] += 1
+    try:
+        return pool.submit(funcion, *args).result() if pool else funcion(*args)
+    finally:
+        semaforo.release()
+        with _lock:
+            _stats['en_curso'] -= 1
+            _stats['segundos'] += time.perf_counter() - inicio
+
+
+def metodo():
+    return _config('PASSWORD_METODO', METODO_POR_OMISION)
+
+
+def hashear(password):
+    """Hash con los parámetros configurados; HasherOcupado si no hay lugar"""
+    resultado = _ejecutar(generate_password_hash, password, metodo(), _config('PASSWORD_SAL', 16))
+    with _lock:
+        _stats['hashes'] += 1
+    return resultado
+
+
+def _completo(metodo):
+    """Método con los valores por omisión que completa werkzeug ('scrypt' -> 'scrypt:32768:8:1'),
+    que es como queda escrito en el hash"""
+    nombre, *args = metodo.split(':')
+    if nombre == 'scrypt' and not args:
+        args = ['32768', '8', '1']
+    elif nombre == 'pbkdf2':
+        args = (args or ['sha256'])[:2]
+        if len(args) == 1:
+            args.append(str(DEFAULT_PBKDF2_ITERATIONS))
+    return ':'.join([nombre, *args])
+
+
+def necesita_rehash(password_hash):
+    """El hash se hizo con otros parámetros ('pbkdf2:sha256:600000$<sal>$...' vs PASSWORD_METODO y PASSWORD_SAL)"""
+    partes = password_hash.split('$')
+    if len(partes) != 3:
+        return True
+    return partes[0] != _completo(metodo()) or len(partes[1]) != _config('PASSWORD_SAL', 16)
+
+
+def verificar(password_hash, password):
+    """True si la contraseña coincide; HasherOcupado si no hay lugar"""
+    resultado = _ejecutar(check_password_hash, password_hash, password)
+    with _lock:
+        _stats['verificaciones'] += 1
+    return resultado
+
+
+def cerrar():
+    """Terminar el pool (se vuelve a crear con la configuración actual al usarse)"""
+    with _lock:
+        if _estado['pool'] is not None:
+            _estado['pool'].shutdown(wait=True)
+        _estado.update(pool=None, pid=None, semaforo=None)
+
+
+def estadisticas():
+    with _lock:
+        operaciones = _stats['hashes'] + _stats['verificaciones']
+        return {
+            **_stats,
+            'metodo': metodo(),
+            'procesos': _config('PASSWORD_PROCESOS', 0),
+            'max_en_curso': _config('PASSWORD_MAX_EN_CURSO', 0),
+            'promedio_ms': round(_stats['segundos'] / operaciones * 1000, 2) if operaciones else 0,
+        }
@@ -0,0 +1,29 @@
+# Configuración de gunicorn (se carga sola al ejecutar gunicorn en esta carpeta)
+# El pool de la base de datos se dimensiona con las mismas variables (config.py)
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Con gthread cada conexión SSE abierta ocupa uno de los `threads` hilos, y
+# SSE_MAX_CONEXIONES deja por omisión solo la mitad para el stream (2 por
+# worker). Para notificaciones en vivo con muchos usuarios:
+#   GUNICORN_WORKER_CLASS=gevent   (gevent está en requirements.txt)
+#   SSE_BACKEND=redis              (con más de un worker, ver tiempo_real.py)
+# gunicorn parchea el worker al iniciarlo; PyMySQL y redis-py son Python puro
+# y ceden en cada E/S. El stream no retiene la conexión a la base de datos
+# (la toma un momento en cada evento), así que DB_POOL_SIZE no tiene que
+# crecer con las conexiones SSE. Con gevent SSE_MAX_CONEXIONES pasa a 1000
+# por worker (config.py).
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def when_ready(server):
+    from config import Config
+    if Config.SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        return
+    maximo = workers * (Config.DB_POOL_SIZE + Config.DB_MAX_OVERFLOW)
+    server.log.info('Conexiones a la base de datos: hasta %s (%s workers x (%s + %s overflow))',
+                    maximo, workers, Config.DB_POOL_SIZE, Config.DB_MAX_OVERFLOW)
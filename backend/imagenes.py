@@ -0,0 +1,140 @@
+import json
+import os
+import shutil
+from flask import current_app
+from models import db, Imagen
+import archivos
+from tareas import tarea
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # sin Pillow se sirve solo el original
+    Image = None
+
+# Procesamiento de imágenes subidas: el tipo se decide por los bytes del
+# archivo (no por la extensión), se eliminan los metadatos (EXIF, GPS...) y
+# se generan variantes por ancho más una copia WebP de cada una para que el
+# feed no descargue fotos de varios MB en tarjetas de 400px. Los nombres
+# y la espera en pendientes/ están en archivos.py.
+
+FIRMAS = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+EXTENSIONES = {'jpeg': 'jpg', 'png': 'png', 'gif': 'gif', 'webp': 'webp'}
+BYTES_FIRMA = 12
+
+
+def detectar_tipo(cabecera):
+    """Formato real según los primeros bytes, None si no es una imagen soportada"""
+    for firma, tipo in FIRMAS:
+        if cabecera.startswith(firma):
+            return tipo
+    if cabecera[:4] == b'RIFF' and cabecera[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def _guardar(imagen, ruta, formato, calidad):
+    """Escribir sin metadatos (no se pasa exif/icc) y reemplazar de forma atómica"""
+    temporal = ruta + '.tmp'
+    if formato == 'jpeg':
+        imagen.convert('RGB').save(temporal, 'JPEG', quality=calidad, optimize=True, progressive=True)
+    elif formato == 'png':
+        imagen.save(temporal, 'PNG', optimize=True)
+    elif formato == 'webp':
+        imagen.save(temporal, 'WEBP', quality=calidad, method=4)
+    else:
+        imagen.save(temporal, formato.upper())
+    os.replace(temporal, ruta)
+
+
+def procesar(origen, ruta, formato, anchos, calidad=82, max_pixeles=40_000_000):
+    """Escribir en `ruta` la versión limpia de `origen` y las variantes junto a ella
+
+    Devuelve {'ancho', 'alto', 'variantes': [{'archivo', 'ancho', 'formato'}]};
+    ValueError si la imagen está corrupta o es demasiado grande.
+    """
+    base, _ = os.path.splitext(ruta)
+    try:
+        with Image.open(origen) as original:
+            if original.width * original.height > max_pixeles:
+                raise ValueError('Imagen demasiado grande')
+
+            if getattr(original, 'is_animated', False):
+                # GIF animado: redimensionar perdería la animación, se deja tal cual
+                shutil.copyfile(origen, ruta + '.tmp')
+                os.replace(ruta + '.tmp', ruta)
+                return {'ancho': original.width, 'alto': original.height, 'variantes': [
+                    {'archivo': os.path.basename(ruta), 'ancho': original.width, 'formato': formato}]}
+
+            imagen = ImageOps.exif_transpose(original)   # aplicar la orientación antes de perder el EXIF
+            imagen.load()
+            if imagen.mode not in ('RGB', 'RGBA', 'L'):
+                imagen = imagen.convert('RGBA')
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f'Imagen inválida: {e}')
+
+    if formato == 'gif':
+        formato_salida = 'png'   # las variantes de un GIF estático se guardan como PNG
+    else:
+        formato_salida = formato
+
+    _guardar(imagen, ruta, formato, calidad)
+    variantes = [{'archivo': os.path.basename(ruta), 'ancho': imagen.width, 'formato': formato}]
+    if formato != 'webp':
+        _guardar(imagen, base + '.webp', 'webp', calidad)
+        variantes.append({'archivo': os.path.basename(base) + '.webp', 'ancho': imagen.width, 'formato': 'webp'})
+
+    for ancho in sorted(set(anchos)):
+        if ancho >= imagen.width:
+            continue
+        alto = max(1, round(imagen.height * ancho / imagen.width))
+        reducida = imagen.resize((ancho, alto), Image.LANCZOS)
+        for fmt in dict.fromkeys((formato_salida, 'webp')):
+            archivo = f'{os.path.basename(base)}_{ancho}.{EXTENSIONES[fmt]}'
+            _guardar(reducida, os.path.join(os.path.dirname(ruta), archivo), fmt, calidad)
+            variantes.append({'archivo': archivo, 'ancho': ancho, 'formato': fmt})
+
+    return {'ancho': imagen.width, 'alto': imagen.height, 'variantes': variantes}
+
+
+@tarea('procesar_imagen', max_intentos=3)
+def procesar_imagen(imagen_id):
+    """Tarea: generar las variantes de una imagen subida"""
+    imagen = db.session.get(Imagen, imagen_id)
+    if imagen is None or imagen.estado != 'pendiente':
+        return
+
+    config = current_app.config
+    nombre = os.path.basename(imagen.url)
+    origen, ruta = archivos.ruta_pendiente(nombre), archivos.ruta(nombre)
+    if not os.path.exists(origen):
+        imagen.estado = 'lista' if os.path.exists(ruta) else 'error'
+        return
+
+    if Image is None:
+        os.replace(origen, ruta)
+        imagen.estado = 'lista'
+        return
+
+    try:
+        resultado = procesar(origen, ruta, imagen.formato, config['IMAGENES_ANCHOS'],
+                             config['IMAGENES_CALIDAD'], config['IMAGENES_MAX_PIXELES'])
+    except ValueError as e:
+        # Reintentar no arregla un archivo corrupto: el original (con sus metadatos) se borra
+        current_app.logger.warning('Imagen %s descartada: %s', imagen.url, e)
+        imagen.estado = 'error'
+        os.remove(origen)
+        return
+    os.remove(origen)
+
+    carpeta = os.path.dirname(imagen.url)
+    imagen.ancho, imagen.alto = resultado['ancho'], resultado['alto']
+    imagen.variantes = json.dumps([
+        {'url': f"{carpeta}/{v['archivo']}", 'ancho': v['ancho'], 'formato': v['formato']}
+        for v in resultado['variantes']
+    ])
+    imagen.estado = 'lista'
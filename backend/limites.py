@@ -0,0 +1,297 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, jsonify
+
+try:
+    import redis
+except ImportError:  # opcional: solo para LIMITES_BACKEND=redis
+    redis = None
+
+# Límites de peticiones por IP y por email para los endpoints caros
+# (login y registro: cada intento es un hash de contraseña).
+#
+# Las reglas se configuran por blueprint en LIMITES_<BLUEPRINT>, p. ej.
+# LIMITES_AUTH = 'ip:10/60,email:5/300:ventana':
+#   - 'ip:10/60' es una cubeta de tokens: ráfagas de hasta 10 y se recarga a
+#     10 por minuto
+#   - ':ventana' usa una ventana deslizante (aproximada con dos ventanas fijas):
+#     a lo sumo 5 en cualquier intervalo de 300 segundos
+# El decorador @limitado se evalúa antes que la vista: una petición rechazada
+# (429 con Retry-After) no toca la base de datos ni el pool de contraseñas.
+#
+# El estado vive en el backend (LIMITES_BACKEND): 'local' por proceso, 'redis'
+# compartido entre procesos, 'memoria' (sustituto de redis para pruebas) o
+# 'ninguno'.
+
+
+class Regla:
+    def __init__(self, texto):
+        """'dimension:N/segundos[:ventana]'"""
+        partes = texto.strip().split(':')
+        self.dimension = partes[0]
+        cantidad, segundos = partes[1].split('/')
+        self.cantidad, self.segundos = int(cantidad), float(segundos)
+        self.tipo = partes[2] if len(partes) > 2 else 'cubeta'
+        if self.dimension not in DIMENSIONES or self.tipo not in ('cubeta', 'ventana'):
+            raise ValueError(f'Regla de límite inválida: {texto}')
+        self.nombre = f"{self.dimension}:{cantidad}/{segundos}" + (':ventana' if self.tipo == 'ventana' else '')
+
+
+def reglas(texto):
+    return [Regla(r) for r in texto.split(',') if r.strip()]
+
+
+# ─── ALGORITMOS ──────────────────────────────────────────────────────────────
+# Funciones puras sobre el estado guardado: (estado nuevo, segundos de espera);
+# espera 0 = permitido. redis ejecuta lo mismo en Lua.
+
+def cubeta(estado, ahora, capacidad, por_segundo):
+    tokens, ultimo = estado or (capacidad, ahora)
+    tokens = min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+    if tokens >= 1:
+        return (tokens - 1, ahora), 0
+    return (tokens, ahora), (1 - tokens) / por_segundo
+
+
+def ventana(estado, ahora, limite, segundos):
+    numero = int(ahora // segundos)
+    guardada, actual, anterior = estado or (numero, 0, 0)
+    if guardada != numero:
+        actual, anterior = 0, (actual if guardada == numero - 1 else 0)
+
+    transcurrido = ahora - numero * segundos
+    peso = 1 - transcurrido / segundos
+    if anterior * peso + actual + 1 <= limite:
+        return (numero, actual + 1, anterior), 0
+    if actual + 1 > limite or not anterior:
+        espera = segundos - transcurrido   # hasta la siguiente ventana
+    else:
+        # cuando el peso de la ventana anterior deje lugar para una más
+        espera = segundos * (1 - (limite - 1 - actual) / anterior) - transcurrido
+    return (numero, actual, anterior), max(espera, 0.001)
+
+
+# ─── BACKENDS ────────────────────────────────────────────────────────────────
+
+class BackendLimites:
+    """Interfaz: consumir una petición de la regla; devuelve los segundos de espera"""
+
+    def consumir(self, clave, regla):
+        raise NotImplementedError
+
+    def info(self):
+        return {}
+
+
+def _aplicar(estado, ahora, regla):
+    if regla.tipo == 'cubeta':
+        return cubeta(estado, ahora, regla.cantidad, regla.cantidad / regla.segundos)
+    return ventana(estado, ahora, regla.cantidad, regla.segundos)
+
+
+class LimitesLocal(BackendLimites):
+    """Estado en el proceso (cada trabajador web cuenta por su lado)
+
+    Acotado a max_claves: las más viejas se olvidan (un atacante que rota
+    emails no llena la memoria; a lo sumo recupera sus intentos).
+    """
+
+    def __init__(self, max_claves=10000):
+        self.max_claves = max_claves
+        self._estados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, clave, regla):
+        with self._lock:
+            estado, espera = _aplicar(self._estados.get(clave), time.monotonic(), regla)
+            self._estados[clave] = estado
+            self._estados.move_to_end(clave)
+            while len(self._estados) > self.max_claves:
+                self._estados.popitem(last=False)
+        return espera
+
+    def info(self):
+        return {'tipo': 'local', 'claves': len(self._estados), 'max_claves': self.max_claves}
+
+
+class LimitesMemoriaCompartida(BackendLimites):
+    """Sustituto de redis para pruebas: un almacén por proceso compartido por todas las instancias"""
+
+    _almacen = {}
+    _lock = threading.Lock()
+
+    def consumir(self, clave, regla):
+        with self._lock:
+            estado, espera = _aplicar(self._almacen.get(clave), time.time(), regla)
+            self._almacen[clave] = estado
+        return espera
+
+    @classmethod
+    def vaciar(cls):
+        with cls._lock:
+            cls._almacen.clear()
+
+    def info(self):
+        return {'tipo': 'memoria', 'claves': len(self._almacen)}
+
+
+# KEYS[1]: clave; ARGV: capacidad o límite, segundos. Devuelve la espera en ms.
+_LUA_CUBETA = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacidad, segundos = tonumber(ARGV[1]), tonumber(ARGV[2])
+local por_segundo = capacidad / segundos
+local estado = redis.call('HMGET', KEYS[1], 'tokens', 'ultimo')
+local tokens = tonumber(estado[1]) or capacidad
+local ultimo = tonumber(estado[2]) or ahora
+tokens = math.min(capacidad, tokens + (ahora - ultimo) * por_segundo)
+local espera = 0
+if tokens >= 1 then tokens = tokens - 1 else espera = (1 - tokens) / por_segundo end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ultimo', tostring(ahora))
+redis.call('PEXPIRE', KEYS[1], math.ceil(segundos * 1000))
+return math.ceil(espera * 1000)
+"""
+
+_LUA_VENTANA = """
+local t = redis.call('TIME')
+local ahora = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local limite, segundos = tonumber(ARGV[1]), tonumber(ARGV[2])
+local numero = math.floor(ahora / segundos)
+local actual = tonumber(redis.call('GET', KEYS[1] .. ':' .. numero)) or 0
+local anterior = tonumber(redis.call('GET', KEYS[1] .. ':' .. (numero - 1))) or 0
+local transcurrido = ahora - numero * segundos
+if anterior * (1 - transcurrido / segundos) + actual + 1 <= limite then
+  redis.call('INCR', KEYS[1] .. ':' .. numero)
+  redis.call('PEXPIRE', KEYS[1] .. ':' .. numero, math.ceil(segundos * 2000))
+  return 0
+end
+local espera = segundos - transcurrido
+if actual + 1 <= limite and anterior > 0 then
+  espera = segundos * (1 - (limite - 1 - actual) / anterior) - transcurrido
+end
+return math.max(math.ceil(espera * 1000), 1)
+"""
+
+
+class LimitesRedis(BackendLimites):
+    """Backend compartido entre procesos (requiere el paquete redis)"""
+
+    def __init__(self, url, prefijo='webcomunitaria:limite:'):
+        if redis is None:
+            raise RuntimeError('LIMITES_BACKEND=redis requiere instalar el paquete redis')
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+        self._scripts = {'cubeta': self.cliente.register_script(_LUA_CUBETA),
+                         'ventana': self.cliente.register_script(_LUA_VENTANA)}
+
+    def consumir(self, clave, regla):
+        espera_ms = self._scripts[regla.tipo](keys=[self.prefijo + clave], args=[regla.cantidad, regla.segundos])
+        return int(espera_ms) / 1000
+
+    def info(self):
+        return {'tipo': 'redis'}
+
+
+# ─── LIMITADOR ───────────────────────────────────────────────────────────────
+
+def ip_cliente():
+    """IP del cliente; con LIMITES_PROXIES=N se toma la que agregó el N-ésimo proxy de confianza"""
+    proxies = current_app.config['LIMITES_PROXIES']
+    reenviadas = [ip.strip() for ip in request.headers.get('X-Forwarded-For', '').split(',') if ip.strip()]
+    if proxies and len(reenviadas) >= proxies:
+        return reenviadas[-proxies]
+    return request.remote_addr or 'desconocida'
+
+
+def _email():
+    datos = request.get_json(silent=True)
+    email = datos.get('email') if isinstance(datos, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+DIMENSIONES = {'ip': ip_cliente, 'email': _email}
+
+
+class Limitador:
+    def __init__(self, backend):
+        self.backend = backend
+        self._reglas = {}
+        self._stats = {}   # (blueprint, regla) -> [permitidas, rechazadas]
+        self._lock = threading.Lock()
+
+    def reglas_de(self, blueprint):
+        if blueprint not in self._reglas:
+            self._reglas[blueprint] = reglas(current_app.config.get(f'LIMITES_{(blueprint or "").upper()}', ''))
+        return self._reglas[blueprint]
+
+    def _contar(self, blueprint, regla, rechazada):
+        with self._lock:
+            self._stats.setdefault((blueprint, regla.nombre), [0, 0])[rechazada] += 1
+
+    def verificar(self, blueprint, endpoint):
+        """Segundos que hay que esperar (0 si la petición pasa)
+
+        Las reglas se consumen en orden y se detiene en la primera que
+        rechaza: quien agota su IP no gasta los intentos de un email ajeno.
+        """
+        for regla in self.reglas_de(blueprint):
+            valor = DIMENSIONES[regla.dimension]()
+            if valor is None:
+                continue
+            espera = self.backend.consumir(f'{endpoint}|{regla.nombre}|{valor}', regla)
+            self._contar(blueprint, regla, espera > 0)
+            if espera > 0:
+                return espera
+        return 0
+
+    def estadisticas(self):
+        with self._lock:
+            reglas_stats = [{'blueprint': b, 'regla': r, 'permitidas': p, 'rechazadas': x}
+                            for (b, r), (p, x) in sorted(self._stats.items())]
+        return {'backend': self.backend.info(), 'reglas': reglas_stats}
+
+
+class SinLimites(Limitador):
+    """LIMITES_BACKEND=ninguno"""
+
+    def __init__(self):
+        super().__init__(BackendLimites())
+
+    def verificar(self, blueprint, endpoint):
+        return 0
+
+
+def crear_limitador(config):
+    tipo = config['LIMITES_BACKEND']
+    if tipo == 'ninguno':
+        return SinLimites()
+    if tipo == 'local':
+        return Limitador(LimitesLocal(config['LIMITES_MAX_CLAVES']))
+    if tipo == 'redis':
+        return Limitador(LimitesRedis(config['LIMITES_REDIS_URL']))
+    if tipo == 'memoria':
+        return Limitador(LimitesMemoriaCompartida())
+    raise ValueError(f'LIMITES_BACKEND desconocido: {tipo}')
+
+
+def obtener_limitador():
+    extensiones = current_app.extensions
+    if 'limites' not in extensiones:
+        extensiones['limites'] = crear_limitador(current_app.config)
+    return extensiones['limites']
+
+
+def limitado(f):
+    """Aplicar las reglas LIMITES_<BLUEPRINT> antes de la vista (429 si se exceden)"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        espera = obtener_limitador().verificar(request.blueprint, request.endpoint)
+        if espera > 0:
+            segundos = math.ceil(espera)
+            return jsonify({'detail': f'Demasiados intentos, espera {segundos} segundos'}), 429, \
+                {'Retry-After': str(segundos)}
+        return f(*args, **kwargs)
+    return decorated
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Eliminar uploads que ya no usan noticias.imagen, eventos.imagen ni usuarios.avatar
+(con sus variantes y filas de la tabla imagenes)
+Ejecutar: python limpiar_uploads.py [--horas-gracia 24] [--borrar]
+"""
+import sys
+import argparse
+
+from app import create_app
+from archivos import limpiar
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recolector de uploads sin referencias')
+    parser.add_argument('--horas-gracia', type=float, default=24,
+                        help='No tocar archivos más nuevos (subidos para una noticia aún sin publicar)')
+    parser.add_argument('--borrar', action='store_true', help='Borrar de verdad (sin esto solo lista)')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        archivos, total, filas = limpiar(args.horas_gracia, borrar=args.borrar)
+
+    for archivo in archivos:
+        print(f"🗑️  {archivo}")
+
+    if not archivos and not filas:
+        print("✅ No hay uploads huérfanos")
+    elif args.borrar:
+        print(f"✅ Eliminados {len(archivos)} archivos ({total / 1e6:.2f} MB) y {filas} registros de imágenes")
+    else:
+        print(f"⚠️  {len(archivos)} archivos ({total / 1e6:.2f} MB) y {filas} registros sin usar (usa --borrar)")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
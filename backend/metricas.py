@@ -0,0 +1,317 @@
+import bisect
+import json
+import logging
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Métricas por petición: latencia, consultas SQL (cantidad y tiempo, con
+# eventos del motor), tamaño de respuesta y códigos de estado por endpoint.
+# Se publican en formato Prometheus en /api/metrics junto con el estado de
+# la cola de tareas, el pool, la caché y las réplicas; cada respuesta lleva
+# además un header Server-Timing.
+#
+# Las peticiones que pasan de METRICAS_LENTA_MS se registran como JSON en
+# el logger 'lentas' con sus sentencias SQL.
+#
+# Los contadores son por proceso: con varios workers de gunicorn Prometheus
+# ve el de quien atiende cada scrape (sumar con la etiqueta de instancia).
+
+PREFIJO = 'webcomunitaria'
+LIMITES_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+LIMITES_CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+LIMITES_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+MAX_SENTENCIAS_LOG = 50
+
+logger_lentas = logging.getLogger('lentas')
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.series = {}   # etiquetas -> [conteo por cubeta..., +Inf, suma]
+
+    def observar(self, etiquetas, valor):
+        serie = self.series.get(etiquetas)
+        if serie is None:
+            serie = self.series[etiquetas] = [0] * (len(self.limites) + 1) + [0.0]
+        serie[bisect.bisect_left(self.limites, valor)] += 1
+        serie[-1] += valor
+
+
+class Metricas:
+    """Registro de métricas HTTP del proceso (seguro entre hilos)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duracion = Histograma(LIMITES_DURACION)
+        self.sql_segundos = Histograma(LIMITES_DURACION)
+        self.consultas = Histograma(LIMITES_CONSULTAS)
+        self.bytes = Histograma(LIMITES_BYTES)
+        self.respuestas = {}   # (endpoint, método, estado) -> n
+
+    def registrar(self, endpoint, metodo, estado, duracion, consultas, sql_segundos, tamano):
+        etiquetas = (endpoint, metodo)
+        with self._lock:
+            self.duracion.observar(etiquetas, duracion)
+            self.consultas.observar(etiquetas, consultas)
+            self.sql_segundos.observar(etiquetas, sql_segundos)
+            if tamano is not None:
+                self.bytes.observar(etiquetas, tamano)
+            clave = (endpoint, metodo, str(estado))
+            self.respuestas[clave] = self.respuestas.get(clave, 0) + 1
+
+
+def obtener_metricas():
+    return current_app.extensions.setdefault('metricas', Metricas())
+
+
+# ─── SQL POR PETICIÓN ────────────────────────────────────────────────────────
+# Escuchando Engine se cuentan la primaria y las réplicas
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _antes_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metricas_inicio', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _despues_de_sentencia(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get('metricas_inicio')
+    if not inicios:
+        return
+    duracion = time.perf_counter() - inicios.pop()
+    if not has_request_context() or 'metricas_sql' not in g:
+        return
+    sql = g.metricas_sql
+    sql['consultas'] += 1
+    sql['segundos'] += duracion
+    if len(sql['sentencias']) < MAX_SENTENCIAS_LOG:
+        sql['sentencias'].append((statement, duracion))
+
+
+# ─── MIDDLEWARE ──────────────────────────────────────────────────────────────
+
+def _iniciar():
+    g.metricas_inicio = time.perf_counter()
+    g.metricas_sql = {'consultas': 0, 'segundos': 0.0, 'sentencias': []}
+
+
+def _finalizar(response):
+    inicio = g.pop('metricas_inicio', None)
+    sql = g.pop('metricas_sql', None)
+    if inicio is None:
+        return response
+
+    duracion = time.perf_counter() - inicio
+    endpoint = request.url_rule.endpoint if request.url_rule else 'sin_ruta'
+    tamano = response.calculate_content_length() if not response.is_streamed else response.content_length
+    obtener_metricas().registrar(endpoint, request.method, response.status_code, duracion,
+                                 sql['consultas'], sql['segundos'], tamano)
+
+    config = current_app.config
+    if config['METRICAS_SERVER_TIMING']:
+        response.headers.add('Server-Timing', f"app;dur={duracion * 1000:.1f}")
+        response.headers.add('Server-Timing',
+                             f"db;dur={sql['segundos'] * 1000:.1f};desc=\"{sql['consultas']} consultas\"")
+
+    if duracion * 1000 >= config['METRICAS_LENTA_MS']:
+        logger_lentas.warning(json.dumps({
+            'evento': 'peticion_lenta',
+            'metodo': request.method,
+            'ruta': request.full_path.rstrip('?'),
+            'endpoint': endpoint,
+            'estado': response.status_code,
+            'duracion_ms': round(duracion * 1000, 1),
+            'consultas': sql['consultas'],
+            'sql_ms': round(sql['segundos'] * 1000, 1),
+            'bytes': tamano,
+            'sentencias': [{'sql': s[:500], 'ms': round(d * 1000, 2)} for s, d in sql['sentencias']],
+        }, ensure_ascii=False))
+    return response
+
+
+def configurar(app):
+    """Registrar el middleware (antes que los demás after_request: así mide la respuesta final)"""
+    if not app.config['METRICAS_ACTIVAS']:
+        return
+    app.before_request(_iniciar)
+    app.after_request(_finalizar)
+
+
+# ─── FORMATO PROMETHEUS ──────────────────────────────────────────────────────
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ''
+    pares = []
+    for nombre, valor in zip(nombres, valores):
+        valor = str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pares.append(f'{nombre}="{valor}"')
+    return '{' + ','.join(pares) + '}'
+
+
+def _numero(valor):
+    if valor is None:
+        return 'NaN'
+    if isinstance(valor, bool):
+        return '1' if valor else '0'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Exportador:
+    def __init__(self):
+        self.lineas = []
+
+    def metrica(self, nombre, tipo, ayuda, series, nombres=()):
+        """series: [(valores de etiquetas, valor)]"""
+        nombre = f'{PREFIJO}_{nombre}'
+        self.lineas.append(f'# HELP {nombre} {ayuda}')
+        self.lineas.append(f'# TYPE {nombre} {tipo}')
+        for valores, valor in series:
+            self.lineas.append(f'{nombre}{_etiquetas(nombres, valores)} {_numero(valor)}')
+
+    def histograma(self, nombre, ayuda, limites, series, nombres=()):
+        """series: {valores de etiquetas: [conteo por cubeta..., +Inf, suma]}"""
+        nombre = f'{PREFIJO}_{nombre}'
+        self.lineas.append(f'# HELP {nombre} {ayuda}')
+        self.lineas.append(f'# TYPE {nombre} histogram')
+        for valores, serie in sorted(series.items()):
+            acumulado = 0
+            for limite, conteo in zip(list(limites) + ['+Inf'], serie[:-1]):
+                acumulado += conteo
+                etiquetas = _etiquetas(tuple(nombres) + ('le',), tuple(valores) + (limite,))
+                self.lineas.append(f'{nombre}_bucket{etiquetas} {acumulado}')
+            self.lineas.append(f'{nombre}_sum{_etiquetas(nombres, valores)} {_numero(serie[-1])}')
+            self.lineas.append(f'{nombre}_count{_etiquetas(nombres, valores)} {acumulado}')
+
+    def texto(self):
+        return '\n'.join(self.lineas) + '\n'
+
+
+def _exportar_http(salida, metricas):
+    with metricas._lock:
+        duracion = {k: list(v) for k, v in metricas.duracion.series.items()}
+        consultas = {k: list(v) for k, v in metricas.consultas.series.items()}
+        sql = {k: list(v) for k, v in metricas.sql_segundos.series.items()}
+        tamanos = {k: list(v) for k, v in metricas.bytes.series.items()}
+        respuestas = sorted(metricas.respuestas.items())
+
+    etiquetas = ('endpoint', 'metodo')
+    salida.histograma('http_duracion_segundos', 'Latencia de las peticiones', LIMITES_DURACION, duracion, etiquetas)
+    salida.histograma('http_consultas_sql', 'Sentencias SQL por petición', LIMITES_CONSULTAS, consultas, etiquetas)
+    salida.histograma('http_sql_segundos', 'Tiempo en SQL por petición', LIMITES_DURACION, sql, etiquetas)
+    salida.histograma('http_respuesta_bytes', 'Tamaño de las respuestas', LIMITES_BYTES, tamanos, etiquetas)
+    salida.metrica('http_respuestas_total', 'counter', 'Respuestas por código de estado',
+                   respuestas, ('endpoint', 'metodo', 'estado'))
+
+
+def _exportar_tareas(salida):
+    import tareas
+    stats = tareas.estadisticas()
+    salida.metrica('tareas', 'gauge', 'Tareas por estado',
+                   [((e,), stats[e]) for e in ('pendientes', 'en_proceso', 'completadas', 'fallidas')], ('estado',))
+    salida.metrica('tareas_espera_max_segundos', 'gauge', 'Antigüedad de la tarea disponible más vieja',
+                   [((), stats['espera_max_segundos'])])
+    salida.metrica('tareas_latencia_promedio_segundos', 'gauge', 'Espera promedio hasta empezar (muestra reciente)',
+                   [((), stats['latencia_promedio_segundos'])])
+
+
+def _exportar_pool(salida, nombre_motor, pool):
+    from conexiones import LIMITES_ESPERA
+    if 'checkouts' not in pool:
+        return
+    motor = (nombre_motor,)
+    for clave, tipo, ayuda in (
+        ('en_uso', 'gauge', 'Conexiones prestadas'),
+        ('disponibles', 'gauge', 'Conexiones libres en el pool'),
+        ('tamano', 'gauge', 'Tamaño configurado del pool'),
+        ('saturacion', 'gauge', 'Conexiones en uso / capacidad'),
+        ('timeouts', 'counter', 'Peticiones sin conexión dentro de DB_POOL_TIMEOUT'),
+    ):
+        salida.metrica(f'pool_{clave}', tipo, ayuda, [(motor, pool[clave])], ('motor',))
+    histograma = pool['histograma_espera']
+    serie = [histograma[str(l)] for l in LIMITES_ESPERA] + [histograma['+Inf'], pool['espera_total_segundos']]
+    salida.histograma('pool_espera_segundos', 'Espera por una conexión del pool', LIMITES_ESPERA,
+                      {motor: serie}, ('motor',))
+
+
+def _exportar_cache(salida, stats):
+    espacios = sorted(stats.get('espacios', {}).items())
+    for clave in ('aciertos', 'fallos', 'guardadas', 'desalojos', 'expiradas', 'invalidaciones'):
+        salida.metrica(f'cache_{clave}_total', 'counter', f'Caché de resultados: {clave}',
+                       [((e,), s.get(clave, 0)) for e, s in espacios], ('espacio',))
+
+
+def _exportar_replicas(salida, estado):
+    replicas = estado['replicas']
+    salida.metrica('replicas_retraso_segundos', 'gauge', 'Retraso medido de cada réplica',
+                   [((r['nombre'],), r['retraso_segundos']) for r in replicas], ('replica',))
+    salida.metrica('replicas_disponible', 'gauge', '1 si la réplica recibe lecturas',
+                   [((r['nombre'],), r['disponible']) for r in replicas], ('replica',))
+    salida.metrica('replicas_lecturas_total', 'counter', 'Peticiones atendidas por cada réplica',
+                   [((r['nombre'],), r['lecturas']) for r in replicas], ('replica',))
+    salida.metrica('replicas_lecturas_primaria_total', 'counter', 'Lecturas que volvieron a la primaria',
+                   [((), estado['lecturas_primaria'])])
+
+
+def _exportar_contrasenas(salida, stats):
+    for clave, ayuda in (('hashes', 'Contraseñas hasheadas'), ('verificaciones', 'Contraseñas verificadas'),
+                         ('rechazadas', 'Operaciones rechazadas por PASSWORD_MAX_EN_CURSO (503)')):
+        salida.metrica(f'contrasenas_{clave}_total', 'counter', ayuda, [((), stats[clave])])
+    salida.metrica('contrasenas_en_curso', 'gauge', 'Hashes calculándose ahora', [((), stats['en_curso'])])
+    salida.metrica('contrasenas_segundos_total', 'counter', 'Tiempo total hasheando (incluye la espera al pool)',
+                   [((), stats['segundos'])])
+
+
+def _exportar_limites(salida, stats):
+    for clave, ayuda in (('permitidas', 'Peticiones que pasaron la regla de límite'),
+                         ('rechazadas', 'Peticiones rechazadas (429) por la regla')):
+        salida.metrica(f'limites_{clave}_total', 'counter', ayuda,
+                       [((r['blueprint'], r['regla']), r[clave]) for r in stats['reglas']], ('blueprint', 'regla'))
+
+
+def _exportar_sse(salida, stats):
+    salida.metrica('sse_conexiones', 'gauge', 'Conexiones SSE abiertas en el proceso', [((), stats['conexiones'])])
+    for clave, ayuda in (('publicados', 'Mensajes recibidos por el bus'),
+                         ('entregados', 'Mensajes encolados a conexiones'),
+                         ('desbordadas', 'Conexiones cerradas por cliente lento'),
+                         ('rechazadas', 'Conexiones rechazadas por SSE_MAX_*')):
+        salida.metrica(f'sse_{clave}_total', 'counter', ayuda, [((), stats[clave])])
+
+
+def _exportar_compresion(salida, stats):
+    series = stats['series']
+    etiquetas = ('codificacion', 'origen')
+    for clave, ayuda in (('respuestas', 'Respuestas comprimidas'),
+                         ('bytes_originales', 'Bytes antes de comprimir'),
+                         ('bytes_ahorrados', 'Bytes que no se enviaron gracias a la compresión'),
+                         ('cpu_segundos', 'Tiempo de CPU comprimiendo')):
+        salida.metrica(f'compresion_{clave}_total', 'counter', ayuda,
+                       [((s['codificacion'], s['origen']), s[clave]) for s in series], etiquetas)
+
+
+def exportar():
+    """Texto en formato de exposición de Prometheus"""
+    import cache
+    import compresion
+    import conexiones
+    import contrasenas
+    import limites
+    import replicas
+    from models import db
+
+    salida = Exportador()
+    _exportar_http(salida, obtener_metricas())
+    _exportar_tareas(salida)
+    _exportar_pool(salida, 'primaria', conexiones.estadisticas(db.engine))
+    _exportar_cache(salida, cache.obtener_cache().estadisticas())
+    _exportar_contrasenas(salida, contrasenas.estadisticas())
+    _exportar_limites(salida, limites.obtener_limitador().estadisticas())
+    _exportar_compresion(salida, compresion.estadisticas())
+    if 'sse' in current_app.extensions:
+        _exportar_sse(salida, current_app.extensions['sse'].estadisticas())
+    if replicas.obtener_replicas():
+        _exportar_replicas(salida, replicas.obtener_replicas().estado())
+    return salida.texto()
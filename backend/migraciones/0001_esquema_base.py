@@ -0,0 +1,155 @@
+"""Esquema base: las tablas tal como estaban al introducir las migraciones
+
+Las definiciones están congeladas aquí (no se leen de models.py): una base
+nueva recibe este esquema y las migraciones siguientes agregan lo demás
+(token_version, índices compuestos, contadores...), igual que en una base
+existente. Bases creadas con init_db.sql (solo usuarios y noticias) o con el
+antiguo db.create_all() al arrancar reciben solo las tablas que les falten;
+las existentes no se modifican (de eso se encargan 0002 en adelante).
+"""
+from sqlalchemy import (MetaData, Table, Column, Integer, String, Text, DateTime, Float, Enum, ForeignKey,
+                        Index, UniqueConstraint)
+
+DESCRIPCION = 'Tablas base'
+
+metadata = MetaData()
+
+Table(
+    'usuarios', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('nombre', String(100), nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password_hash', String(255), nullable=False),
+    Column('rol', Enum('admin', 'moderador', 'usuario'), nullable=False),
+    Column('avatar', String(255)),
+    Column('fecha_registro', DateTime),
+)
+
+Table(
+    'noticias', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('titulo', String(200), nullable=False),
+    Column('descripcion', Text, nullable=False),
+    Column('contenido', Text),
+    Column('categoria', String(50), nullable=False),
+    Column('imagen', String(500)),
+    Column('fecha', DateTime),
+    Column('autor_id', Integer, ForeignKey('usuarios.id'), nullable=False),
+)
+
+Table(
+    'comentarios', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('noticia_id', Integer, ForeignKey('noticias.id'), nullable=False),
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), nullable=False),
+    Column('texto', Text, nullable=False),
+    Column('fecha', DateTime),
+)
+
+Table(
+    'reacciones', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('noticia_id', Integer, ForeignKey('noticias.id'), nullable=False),
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), nullable=False),
+    Column('tipo', Enum('like', 'love', 'wow', 'sad', 'angry'), nullable=False),
+    Column('fecha', DateTime),
+    UniqueConstraint('noticia_id', 'usuario_id', name='uq_reaccion_usuario_noticia'),
+)
+
+Table(
+    'reacciones_conteo', metadata,
+    Column('noticia_id', Integer, ForeignKey('noticias.id'), primary_key=True),
+    Column('total_like', Integer, nullable=False),
+    Column('total_love', Integer, nullable=False),
+    Column('total_wow', Integer, nullable=False),
+    Column('total_sad', Integer, nullable=False),
+    Column('total_angry', Integer, nullable=False),
+    Column('total', Integer, nullable=False),
+)
+
+Table(
+    'notificaciones_eventos', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), index=True),
+    Column('autor_id', Integer, ForeignKey('usuarios.id', ondelete='SET NULL')),
+    Column('noticia_id', Integer, ForeignKey('noticias.id')),
+    Column('mensaje', String(300), nullable=False),
+    Column('fecha', DateTime, index=True),
+)
+
+Table(
+    'notificaciones_cursor', metadata,
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), primary_key=True),
+    Column('leidas_hasta', Integer, nullable=False),
+    Column('fecha', DateTime),
+)
+
+Table(
+    'notificaciones_leidas', metadata,
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), primary_key=True),
+    Column('notificacion_id', Integer, ForeignKey('notificaciones_eventos.id'), primary_key=True),
+    Column('fecha', DateTime),
+)
+
+Table(
+    'eventos', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('titulo', String(200), nullable=False),
+    Column('descripcion', Text, nullable=False),
+    Column('categoria', String(50), nullable=False),
+    Column('fecha_evento', DateTime, nullable=False),
+    Column('imagen', String(500)),
+    Column('lugar', String(200)),
+    Column('autor_id', Integer, ForeignKey('usuarios.id'), nullable=False),
+    Column('created_at', DateTime),
+)
+
+Table(
+    'imagenes', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('url', String(500), unique=True, nullable=False),
+    Column('formato', String(10), nullable=False),
+    Column('ancho', Integer),
+    Column('alto', Integer),
+    Column('estado', Enum('pendiente', 'lista', 'error'), nullable=False),
+    Column('variantes', Text),
+    Column('creada_en', DateTime),
+)
+
+Table(
+    'busqueda_terminos', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('termino', String(64), nullable=False),
+    Column('noticia_id', Integer, nullable=False, index=True),
+    Column('comentario_id', Integer, index=True),
+    Column('peso', Float, nullable=False),
+    Index('ix_busqueda_termino_noticia', 'termino', 'noticia_id'),
+)
+
+Table(
+    'versiones', metadata,
+    Column('clave', String(100), primary_key=True),
+    Column('version', Integer, nullable=False),
+    Column('actualizado', DateTime, nullable=False),
+)
+
+Table(
+    'tareas', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('tipo', String(100), nullable=False),
+    Column('datos', Text, nullable=False),
+    Column('estado', Enum('pendiente', 'en_proceso', 'completada', 'fallida'), nullable=False),
+    Column('intentos', Integer, nullable=False),
+    Column('max_intentos', Integer, nullable=False),
+    Column('error', Text),
+    Column('trabajador', String(100)),
+    Column('creada_en', DateTime, nullable=False),
+    Column('disponible_en', DateTime, nullable=False),
+    Column('iniciada_en', DateTime),
+    Column('terminada_en', DateTime),
+    Index('ix_tareas_estado_disponible', 'estado', 'disponible_en'),
+)
+
+
+def aplicar(conexion):
+    metadata.create_all(conexion, checkfirst=True)
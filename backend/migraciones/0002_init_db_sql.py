@@ -0,0 +1,17 @@
+"""Columnas de init_db.sql que no coinciden con los modelos (solo MySQL)
+
+usuarios.rol no tenía 'moderador' y noticias.contenido era NOT NULL. Las
+bases creadas desde los modelos ya están bien; ALTER ... MODIFY es
+idempotente, así que se ejecuta igual.
+"""
+from sqlalchemy import text
+
+DESCRIPCION = "Rol 'moderador' y noticias.contenido opcional en bases de init_db.sql"
+
+
+def aplicar(conexion):
+    if conexion.dialect.name != 'mysql':
+        return
+    conexion.execute(text(
+        "ALTER TABLE usuarios MODIFY rol ENUM('admin', 'moderador', 'usuario') NOT NULL DEFAULT 'usuario'"))
+    conexion.execute(text('ALTER TABLE noticias MODIFY contenido TEXT NULL'))
@@ -0,0 +1,10 @@
+"""usuarios.token_version (revocación de tokens) en bases anteriores a la columna"""
+from sqlalchemy import text
+from migraciones import tiene_columna
+
+DESCRIPCION = 'Columna usuarios.token_version'
+
+
+def aplicar(conexion):
+    if not tiene_columna(conexion, 'usuarios', 'token_version'):
+        conexion.execute(text('ALTER TABLE usuarios ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0'))
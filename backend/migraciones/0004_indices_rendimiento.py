@@ -0,0 +1,28 @@
+"""Índices compuestos para los filtros y ordenamientos más usados
+
+- noticias(categoria, fecha): feed por categoría ordenado por fecha
+- comentarios(noticia_id, fecha): comentarios de una noticia en orden
+- reacciones(noticia_id, tipo): conteos por tipo de una noticia
+- eventos(categoria, fecha_evento) y eventos(fecha_evento): agenda
+- notificaciones_eventos(usuario_id, fecha): personales + difusión desde el registro
+
+Los índices también están declarados en los modelos (__table_args__); aquí
+van congelados y solo se crean en las bases donde faltan.
+"""
+from migraciones import crear_indice
+
+DESCRIPCION = 'Índices compuestos de noticias, comentarios, reacciones, eventos y notificaciones'
+
+INDICES = (
+    ('ix_noticias_categoria_fecha', 'noticias', ('categoria', 'fecha')),
+    ('ix_comentarios_noticia_fecha', 'comentarios', ('noticia_id', 'fecha')),
+    ('ix_reacciones_noticia_tipo', 'reacciones', ('noticia_id', 'tipo')),
+    ('ix_eventos_categoria_fecha', 'eventos', ('categoria', 'fecha_evento')),
+    ('ix_eventos_fecha', 'eventos', ('fecha_evento',)),
+    ('ix_notificaciones_usuario_fecha', 'notificaciones_eventos', ('usuario_id', 'fecha')),
+)
+
+
+def aplicar(conexion):
+    for nombre, tabla, columnas in INDICES:
+        crear_indice(conexion, nombre, tabla, columnas)
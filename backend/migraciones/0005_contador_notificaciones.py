@@ -0,0 +1,35 @@
+"""Contador de notificaciones no leídas por usuario
+
+Crea notificaciones_difusion (con el total actual de difusiones) y
+notificaciones_conteo. Las filas por usuario se crean al consultar el
+contador por primera vez (o con verificar_notificaciones.py --reparar).
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, ForeignKey, text
+
+DESCRIPCION = 'Contador de notificaciones no leídas'
+
+metadata = MetaData()
+
+notificaciones_difusion = Table(
+    'notificaciones_difusion', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('total', Integer, nullable=False),
+)
+
+Table('usuarios', metadata, Column('id', Integer, primary_key=True))   # solo para la FK
+notificaciones_conteo = Table(
+    'notificaciones_conteo', metadata,
+    Column('usuario_id', Integer, ForeignKey('usuarios.id'), primary_key=True),
+    Column('difusion_base', Integer, nullable=False),
+    Column('ajuste', Integer, nullable=False),
+)
+
+
+def aplicar(conexion):
+    for tabla in (notificaciones_difusion, notificaciones_conteo):
+        tabla.create(conexion, checkfirst=True)
+
+    if conexion.execute(text('SELECT id FROM notificaciones_difusion WHERE id = 1')).first() is None:
+        total = conexion.execute(
+            text('SELECT COUNT(id) FROM notificaciones_eventos WHERE usuario_id IS NULL')).scalar()
+        conexion.execute(notificaciones_difusion.insert().values(id=1, total=total))
@@ -0,0 +1,13 @@
+"""Índices de búsqueda nativos: FULLTEXT en MySQL y GIN en PostgreSQL
+
+Antes solo los creaba reindexar_busqueda.py a mano, y sin ellos MATCH ...
+AGAINST falla. En SQLite no hace nada (se usa el índice busqueda_terminos).
+"""
+from busqueda import DDL_NATIVO, crear_indices_nativos
+
+DESCRIPCION = 'Índices FULLTEXT/GIN para la búsqueda de noticias y comentarios'
+
+
+def aplicar(conexion):
+    if conexion.dialect.name in DDL_NATIVO:
+        crear_indices_nativos(conexion)
@@ -0,0 +1,21 @@
+"""Contadores de reacciones de las noticias que ya tenían reacciones
+
+0001 crea reacciones_conteo vacía y las filas solo se creaban al reaccionar
+otra vez: hasta entonces esas noticias mostraban 0. Se calculan aquí desde
+la tabla reacciones (las noticias que ya tienen fila no se tocan).
+"""
+from sqlalchemy import text
+
+DESCRIPCION = 'Rellenar reacciones_conteo desde reacciones'
+
+TIPOS = ('like', 'love', 'wow', 'sad', 'angry')
+
+
+def aplicar(conexion):
+    columnas = ', '.join(f'total_{t}' for t in TIPOS)
+    sumas = ', '.join(f"SUM(CASE WHEN r.tipo = '{t}' THEN 1 ELSE 0 END)" for t in TIPOS)
+    conexion.execute(text(
+        f'INSERT INTO reacciones_conteo (noticia_id, {columnas}, total) '
+        f'SELECT r.noticia_id, {sumas}, COUNT(*) FROM reacciones r '
+        f'WHERE NOT EXISTS (SELECT 1 FROM reacciones_conteo c WHERE c.noticia_id = r.noticia_id) '
+        f'GROUP BY r.noticia_id'))
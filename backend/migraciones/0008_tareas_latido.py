@@ -0,0 +1,15 @@
+"""tareas.latido_en: el trabajador marca que sigue vivo mientras corre la tarea
+
+rescatar_atascadas() usaba iniciada_en y duplicaba las tareas que tardan
+más que TAREAS_TIMEOUT.
+"""
+from sqlalchemy import DateTime, text
+from migraciones import tiene_columna
+
+DESCRIPCION = 'Columna tareas.latido_en'
+
+
+def aplicar(conexion):
+    if not tiene_columna(conexion, 'tareas', 'latido_en'):
+        tipo = DateTime().compile(dialect=conexion.dialect)
+        conexion.execute(text(f'ALTER TABLE tareas ADD COLUMN latido_en {tipo}'))
@@ -0,0 +1,117 @@
+import importlib
+import os
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, inspect, select, func, text
+
+# Migraciones versionadas del esquema. Cada módulo NNNN_nombre.py de este
+# paquete define DESCRIPCION y aplicar(conexion); se ejecutan en orden y la
+# última versión aplicada queda en la tabla esquema_version.
+#
+# Las migraciones no importan models.py: el DDL de cada una queda congelado
+# (0001 trae el esquema base) y una base nueva pasa por los mismos pasos que
+# una existente. Las bases creadas antes de las migraciones pueden tener ya
+# parte de un cambio, así que cada una comprueba si existe (tiene_tabla,
+# tiene_columna, tiene_indice) antes de aplicarlo.
+#
+# Al arrancar, la app solo verifica la versión (ESQUEMA_AL_INICIAR); el DDL
+# se ejecuta con `python migrar.py` antes de levantar gunicorn.
+
+PATRON_MODULO = re.compile(r'^(\d{4})_\w+$')
+
+metadata_version = MetaData()
+esquema_version = Table(
+    'esquema_version', metadata_version,
+    Column('version', Integer, primary_key=True),
+    Column('descripcion', String(200), nullable=False),
+    Column('aplicada_en', DateTime, nullable=False),
+)
+
+
+class EsquemaDesactualizado(RuntimeError):
+    """La base de datos no tiene todas las migraciones aplicadas"""
+
+
+def migraciones():
+    """[(version, modulo)] ordenadas"""
+    encontradas = []
+    for info in pkgutil.iter_modules([os.path.dirname(__file__)]):
+        coincidencia = PATRON_MODULO.match(info.name)
+        if coincidencia:
+            modulo = importlib.import_module(f'{__name__}.{info.name}')
+            encontradas.append((int(coincidencia.group(1)), modulo))
+    return sorted(encontradas, key=lambda m: m[0])
+
+
+def ultima_version():
+    todas = migraciones()
+    return todas[-1][0] if todas else 0
+
+
+def version_actual(conexion):
+    """Última versión aplicada (0 si la base nunca se migró)"""
+    if not tiene_tabla(conexion, esquema_version.name):
+        return 0
+    return conexion.execute(select(func.max(esquema_version.c.version))).scalar() or 0
+
+
+def pendientes(conexion):
+    actual = version_actual(conexion)
+    return [(v, m) for v, m in migraciones() if v > actual]
+
+
+def migrar(engine, hasta=None, al_aplicar=None):
+    """Aplicar las migraciones pendientes (hasta la versión `hasta` inclusive)
+
+    Cada una va en su propia transacción junto con su fila en esquema_version
+    (en MySQL el DDL confirma solo, por eso las migraciones son idempotentes).
+    Devuelve la lista de versiones aplicadas.
+    """
+    with engine.begin() as conexion:
+        metadata_version.create_all(conexion, checkfirst=True)
+        por_aplicar = pendientes(conexion)
+
+    aplicadas = []
+    for version, modulo in por_aplicar:
+        if hasta is not None and version > hasta:
+            break
+        with engine.begin() as conexion:
+            modulo.aplicar(conexion)
+            conexion.execute(esquema_version.insert().values(
+                version=version, descripcion=modulo.DESCRIPCION, aplicada_en=datetime.utcnow()))
+        aplicadas.append(version)
+        if al_aplicar:
+            al_aplicar(version, modulo)
+    return aplicadas
+
+
+def verificar(engine):
+    """EsquemaDesactualizado si faltan migraciones; devuelve la versión actual"""
+    with engine.connect() as conexion:
+        actual = version_actual(conexion)
+    ultima = ultima_version()
+    if actual < ultima:
+        raise EsquemaDesactualizado(
+            f'El esquema está en la versión {actual} y la última es {ultima}: ejecuta `python migrar.py`')
+    return actual
+
+
+# ─── AYUDAS PARA LAS MIGRACIONES ─────────────────────────────────────────────
+
+def tiene_tabla(conexion, tabla):
+    return inspect(conexion).has_table(tabla)
+
+
+def tiene_columna(conexion, tabla, columna):
+    return any(c['name'] == columna for c in inspect(conexion).get_columns(tabla))
+
+
+def tiene_indice(conexion, tabla, nombre):
+    return any(i['name'] == nombre for i in inspect(conexion).get_indexes(tabla))
+
+
+def crear_indice(conexion, nombre, tabla, columnas):
+    """CREATE INDEX nombre ON tabla (columnas) si la tabla aún no lo tiene"""
+    if not tiene_indice(conexion, tabla, nombre):
+        conexion.execute(text(f'CREATE INDEX {nombre} ON {tabla} ({", ".join(columnas)})'))
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Aplicar las migraciones pendientes del esquema (ver migraciones/)
+Ejecutar antes de iniciar el servidor: python migrar.py [--estado] [--hasta N]
+"""
+import sys
+import argparse
+
+from app import create_app
+from models import db
+import migraciones
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migraciones del esquema de la base de datos')
+    parser.add_argument('--estado', action='store_true', help='Solo mostrar la versión actual y las pendientes')
+    parser.add_argument('--hasta', type=int, default=None, help='Aplicar hasta esta versión (inclusive)')
+    args = parser.parse_args()
+
+    app = create_app(esquema_al_iniciar='no')
+    with app.app_context():
+        with db.engine.connect() as conexion:
+            actual = migraciones.version_actual(conexion)
+            por_aplicar = migraciones.pendientes(conexion)
+
+        print(f"🗄️  Esquema en la versión {actual} (última: {migraciones.ultima_version()})")
+        if not por_aplicar:
+            print("✅ No hay migraciones pendientes")
+            return True
+
+        for version, modulo in por_aplicar:
+            print(f"   {'⏳' if args.estado else '•'} {version:04d} {modulo.DESCRIPCION}")
+        if args.estado:
+            return True
+
+        def informar(version, modulo):
+            print(f"✅ {version:04d} aplicada")
+
+        try:
+            aplicadas = migraciones.migrar(db.engine, hasta=args.hasta, al_aplicar=informar)
+        except Exception as e:
+            print(f"❌ Error al migrar: {e}")
+            return False
+
+        print(f"🎉 {len(aplicadas)} migración(es) aplicada(s)")
+        return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
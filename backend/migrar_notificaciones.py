@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Convertir las notificaciones por usuario (tabla notificaciones) al modelo
+de fan-out en lectura: un evento por publicación + cursor/lecturas por usuario
+Ejecutar: python migrar_notificaciones.py [--eliminar-anterior]
+"""
+import sys
+import argparse
+from sqlalchemy import inspect, select, MetaData, Table
+
+from app import create_app
+from models import (db, Noticia, Notificacion, NotificacionCursor, NotificacionLeida,
+                    NotificacionDifusion, NotificacionConteo)
+
+TABLA_ANTERIOR = 'notificaciones'
+
+
+def migrar_notificaciones(eliminar_anterior=False):
+    """Devuelve el número de eventos creados (None si no hay nada que migrar)"""
+    if TABLA_ANTERIOR not in inspect(db.engine).get_table_names():
+        return None
+
+    if Notificacion.query.first() is not None:
+        raise RuntimeError('Ya existen notificaciones en el modelo nuevo; la migración ya se ejecutó')
+
+    anterior = Table(TABLA_ANTERIOR, MetaData(), autoload_with=db.engine)
+    filas = db.session.execute(
+        select(anterior.c.usuario_id, anterior.c.noticia_id, anterior.c.mensaje,
+               anterior.c.leida, anterior.c.fecha)
+        .order_by(anterior.c.fecha, anterior.c.id)
+    ).all()
+
+    # Las filas de una misma publicación comparten noticia y mensaje
+    grupos = {}
+    for usuario_id, noticia_id, mensaje, leida, fecha in filas:
+        grupo = grupos.setdefault((noticia_id, mensaje), {'fecha': fecha, 'lecturas': {}})
+        grupo['lecturas'][usuario_id] = bool(leida)
+
+    autores = dict(db.session.query(Noticia.id, Noticia.autor_id).all())
+    por_usuario = {}
+    for (noticia_id, mensaje), grupo in grupos.items():
+        notif = Notificacion(
+            noticia_id=noticia_id,
+            autor_id=autores.get(noticia_id),
+            mensaje=mensaje,
+            fecha=grupo['fecha']
+        )
+        db.session.add(notif)
+        db.session.flush()
+        for usuario_id, leida in grupo['lecturas'].items():
+            por_usuario.setdefault(usuario_id, []).append((notif.id, leida))
+
+    # Cursor = el prefijo más largo de notificaciones leídas; el resto, sueltas
+    for usuario_id, estados in por_usuario.items():
+        estados.sort()
+        cursor = 0
+        for notif_id, leida in estados:
+            if not leida:
+                break
+            cursor = notif_id
+
+        if cursor:
+            db.session.add(NotificacionCursor(usuario_id=usuario_id, leidas_hasta=cursor))
+        for notif_id, leida in estados:
+            if leida and notif_id > cursor:
+                db.session.add(NotificacionLeida(usuario_id=usuario_id, notificacion_id=notif_id))
+
+    # Contador de no leídas (migraciones/0005 lo dejó en 0 difusiones): total
+    # real y sin filas por usuario, que se recrean con el conteo exacto
+    difusion = db.session.get(NotificacionDifusion, 1)
+    if difusion is None:
+        db.session.add(NotificacionDifusion(id=1, total=len(grupos)))
+    else:
+        difusion.total = len(grupos)
+    NotificacionConteo.query.delete(synchronize_session=False)
+
+    db.session.commit()
+
+    if eliminar_anterior:
+        anterior.drop(db.engine)
+    return len(grupos)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrar notificaciones al modelo de fan-out en lectura')
+    parser.add_argument('--eliminar-anterior', action='store_true',
+                        help=f'Eliminar la tabla {TABLA_ANTERIOR} al terminar')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            creadas = migrar_notificaciones(args.eliminar_anterior)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            return False
+
+    if creadas is None:
+        print(f"✅ No existe la tabla {TABLA_ANTERIOR}, nada que migrar")
+    else:
+        print(f"✅ Se crearon {creadas} notificaciones a partir de la tabla {TABLA_ANTERIOR}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -1,8 +1,11 @@
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+import contrasenas
+from replicas import SesionEnrutada
 
-db = SQLAlchemy()
+# La sesión lee de una réplica en las vistas @solo_lectura (ver replicas.py)
+db = SQLAlchemy(session_options={'class_': SesionEnrutada})
 
 class Usuario(db.Model):
     __tablename__ = 'usuarios'
@@ -14,21 +17,26 @@ class Usuario(db.Model):
     rol = db.Column(db.Enum('admin', 'moderador', 'usuario'), default='usuario', nullable=False)
     avatar = db.Column(db.String(255), nullable=True)
     fecha_registro = db.Column(db.DateTime, default=datetime.utcnow)
+    token_version = db.Column(db.Integer, default=0, nullable=False)  # +1 revoca todos sus tokens
     
     # Relaciones
     noticias = db.relationship('Noticia', backref='autor_obj', lazy=True, cascade='all, delete-orphan')
     comentarios = db.relationship('Comentario', backref='usuario_obj', lazy=True, cascade='all, delete-orphan')
     reacciones = db.relationship('Reaccion', backref='usuario_obj', lazy=True, cascade='all, delete-orphan')
-    notificaciones = db.relationship('Notificacion', backref='usuario_obj', lazy=True, cascade='all, delete-orphan')
+    notificaciones = db.relationship('Notificacion', backref='usuario_obj', lazy=True, cascade='all, delete-orphan',
+                                     foreign_keys='Notificacion.usuario_id')
+    notificaciones_leidas = db.relationship('NotificacionLeida', lazy=True, cascade='all, delete-orphan')
+    notificaciones_cursor = db.relationship('NotificacionCursor', lazy=True, uselist=False, cascade='all, delete-orphan')
+    notificaciones_conteo = db.relationship('NotificacionConteo', lazy=True, uselist=False, cascade='all, delete-orphan')
     eventos = db.relationship('Evento', backref='autor_obj', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Hashear la contraseña"""
-        self.password_hash = generate_password_hash(password)
+        """Hashear la contraseña (en el pool de contrasenas.py)"""
+        self.password_hash = contrasenas.hashear(password)
     
     def check_password(self, password):
-        """Verificar la contraseña"""
-        return check_password_hash(self.password_hash, password)
+        """Verificar la contraseña (en el pool de contrasenas.py)"""
+        return contrasenas.verificar(self.password_hash, password)
     
     def to_dict(self):
         """Convertir a diccionario"""
@@ -41,6 +49,9 @@ class Usuario(db.Model):
         }
 
 
+IMAGEN_NOTICIA_POR_OMISION = 'https://images.unsplash.com/photo-1504711434969-e33886168f5c?w=400&h=250&fit=crop'
+
+
 class Noticia(db.Model):
     __tablename__ = 'noticias'
     
@@ -57,6 +68,14 @@ class Noticia(db.Model):
     comentarios = db.relationship('Comentario', backref='noticia_obj', lazy=True, cascade='all, delete-orphan')
     reacciones = db.relationship('Reaccion', backref='noticia_obj', lazy=True, cascade='all, delete-orphan')
     notificaciones = db.relationship('Notificacion', backref='noticia_notif_obj', lazy=True, cascade='all, delete-orphan')
+    conteo_reacciones = db.relationship('ReaccionConteo', backref='noticia_obj', lazy=True, uselist=False, cascade='all, delete-orphan')
+    imagen_obj = db.relationship('Imagen', primaryjoin='foreign(Noticia.imagen) == Imagen.url',
+                                 viewonly=True, uselist=False, lazy=True)
+    
+    # Feed por categoría ordenado por fecha (migraciones/0004)
+    __table_args__ = (
+        db.Index('ix_noticias_categoria_fecha', 'categoria', 'fecha'),
+    )
     
     def to_dict(self):
         """Convertir a diccionario"""
@@ -66,10 +85,11 @@ class Noticia(db.Model):
             'descripcion': self.descripcion,
             'contenido': self.contenido or '',
             'categoria': self.categoria,
-            'imagen': self.imagen or 'https://images.unsplash.com/photo-1504711434969-e33886168f5c?w=400&h=250&fit=crop',
+            'imagen': self.imagen or IMAGEN_NOTICIA_POR_OMISION,
             'fecha': self.fecha.isoformat(),
             'autor_id': self.autor_id,
-            'autor_nombre': self.autor_obj.nombre if self.autor_obj else 'Desconocido'
+            'autor_nombre': self.autor_obj.nombre if self.autor_obj else 'Desconocido',
+            'imagen_srcset': self.imagen_obj.srcset() if self.imagen_obj else None
         }
 
 
@@ -82,6 +102,10 @@ class Comentario(db.Model):
     texto = db.Column(db.Text, nullable=False)
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_comentarios_noticia_fecha', 'noticia_id', 'fecha'),
+    )
+    
     def to_dict(self):
         """Convertir a diccionario"""
         return {
@@ -107,6 +131,7 @@ class Reaccion(db.Model):
     # Restricción única: un usuario solo puede reaccionar una vez por noticia
     __table_args__ = (
         db.UniqueConstraint('noticia_id', 'usuario_id', name='uq_reaccion_usuario_noticia'),
+        db.Index('ix_reacciones_noticia_tipo', 'noticia_id', 'tipo'),
     )
     
     def to_dict(self):
@@ -120,27 +145,104 @@ class Reaccion(db.Model):
         }
 
 
+class ReaccionConteo(db.Model):
+    """Contadores agregados de reacciones por noticia (desnormalizados)"""
+    __tablename__ = 'reacciones_conteo'
+
+    noticia_id = db.Column(db.Integer, db.ForeignKey('noticias.id'), primary_key=True)
+    total_like = db.Column(db.Integer, default=0, nullable=False)
+    total_love = db.Column(db.Integer, default=0, nullable=False)
+    total_wow = db.Column(db.Integer, default=0, nullable=False)
+    total_sad = db.Column(db.Integer, default=0, nullable=False)
+    total_angry = db.Column(db.Integer, default=0, nullable=False)
+    total = db.Column(db.Integer, default=0, nullable=False)
+
+    def conteo(self):
+        return {
+            'like': self.total_like,
+            'love': self.total_love,
+            'wow': self.total_wow,
+            'sad': self.total_sad,
+            'angry': self.total_angry
+        }
+
+    def to_dict(self):
+        return {'conteo': self.conteo(), 'total': self.total}
+
+
 class Notificacion(db.Model):
-    __tablename__ = 'notificaciones'
+    """Evento de notificación guardado una sola vez (fan-out en lectura)
+
+    usuario_id NULL = dirigida a todos los usuarios registrados al momento de
+    publicarse, excepto autor_id. Con usuario_id es una notificación personal.
+    Lo leído por cada usuario vive en NotificacionCursor + NotificacionLeida.
+    """
+    __tablename__ = 'notificaciones_eventos'
 
     id = db.Column(db.Integer, primary_key=True)
-    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=True, index=True)
+    autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id', ondelete='SET NULL'), nullable=True)
     noticia_id = db.Column(db.Integer, db.ForeignKey('noticias.id'), nullable=True)
     mensaje = db.Column(db.String(300), nullable=False)
-    leida = db.Column(db.Boolean, default=False, nullable=False)
-    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
-    def to_dict(self):
+    leidas = db.relationship('NotificacionLeida', backref='notificacion_obj', lazy=True, cascade='all, delete-orphan')
+
+    # Personales del usuario y difusión desde su fecha de registro
+    __table_args__ = (
+        db.Index('ix_notificaciones_usuario_fecha', 'usuario_id', 'fecha'),
+    )
+
+    def to_dict(self, usuario_id=None, leida=False):
+        """Formato por usuario (el mismo que tenían las filas por usuario)"""
         return {
             'id': self.id,
-            'usuario_id': self.usuario_id,
+            'usuario_id': usuario_id if usuario_id is not None else self.usuario_id,
             'noticia_id': self.noticia_id,
             'mensaje': self.mensaje,
-            'leida': self.leida,
+            'leida': leida,
             'fecha': self.fecha.isoformat()
         }
 
 
+class NotificacionCursor(db.Model):
+    """Todas las notificaciones con id <= leidas_hasta están leídas para el usuario"""
+    __tablename__ = 'notificaciones_cursor'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    leidas_hasta = db.Column(db.Integer, default=0, nullable=False)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class NotificacionLeida(db.Model):
+    """Notificaciones leídas una a una por encima del cursor del usuario"""
+    __tablename__ = 'notificaciones_leidas'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    notificacion_id = db.Column(db.Integer, db.ForeignKey('notificaciones_eventos.id'), primary_key=True)
+    fecha = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class NotificacionDifusion(db.Model):
+    """Fila única (id=1) con el total de notificaciones de difusión publicadas"""
+    __tablename__ = 'notificaciones_difusion'
+
+    id = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Integer, default=0, nullable=False)
+
+
+class NotificacionConteo(db.Model):
+    """Contador de no leídas del usuario (desnormalizado, ver notificaciones.py)
+
+    no_leidas = NotificacionDifusion.total - difusion_base + ajuste
+    """
+    __tablename__ = 'notificaciones_conteo'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    difusion_base = db.Column(db.Integer, default=0, nullable=False)
+    ajuste = db.Column(db.Integer, default=0, nullable=False)
+
+
 class Evento(db.Model):
     __tablename__ = 'eventos'
 
@@ -154,11 +256,19 @@ class Evento(db.Model):
     autor_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    def to_dict(self):
+    imagen_obj = db.relationship('Imagen', primaryjoin='foreign(Evento.imagen) == Imagen.url',
+                                 viewonly=True, uselist=False, lazy=True)
+
+    __table_args__ = (
+        db.Index('ix_eventos_categoria_fecha', 'categoria', 'fecha_evento'),
+        db.Index('ix_eventos_fecha', 'fecha_evento'),
+    )
+
+    def to_dict(self, hoy=None):
+        """hoy: fecha de referencia de dias_restantes (los listados la calculan una vez)"""
         from datetime import date
-        hoy = date.today()
-        fecha_ev = self.fecha_evento.date()
-        dias = (fecha_ev - hoy).days
+        hoy = hoy or date.today()
+        dias = (self.fecha_evento.date() - hoy).days
 
         return {
             'id': self.id,
@@ -171,6 +281,106 @@ class Evento(db.Model):
             'autor_id': self.autor_id,
             'autor': self.autor_obj.nombre if self.autor_obj else 'Desconocido',
             'created_at': self.created_at.isoformat(),
-            'dias_restantes': dias   # negativo = pasado, 0 = hoy, positivo = próximo
+            'dias_restantes': dias,   # negativo = pasado, 0 = hoy, positivo = próximo
+            'imagen_srcset': self.imagen_obj.srcset() if self.imagen_obj else None
+        }
+
+
+class Imagen(db.Model):
+    """Imagen subida y sus variantes (anchos y WebP) generadas por la tarea procesar_imagen"""
+    __tablename__ = 'imagenes'
+
+    id = db.Column(db.Integer, primary_key=True)
+    url = db.Column(db.String(500), unique=True, nullable=False)   # mismo valor que noticias.imagen
+    formato = db.Column(db.String(10), nullable=False)             # jpeg, png, gif, webp
+    ancho = db.Column(db.Integer, nullable=True)
+    alto = db.Column(db.Integer, nullable=True)
+    estado = db.Column(db.Enum('pendiente', 'lista', 'error'), default='pendiente', nullable=False)
+    variantes = db.Column(db.Text, nullable=True)   # JSON: [{'url', 'ancho', 'formato'}]
+    creada_en = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def lista_variantes(self):
+        return json.loads(self.variantes) if self.variantes else []
+
+    def srcset(self):
+        """srcset por formato para <img>/<picture>; None mientras se procesa"""
+        return Imagen.construir_srcset(self.url, self.ancho, self.alto, self.estado, self.variantes)
+
+    @staticmethod
+    def construir_srcset(url, ancho, alto, estado, variantes):
+        """srcset() a partir de las columnas (lo usan también las proyecciones de serializacion.py)"""
+        if estado != 'lista':
+            return None
+
+        por_formato = {}
+        for v in sorted(json.loads(variantes) if variantes else [], key=lambda v: v['ancho']):
+            por_formato.setdefault(v['formato'], []).append(f"{v['url']} {v['ancho']}w")
+        return {
+            'src': url,
+            'ancho': ancho,
+            'alto': alto,
+            'srcset': {formato: ', '.join(items) for formato, items in por_formato.items()}
         }
 
+
+class TerminoBusqueda(db.Model):
+    """Índice invertido de búsqueda (ver busqueda.py)
+
+    Filas derivadas de noticias y comentarios; comentario_id NULL = término del
+    texto de la noticia. Sin llaves foráneas: se reconstruye con reindexar_busqueda.py.
+    """
+    __tablename__ = 'busqueda_terminos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    termino = db.Column(db.String(64), nullable=False)
+    noticia_id = db.Column(db.Integer, nullable=False, index=True)
+    comentario_id = db.Column(db.Integer, nullable=True, index=True)
+    peso = db.Column(db.Float, nullable=False, default=1.0)
+
+    __table_args__ = (
+        db.Index('ix_busqueda_termino_noticia', 'termino', 'noticia_id'),
+    )
+
+
+class VersionDatos(db.Model):
+    """Sello de versión por tabla ('noticias') o entidad ('noticia:5') para ETags"""
+    __tablename__ = 'versiones'
+
+    clave = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, default=0, nullable=False)
+    actualizado = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+
+class Tarea(db.Model):
+    """Trabajo en segundo plano (cola persistente, ver tareas.py)"""
+    __tablename__ = 'tareas'
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(100), nullable=False)
+    datos = db.Column(db.Text, nullable=False, default='{}')   # JSON con los argumentos
+    estado = db.Column(db.Enum('pendiente', 'en_proceso', 'completada', 'fallida'),
+                       default='pendiente', nullable=False)
+    intentos = db.Column(db.Integer, default=0, nullable=False)
+    max_intentos = db.Column(db.Integer, default=5, nullable=False)
+    error = db.Column(db.Text, nullable=True)
+    trabajador = db.Column(db.String(100), nullable=True)
+    creada_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    disponible_en = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    iniciada_en = db.Column(db.DateTime, nullable=True)
+    latido_en = db.Column(db.DateTime, nullable=True)   # el trabajador sigue vivo (ver tareas.py)
+    terminada_en = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_tareas_estado_disponible', 'estado', 'disponible_en'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'estado': self.estado,
+            'intentos': self.intentos,
+            'error': self.error,
+            'creada_en': self.creada_en.isoformat(),
+            'terminada_en': self.terminada_en.isoformat() if self.terminada_en else None
+        }
@@ -0,0 +1,255 @@
+from sqlalchemy import and_, or_, func, select, update
+from sqlalchemy.exc import IntegrityError
+from models import (db, Noticia, Usuario, Notificacion, NotificacionCursor, NotificacionLeida,
+                    NotificacionDifusion, NotificacionConteo)
+from tareas import tarea
+
+# Las consultas de este módulo dependen del número de notificaciones del
+# usuario, nunca del total de usuarios registrados.
+
+
+def publicar(mensaje, noticia_id=None, autor_id=None, usuario_id=None):
+    """Registrar una notificación (una sola fila aunque sea para todos)"""
+    notif = Notificacion(
+        mensaje=mensaje,
+        noticia_id=noticia_id,
+        autor_id=autor_id,
+        usuario_id=usuario_id
+    )
+    db.session.add(notif)
+
+    if usuario_id is None:
+        _sumar_difusion()
+        if autor_id is not None:
+            _ajustar(autor_id, -1)   # el autor no recibe su propia difusión
+    else:
+        _ajustar(usuario_id, 1)
+    return notif
+
+
+@tarea('notificar_noticia')
+def notificar_noticia(noticia_id, autor_id, mensaje):
+    """Tarea: avisar a todos de una noticia nueva (idempotente ante reintentos)"""
+    if db.session.get(Noticia, noticia_id) is None:
+        return  # Se eliminó antes de que corriera la tarea
+
+    ya_existe = Notificacion.query.filter_by(noticia_id=noticia_id, usuario_id=None).first()
+    if not ya_existe:
+        publicar(mensaje, noticia_id=noticia_id, autor_id=autor_id)
+
+
+def visibles(usuario):
+    """Consulta de las notificaciones que le corresponden a un usuario"""
+    difusion = and_(
+        Notificacion.usuario_id.is_(None),
+        or_(Notificacion.autor_id.is_(None), Notificacion.autor_id != usuario.id)
+    )
+    if usuario.fecha_registro:
+        # Como antes: solo recibe lo publicado mientras estaba registrado
+        difusion = and_(difusion, Notificacion.fecha >= usuario.fecha_registro)
+
+    return Notificacion.query.filter(or_(Notificacion.usuario_id == usuario.id, difusion))
+
+
+def leidas_hasta(usuario_id):
+    cursor = db.session.get(NotificacionCursor, usuario_id)
+    return cursor.leidas_hasta if cursor else 0
+
+
+def listar(usuario, limite=20):
+    """Últimas notificaciones del usuario con su estado de lectura"""
+    cursor = leidas_hasta(usuario.id)
+    notifs = visibles(usuario).order_by(Notificacion.id.desc()).limit(limite).all()
+
+    pendientes = [n.id for n in notifs if n.id > cursor]
+    leidas = set()
+    if pendientes:
+        leidas = {i for (i,) in db.session.query(NotificacionLeida.notificacion_id).filter(
+            NotificacionLeida.usuario_id == usuario.id,
+            NotificacionLeida.notificacion_id.in_(pendientes)
+        )}
+
+    return [
+        n.to_dict(usuario_id=usuario.id, leida=n.id <= cursor or n.id in leidas)
+        for n in notifs
+    ]
+
+
+def contar_no_leidas(usuario):
+    """Visibles por encima del cursor menos las leídas una a una"""
+    cursor = leidas_hasta(usuario.id)
+    recientes = visibles(usuario).filter(Notificacion.id > cursor)
+
+    total = recientes.with_entities(func.count(Notificacion.id)).scalar()
+    leidas = db.session.query(func.count(NotificacionLeida.notificacion_id)).filter(
+        NotificacionLeida.usuario_id == usuario.id,
+        NotificacionLeida.notificacion_id.in_(recientes.with_entities(Notificacion.id))
+    ).scalar()
+    return total - leidas
+
+
+def marcar_leida(usuario, notif_id):
+    """Marcar una notificación como leída; False si no le corresponde al usuario"""
+    notif = visibles(usuario).filter(Notificacion.id == notif_id).first()
+    if not notif:
+        return False
+
+    if notif.id > leidas_hasta(usuario.id):
+        try:
+            with db.session.begin_nested():
+                db.session.add(NotificacionLeida(usuario_id=usuario.id, notificacion_id=notif.id))
+        except IntegrityError:
+            return True  # Ya estaba marcada
+        if not _ajustar(usuario.id, -1):
+            iniciar_conteo(usuario)   # con la lectura recién agregada
+    return True
+
+
+def marcar_todas(usuario):
+    """Mover el cursor a la última notificación existente"""
+    # Total de difusiones y última id en la misma sentencia: una difusión
+    # confirmada entre dos lecturas quedaría en la base del contador sin
+    # estar cubierta por el cursor (no leída en la lista, 0 en el contador)
+    total, ultima = db.session.execute(select(
+        func.coalesce(_TOTAL_DIFUSION, 0), select(func.max(Notificacion.id)).scalar_subquery())).one()
+    ultima = ultima or 0
+
+    cursor = db.session.get(NotificacionCursor, usuario.id)
+    if cursor is None:
+        cursor = NotificacionCursor(usuario_id=usuario.id)
+        db.session.add(cursor)
+    cursor.leidas_hasta = max(cursor.leidas_hasta or 0, ultima)
+
+    # Las lecturas sueltas por debajo del cursor ya no hacen falta
+    NotificacionLeida.query.filter(
+        NotificacionLeida.usuario_id == usuario.id,
+        NotificacionLeida.notificacion_id <= cursor.leidas_hasta
+    ).delete(synchronize_session=False)
+    _reiniciar_conteo(usuario.id, 0, total)
+
+
+# ─── CONTADOR DE NO LEÍDAS ───────────────────────────────────────────────────
+# no_leidas = difusiones publicadas - difusion_base + ajuste, sin contar filas:
+#   - una difusión suma 1 al total global (una sola fila) y resta 1 al ajuste del autor
+#   - una personal suma 1 al ajuste del destinatario; leer una suelta resta 1
+#   - marcar todas deja difusion_base = total actual y ajuste = 0
+# Todo con UPDATE relativos dentro de la transacción que hace el cambio. La
+# fila del usuario se crea con el conteo exacto al registrarse o en su primera
+# lectura (una o todas); mientras falte, no_leidas() cuenta sin escribir
+# (verificar_notificaciones.py --reparar crea las que falten). Al borrar notificaciones (con su noticia) retirar() descuenta lo
+# que aportaban; cualquier otra deriva se corrige al marcar todas o con
+# verificar_notificaciones.py.
+
+_TOTAL_DIFUSION = select(NotificacionDifusion.total).where(NotificacionDifusion.id == 1).scalar_subquery()
+
+
+def _sumar_difusion():
+    if NotificacionDifusion.query.filter_by(id=1).update(
+            {'total': NotificacionDifusion.total + 1}, synchronize_session=False):
+        return
+    # Base sin la fila (no pasó por migraciones/0005): crearla con el conteo real
+    db.session.flush()
+    try:
+        with db.session.begin_nested():
+            total = db.session.query(func.count(Notificacion.id)).filter(Notificacion.usuario_id.is_(None)).scalar()
+            db.session.add(NotificacionDifusion(id=1, total=total))
+    except IntegrityError:
+        NotificacionDifusion.query.filter_by(id=1).update(
+            {'total': NotificacionDifusion.total + 1}, synchronize_session=False)
+
+
+def _ajustar(usuario_id, delta):
+    """Filas actualizadas (0 sin fila todavía: se creará con el conteo exacto)"""
+    return NotificacionConteo.query.filter_by(usuario_id=usuario_id).update(
+        {'ajuste': NotificacionConteo.ajuste + delta}, synchronize_session=False)
+
+
+def _reiniciar_conteo(usuario_id, no_leidas, total=None):
+    """Dejar el contador en `no_leidas` a partir de `total` difusiones (None: el total actual)"""
+    base = func.coalesce(_TOTAL_DIFUSION, 0) if total is None else total
+    if db.session.execute(update(NotificacionConteo).where(NotificacionConteo.usuario_id == usuario_id)
+                          .values(difusion_base=base, ajuste=no_leidas)).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            if total is None:
+                total = db.session.query(NotificacionDifusion.total).filter_by(id=1).scalar() or 0
+            db.session.add(NotificacionConteo(usuario_id=usuario_id, difusion_base=total, ajuste=no_leidas))
+    except IntegrityError:
+        pass  # Otra petición la creó en paralelo
+
+
+def iniciar_conteo(usuario):
+    """Crear la fila del contador con el conteo exacto si falta (confirma quien llama)"""
+    if db.session.get(NotificacionConteo, usuario.id) is None:
+        _reiniciar_conteo(usuario.id, contar_no_leidas(usuario))
+
+
+def retirar(notifs):
+    """Descontar del contador notificaciones que se van a borrar
+
+    Llamar antes del delete, en la misma transacción. Una difusión baja el
+    total de todos: a quien no la tenía como no leída (el autor, quien la
+    leyó suelta o con el cursor, quien se registró después) se le devuelve
+    en el ajuste. Una personal sin leer se resta a su destinatario.
+    """
+    for notif in notifs:
+        if notif.usuario_id is not None:
+            if notif.id > leidas_hasta(notif.usuario_id) and not db.session.get(
+                    NotificacionLeida, (notif.usuario_id, notif.id)):
+                _ajustar(notif.usuario_id, -1)
+            continue
+
+        NotificacionDifusion.query.filter_by(id=1).update(
+            {'total': NotificacionDifusion.total - 1}, synchronize_session=False)
+        leida_suelta = select(NotificacionLeida.usuario_id).where(NotificacionLeida.notificacion_id == notif.id)
+        # Sin subconsulta sobre notificaciones_conteo: MySQL no la permite en su propio UPDATE
+        no_la_contaban = select(Usuario.id) \
+            .outerjoin(NotificacionCursor, NotificacionCursor.usuario_id == Usuario.id) \
+            .where(or_(Usuario.id == notif.autor_id,
+                       Usuario.fecha_registro > notif.fecha,
+                       NotificacionCursor.leidas_hasta >= notif.id,
+                       Usuario.id.in_(leida_suelta)))
+        db.session.execute(update(NotificacionConteo)
+                           .where(NotificacionConteo.usuario_id.in_(no_la_contaban))
+                           .values(ajuste=NotificacionConteo.ajuste + 1))
+
+
+def no_leidas(usuario):
+    """Contador de no leídas con una consulta por PK
+
+    Solo lee (lo usan GET y el stream SSE): sin fila, el conteo exacto.
+    """
+    fila = db.session.query(NotificacionDifusion.total, NotificacionConteo.difusion_base, NotificacionConteo.ajuste) \
+        .outerjoin(NotificacionConteo, NotificacionConteo.usuario_id == usuario.id) \
+        .filter(NotificacionDifusion.id == 1).first()
+    if fila is not None and fila.difusion_base is not None:
+        return max(fila.total - fila.difusion_base + fila.ajuste, 0)
+    return contar_no_leidas(usuario)
+
+
+def verificar_no_leidas(reparar=False):
+    """Comparar el contador de cada usuario que lo tiene con el conteo exacto
+
+    Devuelve una lista de {'usuario_id', 'esperado', 'actual'}; con
+    reparar=True se corrigen, se crean las filas que falten y se confirma.
+    """
+    total = db.session.query(NotificacionDifusion.total).filter_by(id=1).scalar() or 0
+    diferencias = []
+    for conteo in NotificacionConteo.query.order_by(NotificacionConteo.usuario_id).all():
+        usuario = db.session.get(Usuario, conteo.usuario_id)
+        esperado = contar_no_leidas(usuario)
+        actual = total - conteo.difusion_base + conteo.ajuste
+        if actual == esperado:
+            continue
+        diferencias.append({'usuario_id': conteo.usuario_id, 'esperado': esperado, 'actual': actual})
+        if reparar:
+            conteo.difusion_base, conteo.ajuste = total, esperado
+
+    if reparar:
+        sin_fila = Usuario.query.outerjoin(NotificacionConteo, NotificacionConteo.usuario_id == Usuario.id) \
+            .filter(NotificacionConteo.usuario_id.is_(None))
+        for usuario in sin_fila.all():
+            iniciar_conteo(usuario)
+        db.session.commit()
+    return diferencias
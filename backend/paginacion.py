@@ -0,0 +1,109 @@
+import base64
+import json
+import threading
+import time
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import and_, or_, event
+from models import db
+
+# Paginación por cursor (keyset) sobre (fecha, id): cada página es un
+# WHERE (fecha, id) < (última fecha, último id) ... LIMIT n, sin OFFSET ni COUNT.
+
+
+def modo_cursor():
+    """El cliente opta por el modo cursor enviando ?cursor= (vacío = primera página)"""
+    return 'cursor' in request.args
+
+
+def codificar_cursor(*valores):
+    datos = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    return base64.urlsafe_b64encode(json.dumps(datos).encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Valores del cursor; ValueError si está mal formado"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except Exception:
+        raise ValueError('Cursor inválido')
+
+
+def paginar_cursor(query, col_fecha, col_id, cursor, limite, descendente=True):
+    """Devuelve (items, next_cursor) ordenando por (col_fecha, col_id)"""
+    if cursor:
+        valores = decodificar_cursor(cursor)
+        try:
+            fecha, ultimo_id = datetime.fromisoformat(valores[0]), int(valores[1])
+        except (TypeError, ValueError, IndexError):
+            raise ValueError('Cursor inválido')
+
+        if descendente:
+            query = query.filter(or_(col_fecha < fecha, and_(col_fecha == fecha, col_id < ultimo_id)))
+        else:
+            query = query.filter(or_(col_fecha > fecha, and_(col_fecha == fecha, col_id > ultimo_id)))
+
+    orden = (col_fecha.desc(), col_id.desc()) if descendente else (col_fecha.asc(), col_id.asc())
+    filas = query.order_by(None).order_by(*orden).limit(limite + 1).all()
+
+    siguiente = None
+    if len(filas) > limite:
+        filas = filas[:limite]
+        ultimo = filas[-1]
+        siguiente = codificar_cursor(getattr(ultimo, col_fecha.key), getattr(ultimo, col_id.key))
+    return filas, siguiente
+
+
+# ─── TOTALES CACHEADOS ───────────────────────────────────────────────────────
+
+_totales_lock = threading.Lock()
+
+
+def _totales():
+    return current_app.extensions.setdefault('paginacion_totales', {})
+
+
+def total_cacheado(tabla, clave, query):
+    """COUNT(*) cacheado por PAGINACION_TOTAL_TTL segundos
+
+    `tabla` agrupa las claves para invalidarlas cuando se insertan o
+    borran filas de esa tabla en este proceso.
+    """
+    ttl = current_app.config['PAGINACION_TOTAL_TTL']
+    ahora = time.monotonic()
+    totales = _totales()
+    with _totales_lock:
+        guardado = totales.get((tabla, clave))
+    if guardado and ahora - guardado[1] < ttl:
+        return guardado[0]
+
+    total = query.order_by(None).count()
+    with _totales_lock:
+        totales[(tabla, clave)] = (total, ahora)
+    return total
+
+
+def invalidar_totales(tabla):
+    totales = _totales()
+    with _totales_lock:
+        for clave in [c for c in totales if c[0] == tabla]:
+            del totales[clave]
+
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_cambios(sesion, contexto):
+    tablas = sesion.info.setdefault('tablas_con_altas_bajas', set())
+    for obj in list(sesion.new) + list(sesion.deleted):
+        tablas.add(obj.__tablename__)
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidar_tras_commit(sesion):
+    for tabla in sesion.info.pop('tablas_con_altas_bajas', ()):
+        invalidar_totales(tabla)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_cambios(sesion):
+    sesion.info.pop('tablas_con_altas_bajas', None)
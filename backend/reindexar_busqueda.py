@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Reconstruir el índice de búsqueda de noticias y comentarios
+(en MySQL/PostgreSQL crea los índices FULLTEXT nativos)
+Ejecutar: python reindexar_busqueda.py
+"""
+import sys
+
+from app import create_app
+from busqueda import reindexar_todo
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        try:
+            motor, total = reindexar_todo()
+        except Exception as e:
+            print(f"❌ Error reindexando: {e}")
+            return False
+
+    if motor == 'indice':
+        print(f"✅ Índice de búsqueda reconstruido ({total} noticias y comentarios)")
+    else:
+        print(f"✅ Índices FULLTEXT nativos creados para {motor}")
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
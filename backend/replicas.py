@@ -0,0 +1,225 @@
+import random
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import DateTime, Integer, String, column, event, func, select, table
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+# Réplicas de lectura (DB_REPLICAS). Las vistas marcadas con @solo_lectura
+# consultan una réplica; todo lo demás, y cualquier flush, va a la primaria.
+#
+# - Leer lo propio: tras escribir, el cliente recibe una cookie y durante
+#   DB_LECTURA_PROPIA_SEGUNDOS sus lecturas van a la primaria.
+# - Retraso: cada DB_REPLICA_INTERVALO segundos se comparan los sellos de la
+#   tabla `versiones` (cache_http.py) de la primaria y la réplica; la
+#   escritura más vieja que falta en la réplica da su retraso. Si supera
+#   DB_REPLICA_RETRASO_MAX se lee de la primaria.
+# - Fallos: si la réplica no responde se saca DB_REPLICA_REINTENTO segundos
+#   y la petición se repite en la primaria.
+#
+# Lo calculado en una réplica se guarda en la caché de resultados aparte y
+# con TTL de DB_REPLICA_RETRASO_MAX (ver cache.py), para que quien lee de la
+# primaria no reciba una copia atrasada.
+
+COOKIE_LECTURA_PROPIA = 'lectura_primaria'
+
+_versiones = table('versiones', column('clave', String), column('version', Integer),
+                   column('actualizado', DateTime))
+
+
+class SesionEnrutada(Session):
+    """Sesión de Flask-SQLAlchemy que lee de la réplica elegida para la petición"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing:
+            replica = replica_actual()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(SesionEnrutada, 'after_flush')
+def _marcar_escritura(sesion, contexto):
+    if has_request_context():
+        g.db_escribio = True
+
+
+def replica_actual():
+    return g.get('db_replica') if has_app_context() else None
+
+
+def ttl_replica():
+    """TTL máximo para cachear lo leído en la réplica actual (None = primaria)"""
+    if replica_actual() is None:
+        return None
+    return max(int(current_app.config['DB_REPLICA_RETRASO_MAX']), 1)
+
+
+# ─── ESTADO DE LAS RÉPLICAS ──────────────────────────────────────────────────
+
+class Replica:
+    def __init__(self, nombre, motor):
+        self.nombre = nombre
+        self.motor = motor
+        self.caida_hasta = 0
+        self.retraso = None
+        self.revisada = 0
+        self.error = None
+        self.lecturas = 0
+        self.fallos = 0
+        self._revisando = threading.Lock()
+
+
+def medir_retraso(primaria, replica):
+    """Segundos desde la escritura más vieja de la primaria que la réplica no tiene"""
+    with replica.connect() as conexion:
+        ultima = conexion.execute(select(func.max(_versiones.c.actualizado))).scalar()
+
+    consulta = select(_versiones.c.clave, _versiones.c.version, _versiones.c.actualizado)
+    if ultima is not None:
+        consulta = consulta.where(_versiones.c.actualizado >= ultima)
+    with primaria.connect() as conexion:
+        recientes = conexion.execute(consulta).all()
+    if not recientes:
+        return 0.0
+
+    with replica.connect() as conexion:
+        en_replica = dict(conexion.execute(
+            select(_versiones.c.clave, _versiones.c.version)
+            .where(_versiones.c.clave.in_([clave for clave, _, _ in recientes]))
+        ).all())
+
+    faltantes = [actualizado for clave, version, actualizado in recientes if en_replica.get(clave, 0) < version]
+    if not faltantes:
+        return 0.0
+    return max((datetime.utcnow() - min(faltantes)).total_seconds(), 0.0)
+
+
+class Replicas:
+    """Réplicas configuradas y su salud, compartidas por los hilos del proceso"""
+
+    def __init__(self, replicas, primaria, config):
+        self.replicas = replicas
+        self.primaria = primaria
+        self.retraso_max = config['DB_REPLICA_RETRASO_MAX']
+        self.intervalo = config['DB_REPLICA_INTERVALO']
+        self.reintento = config['DB_REPLICA_REINTENTO']
+        self.lecturas_primaria = 0
+
+    def marcar_caida(self, replica, error):
+        replica.caida_hasta = time.monotonic() + self.reintento
+        replica.error = str(error).splitlines()[0][:200]
+        replica.fallos += 1
+        current_app.logger.warning('Réplica %s fuera de servicio: %s', replica.nombre, replica.error)
+
+    def _revisar(self, replica):
+        # Un solo hilo mide; los demás usan el último valor
+        if not replica._revisando.acquire(blocking=False):
+            return
+        try:
+            replica.retraso = medir_retraso(self.primaria, replica.motor)
+            replica.error = None
+        except (OperationalError, InterfaceError) as e:
+            self.marcar_caida(replica, e)
+        finally:
+            replica.revisada = time.monotonic()
+            replica._revisando.release()
+
+    def _disponible(self, replica):
+        ahora = time.monotonic()
+        if replica.caida_hasta > ahora:
+            return False
+        if ahora - replica.revisada >= self.intervalo:
+            self._revisar(replica)
+        return (replica.caida_hasta <= time.monotonic()
+                and replica.retraso is not None and replica.retraso <= self.retraso_max)
+
+    def elegir(self):
+        """Una réplica sana al azar, None si hay que leer de la primaria"""
+        sanas = [r for r in self.replicas if self._disponible(r)]
+        if not sanas:
+            self.lecturas_primaria += 1
+            return None
+        replica = random.choice(sanas)
+        replica.lecturas += 1
+        return replica
+
+    def estado(self):
+        ahora = time.monotonic()
+        return {
+            'lecturas_primaria': self.lecturas_primaria,
+            'retraso_max': self.retraso_max,
+            'replicas': [{
+                'nombre': r.nombre,
+                'disponible': r.caida_hasta <= ahora and r.retraso is not None and r.retraso <= self.retraso_max,
+                'retraso_segundos': r.retraso,
+                'lecturas': r.lecturas,
+                'fallos': r.fallos,
+                'error': r.error,
+            } for r in self.replicas]
+        }
+
+
+def obtener_replicas():
+    """Replicas de la app, None si no hay DB_REPLICAS"""
+    extensiones = current_app.extensions
+    if 'replicas' not in extensiones:
+        from models import db
+        nombres = [n for n in current_app.config.get('SQLALCHEMY_BINDS', {}) if n.startswith('replica_')]
+        extensiones['replicas'] = Replicas(
+            [Replica(n, db.engines[n]) for n in sorted(nombres)], db.engine, current_app.config
+        ) if nombres else None
+    return extensiones['replicas']
+
+
+# ─── RUTAS ───────────────────────────────────────────────────────────────────
+
+def solo_lectura(f):
+    """Ejecutar la vista en una réplica (si hay una sana y el cliente no acaba de escribir)"""
+    @wraps(f)
+    def decorada(*args, **kwargs):
+        replicas = obtener_replicas()
+        if replicas is None or request.cookies.get(COOKIE_LECTURA_PROPIA):
+            return f(*args, **kwargs)
+
+        replica = replicas.elegir()
+        if replica is None:
+            return f(*args, **kwargs)
+
+        g.db_replica = replica.motor
+        try:
+            return f(*args, **kwargs)
+        except (OperationalError, InterfaceError) as e:
+            # La réplica falló a mitad de la petición: se repite en la primaria
+            from models import db
+            replicas.marcar_caida(replica, e)
+            db.session.rollback()
+        finally:
+            g.pop('db_replica', None)
+        return f(*args, **kwargs)
+    return decorada
+
+
+def configurar(app):
+    """Registrar las réplicas como binds (antes de db.init_app) y la cookie de leer lo propio"""
+    if not app.config['DB_REPLICAS']:
+        return
+    import conexiones
+
+    binds = app.config.setdefault('SQLALCHEMY_BINDS', {})
+    for i, url in enumerate(app.config['DB_REPLICAS']):
+        binds[f'replica_{i}'] = {
+            'url': url,
+            **conexiones.opciones_motor({**app.config, 'SQLALCHEMY_DATABASE_URI': url})
+        }
+
+    @app.after_request
+    def marcar_lectura_propia(response):
+        if g.get('db_escribio'):
+            segura = request.is_secure
+            response.set_cookie(COOKIE_LECTURA_PROPIA, '1', max_age=app.config['DB_LECTURA_PROPIA_SEGUNDOS'],
+                                httponly=True, secure=segura, samesite='None' if segura else 'Lax')
+        return response
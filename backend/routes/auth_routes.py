@@ -1,13 +1,25 @@
-from flask import Blueprint, request, jsonify
-from models import db, Usuario, Notificacion
-from auth import generate_token, token_required
+from flask import Blueprint, request, jsonify, abort, current_app
+from models import db, Usuario
+from auth import generate_token, generate_stream_token, token_required, usuario_de_token
+import contrasenas
+from limites import limitado
+import notificaciones
+import tiempo_real
 
 auth_bp = Blueprint('auth', __name__)
 
 
+@auth_bp.errorhandler(contrasenas.HasherOcupado)
+def hasher_ocupado(e):
+    """Ráfaga de logins/registros: mejor rechazar rápido que acaparar los workers"""
+    return jsonify({'detail': 'Demasiadas solicitudes de acceso, intenta de nuevo en unos segundos'}), 503, \
+        {'Retry-After': '2'}
+
+
 # ─── AUTH ────────────────────────────────────────────────────────────────────
 
 @auth_bp.route('/login', methods=['POST'])
+@limitado
 def login():
     """Endpoint de login"""
     data = request.get_json()
@@ -20,7 +32,12 @@ def login():
     if not usuario or not usuario.check_password(data['password']):
         return jsonify({'detail': 'Credenciales incorrectas'}), 401
 
-    token = generate_token(usuario.id)
+    if contrasenas.necesita_rehash(usuario.password_hash):
+        # Cambiaron los parámetros (PASSWORD_METODO): se actualiza sin que el usuario lo note
+        usuario.set_password(data['password'])
+        db.session.commit()
+
+    token = generate_token(usuario)
 
     return jsonify({
         'usuario': usuario.to_dict(),
@@ -30,6 +47,7 @@ def login():
 
 
 @auth_bp.route('/register', methods=['POST'])
+@limitado
 def register():
     """Endpoint de registro"""
     data = request.get_json()
@@ -49,9 +67,11 @@ def register():
     nuevo_usuario.set_password(data['password'])
 
     db.session.add(nuevo_usuario)
+    db.session.flush()
+    notificaciones.iniciar_conteo(nuevo_usuario)
     db.session.commit()
 
-    token = generate_token(nuevo_usuario.id)
+    token = generate_token(nuevo_usuario)
 
     return jsonify({
         'usuario': nuevo_usuario.to_dict(),
@@ -87,6 +107,16 @@ def update_profile(usuario):
     return jsonify(usuario.to_dict()), 200
 
 
+@auth_bp.route('/revocar', methods=['POST'])
+@token_required
+def revocar_sesiones(usuario):
+    """Cerrar sesión en todos los dispositivos (invalida los tokens emitidos)"""
+    usuario.token_version = (usuario.token_version or 0) + 1
+    db.session.commit()
+
+    return jsonify({'ok': True}), 200
+
+
 # ─── NOTIFICACIONES ──────────────────────────────────────────────────────────
 
 @auth_bp.route('/notificaciones', methods=['GET'])
@@ -95,29 +125,60 @@ def get_notificaciones(usuario):
     """Obtener notificaciones del usuario autenticado"""
     limite = request.args.get('limite', 20, type=int)
 
-    notifs = Notificacion.query.filter_by(usuario_id=usuario.id)\
-        .order_by(Notificacion.fecha.desc())\
-        .limit(limite).all()
-
-    no_leidas = Notificacion.query.filter_by(
-        usuario_id=usuario.id, leida=False
-    ).count()
-
     return jsonify({
-        'items': [n.to_dict() for n in notifs],
-        'no_leidas': no_leidas
+        'items': notificaciones.listar(usuario, limite),
+        'no_leidas': notificaciones.no_leidas(usuario)
     }), 200
 
 
+@auth_bp.route('/notificaciones/resumen', methods=['GET'])
+@token_required
+def get_resumen_notificaciones(usuario):
+    """Solo el contador de no leídas (para el badge, sin listar)"""
+    return jsonify({'no_leidas': notificaciones.no_leidas(usuario)}), 200
+
+
+@auth_bp.route('/notificaciones/stream/token', methods=['POST'])
+@token_required
+def token_stream_notificaciones(usuario):
+    """Token de vida corta para abrir el stream con EventSource (?token=)"""
+    segundos = current_app.config['SSE_TOKEN_TTL']
+    return jsonify({'stream_token': generate_stream_token(usuario, segundos), 'expira_en': segundos}), 200
+
+
+@auth_bp.route('/notificaciones/stream', methods=['GET'])
+def stream_notificaciones():
+    """Notificaciones y contador de no leídas en vivo (Server-Sent Events)
+
+    EventSource no puede enviar headers: ?token= acepta solo el token de
+    POST /notificaciones/stream/token (el de sesión quedaría en los logs).
+    Al expirar, la reconexión recibe 401 y el cliente pide otro.
+    """
+    if request.args.get('token'):
+        usuario, error = usuario_de_token(request.args['token'], uso='sse')
+    elif request.headers.get('Authorization', '').startswith('Bearer '):
+        usuario, error = usuario_de_token(request.headers['Authorization'].split(' ', 1)[1])
+    else:
+        return jsonify({'detail': 'Token requerido'}), 401
+    if error:
+        return jsonify({'detail': error}), 401
+
+    try:
+        return tiempo_real.stream(usuario)
+    except tiempo_real.DemasiadasConexiones as e:
+        if e.por_usuario:
+            return jsonify({'detail': 'Demasiadas conexiones abiertas para este usuario'}), 429
+        # Sin lugar en este proceso: el cliente sigue sondeando GET /notificaciones
+        return jsonify({'detail': 'Servicio de notificaciones en vivo ocupado'}), 503, {'Retry-After': '30'}
+
+
 @auth_bp.route('/notificaciones/<int:notif_id>/leer', methods=['POST'])
 @token_required
 def marcar_leida(usuario, notif_id):
     """Marcar una notificación como leída"""
-    notif = Notificacion.query.filter_by(
-        id=notif_id, usuario_id=usuario.id
-    ).first_or_404()
+    if not notificaciones.marcar_leida(usuario, notif_id):
+        abort(404)
 
-    notif.leida = True
     db.session.commit()
     return jsonify({'ok': True}), 200
 
@@ -126,9 +187,7 @@ def marcar_leida(usuario, notif_id):
 @token_required
 def marcar_todas_leidas(usuario):
     """Marcar todas las notificaciones del usuario como leídas"""
-    Notificacion.query.filter_by(
-        usuario_id=usuario.id, leida=False
-    ).update({'leida': True})
+    notificaciones.marcar_todas(usuario)
     db.session.commit()
     return jsonify({'ok': True}), 200
 
@@ -174,3 +233,17 @@ def cambiar_rol(usuario, usuario_id):
 
     return jsonify(target.to_dict()), 200
 
+
+@auth_bp.route('/usuarios/<int:usuario_id>/revocar', methods=['POST'])
+@token_required
+def revocar_usuario(usuario, usuario_id):
+    """Invalidar todos los tokens de un usuario (solo admin)"""
+    if usuario.rol != 'admin':
+        return jsonify({'detail': 'Acceso solo para admin'}), 403
+
+    target = Usuario.query.get_or_404(usuario_id)
+    target.token_version = (target.token_version or 0) + 1
+    db.session.commit()
+
+    return jsonify({'ok': True}), 200
+
@@ -1,6 +1,13 @@
 from flask import Blueprint, request, jsonify
 from models import db, Comentario, Reaccion, Noticia
-from auth import token_required
+from auth import token_required, token_optional
+import math
+from serializacion import con_autores, parsear_campos, proyectar, serializar
+from paginacion import modo_cursor, paginar_cursor, total_cacheado
+from cache_http import condicional
+from cache import respuesta_cacheada, clave_peticion
+from replicas import solo_lectura
+from contadores import ajustar_reaccion, resumen_reacciones, resumen_interacciones, parsear_incluir, INCLUIR_VALIDOS
 
 comentarios_bp = Blueprint('comentarios', __name__)
 
@@ -8,24 +15,62 @@ comentarios_bp = Blueprint('comentarios', __name__)
 # ─── COMENTARIOS ─────────────────────────────────────────────────────────────
 
 @comentarios_bp.route('/noticias/<int:noticia_id>/comentarios', methods=['GET'])
+@solo_lectura
+@condicional('noticia:{noticia_id}', 'comentarios:{noticia_id}', 'usuarios')
 def get_comentarios(noticia_id):
-    """Obtener comentarios de una noticia, paginados"""
-    Noticia.query.get_or_404(noticia_id)
+    """Obtener comentarios de una noticia, paginados (?cursor= para paginar por cursor)
+
+    ?campos=id,texto,usuario_nombre devuelve solo esos campos.
+    """
+    etiquetas = [f'noticia:{noticia_id}', f'comentarios:{noticia_id}', 'usuarios']
+    try:
+        campos = parsear_campos(Comentario, request.args.get('campos'))
+        return respuesta_cacheada('comentarios', f'{noticia_id}?{clave_peticion()}', etiquetas,
+                                  lambda: _listar_comentarios(noticia_id, campos))
+    except ValueError as e:
+        return jsonify({'detail': str(e)}), 400
+
+
+def _listar_comentarios(noticia_id, campos=None):
+    """Página de comentarios, None si la noticia no existe"""
+    if db.session.get(Noticia, noticia_id) is None:
+        return None
 
     pagina = request.args.get('pagina', 1, type=int)
     items_por_pagina = request.args.get('items_por_pagina', 5, type=int)
 
-    paginacion = Comentario.query.filter_by(noticia_id=noticia_id)\
-        .order_by(Comentario.fecha.asc())\
-        .paginate(page=pagina, per_page=items_por_pagina, error_out=False)
-
-    return jsonify({
-        'items': [c.to_dict() for c in paginacion.items],
-        'total': paginacion.total,
-        'total_paginas': paginacion.pages,
+    base = Comentario.query.filter_by(noticia_id=noticia_id)
+    if campos:
+        query = proyectar(base, Comentario, campos, orden=(Comentario.fecha,))
+        a_dicts = lambda filas: serializar(filas, Comentario, campos)
+    else:
+        query = con_autores(base, Comentario)
+        a_dicts = lambda comentarios: [c.to_dict() for c in comentarios]
+
+    if modo_cursor():
+        comentarios, siguiente = paginar_cursor(query, Comentario.fecha, Comentario.id,
+                                                request.args.get('cursor'), max(items_por_pagina, 1),
+                                                descendente=False)
+        respuesta = {
+            'items': a_dicts(comentarios),
+            'next_cursor': siguiente,
+            'items_por_pagina': items_por_pagina
+        }
+        if request.args.get('total') == '1':
+            respuesta['total'] = total_cacheado('comentarios', noticia_id, base)
+        return respuesta
+
+    paginacion = query.order_by(Comentario.fecha.asc(), Comentario.id.asc())\
+        .paginate(page=pagina, per_page=items_por_pagina, error_out=False, count=False)
+    total = total_cacheado('comentarios', noticia_id, base)
+
+    return {
+        'items': a_dicts(paginacion.items),
+        'total': total,
+        'total_paginas': math.ceil(total / paginacion.per_page),
         'pagina_actual': paginacion.page,
         'items_por_pagina': items_por_pagina
-    }), 200
+    }
 
 
 @comentarios_bp.route('/noticias/<int:noticia_id>/comentarios', methods=['POST'])
@@ -74,20 +119,49 @@ def eliminar_comentario(usuario, comentario_id):
 # ─── REACCIONES ──────────────────────────────────────────────────────────────
 
 TIPOS_VALIDOS = {'like', 'love', 'wow', 'sad', 'angry'}
+MAX_IDS_LOTE = 100
 
 
 @comentarios_bp.route('/noticias/<int:noticia_id>/reacciones', methods=['GET'])
+@solo_lectura
+@condicional('noticia:{noticia_id}', 'reacciones:{noticia_id}')
 def get_reacciones(noticia_id):
-    """Obtener conteo de reacciones de una noticia"""
-    Noticia.query.get_or_404(noticia_id)
+    """Obtener conteo de reacciones de una noticia (desde los contadores)"""
+    return respuesta_cacheada('reacciones', noticia_id, [f'reacciones:{noticia_id}', f'noticia:{noticia_id}'],
+                              lambda: resumen_reacciones(noticia_id))
+
+
+def _claves_lote(kwargs):
+    """Sellos por noticia del lote (ids inválidos: la vista responde 400)"""
+    ids = [i for i in request.args.get('ids', '').split(',') if i.strip().isdigit()][:MAX_IDS_LOTE]
+    return [f'{tabla}:{int(i)}' for i in ids for tabla in ('noticia', 'reacciones', 'comentarios')]
+
+
+@comentarios_bp.route('/noticias/interacciones', methods=['GET'])
+@condicional(_claves_lote)
+@token_optional
+def get_interacciones(usuario):
+    """Reacciones, total de comentarios y reacción propia de varias noticias
+
+    ?ids=1,2,3 (máximo MAX_IDS_LOTE) y opcionalmente ?incluir=reacciones,comentarios,mi_reaccion
+    """
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        return jsonify({'detail': 'ids debe ser una lista de enteros separados por comas'}), 400
 
-    reacciones = Reaccion.query.filter_by(noticia_id=noticia_id).all()
+    try:
+        incluir = parsear_incluir(request.args.get('incluir')) or INCLUIR_VALIDOS
+    except ValueError as e:
+        return jsonify({'detail': str(e)}), 400
 
-    conteo = {'like': 0, 'love': 0, 'wow': 0, 'sad': 0, 'angry': 0}
-    for r in reacciones:
-        conteo[r.tipo] += 1
+    if not ids:
+        return jsonify({'detail': 'Parámetro ids requerido'}), 400
+    if len(ids) > MAX_IDS_LOTE:
+        return jsonify({'detail': f'Máximo {MAX_IDS_LOTE} noticias por petición'}), 400
 
-    return jsonify({'conteo': conteo, 'total': len(reacciones)}), 200
+    resumen = resumen_interacciones(ids, usuario, incluir)
+    return jsonify({'items': {str(k): v for k, v in resumen.items()}}), 200
 
 
 @comentarios_bp.route('/noticias/<int:noticia_id>/reacciones/mi-reaccion', methods=['GET'])
@@ -122,15 +196,19 @@ def reaccionar(usuario, noticia_id):
     if existente:
         if existente.tipo == tipo:
             db.session.delete(existente)
+            ajustar_reaccion(noticia_id, anterior=tipo)
             db.session.commit()
             return jsonify({'message': 'Reacción quitada', 'tipo': None}), 200
         else:
+            anterior = existente.tipo
             existente.tipo = tipo
+            ajustar_reaccion(noticia_id, anterior=anterior, nuevo=tipo)
             db.session.commit()
             return jsonify(existente.to_dict()), 200
     else:
         reaccion = Reaccion(noticia_id=noticia_id, usuario_id=usuario.id, tipo=tipo)
         db.session.add(reaccion)
+        ajustar_reaccion(noticia_id, nuevo=tipo)
         db.session.commit()
         return jsonify(reaccion.to_dict()), 201
 
@@ -145,6 +223,7 @@ def quitar_reaccion(usuario, noticia_id):
 
     if reaccion:
         db.session.delete(reaccion)
+        ajustar_reaccion(noticia_id, anterior=reaccion.tipo)
         db.session.commit()
 
     return jsonify({'message': 'Reacción eliminada'}), 200
@@ -1,28 +1,185 @@
+import math
 from flask import Blueprint, request, jsonify
 from models import db, Evento, Usuario
 from auth import token_required
-from datetime import datetime
+from serializacion import con_autores, parsear_campos, proyectar, serializar
+from paginacion import modo_cursor, paginar_cursor, total_cacheado
+from sqlalchemy import func
+from cache_http import condicional
+from cache import respuesta_cacheada, clave_peticion
+from replicas import solo_lectura
+from datetime import datetime, date, time, timedelta, timezone
 
 eventos_bp = Blueprint('eventos', __name__)
 
 CATEGORIAS_VALIDAS = ['Cultural', 'Deportivo', 'Cívico', 'Comunitario', 'Educativo', 'General']
+ESTADOS_VALIDOS = ('proximos', 'pasados', 'hoy')
 
 
 @eventos_bp.route('', methods=['GET'])
+@solo_lectura
+@condicional('eventos', 'usuarios', 'imagenes', variar=lambda: date.today().isoformat())  # dias_restantes
 def get_eventos():
-    """Listar eventos (con filtro de categoría opcional)"""
+    """Listar eventos (con filtro de categoría opcional)
+
+    Filtros: ?estado=proximos|pasados|hoy (según la fecha del servidor) y
+    ?desde= / ?hasta= (ISO 8601; 'hasta' con solo fecha incluye ese día).
+    Los pasados se ordenan del más reciente al más viejo.
+    Sin paginación devuelve la lista completa; con ?pagina= páginas de
+    ?items_por_pagina (20 por defecto) con total, y con ?cursor= páginas
+    con next_cursor. ?campos=id,titulo,fecha_evento devuelve solo esos campos.
+    """
+    clave = f'{date.today().isoformat()}?{clave_peticion()}'
+    try:
+        return respuesta_cacheada('eventos', clave, ['eventos', 'usuarios', 'imagenes'], _listar_eventos)
+    except ValueError as e:
+        return jsonify({'detail': str(e)}), 400
+
+
+def _utc(fecha):
+    """fecha_evento se guarda en UTC sin zona: con offset (-05:00) se convierte, sin zona se deja"""
+    if fecha.tzinfo is not None:
+        fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+    return fecha
+
+
+def _fecha_param(nombre):
+    """datetime del parámetro (None si no viene); ValueError si está mal formado"""
+    valor = request.args.get(nombre, '').strip()
+    if not valor:
+        return None
+    try:
+        fecha = datetime.fromisoformat(valor.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'Formato de fecha inválido en {nombre} (usa ISO 8601)')
+    fecha = _utc(fecha)
+    if nombre == 'hasta' and len(valor) == 10:
+        fecha += timedelta(days=1)   # hasta=2025-03-31 incluye todo el 31
+    return fecha
+
+
+def _listar_eventos():
     cat = request.args.get('categoria', '')
+    estado = request.args.get('estado', '')
+    if estado and estado not in ESTADOS_VALIDOS:
+        raise ValueError(f"estado debe ser uno de: {', '.join(ESTADOS_VALIDOS)}")
+    desde, hasta = _fecha_param('desde'), _fecha_param('hasta')
+    campos = parsear_campos(Evento, request.args.get('campos'))
+
+    # Una sola fecha de referencia para el filtro y para dias_restantes de cada fila
+    hoy = date.today()
+    inicio_hoy = datetime.combine(hoy, time.min)
+
     q = Evento.query
     if cat and cat != 'Todos':
         q = q.filter(Evento.categoria == cat)
-    # Ordenar: próximos primero, luego pasados
-    eventos = q.order_by(Evento.fecha_evento.asc()).all()
-    return jsonify([e.to_dict() for e in eventos]), 200
+    if estado in ('proximos', 'hoy'):
+        q = q.filter(Evento.fecha_evento >= inicio_hoy)
+    if estado == 'hoy':
+        q = q.filter(Evento.fecha_evento < inicio_hoy + timedelta(days=1))
+    if estado == 'pasados':
+        q = q.filter(Evento.fecha_evento < inicio_hoy)
+    if desde:
+        q = q.filter(Evento.fecha_evento >= desde)
+    if hasta:
+        q = q.filter(Evento.fecha_evento < hasta)
+    base = q
+    if campos:
+        q = proyectar(base, Evento, campos, orden=(Evento.fecha_evento,))
+        a_dicts = lambda filas: serializar(filas, Evento, campos, hoy=hoy)
+    else:
+        q = con_autores(base, Evento)
+        a_dicts = lambda eventos: [e.to_dict(hoy) for e in eventos]
+    descendente = estado == 'pasados'
+    filtros = f'{cat}|{estado}|{desde}|{hasta}|{hoy}'
+
+    if modo_cursor():
+        items_por_pagina = request.args.get('items_por_pagina', 20, type=int)
+        eventos, siguiente = paginar_cursor(q, Evento.fecha_evento, Evento.id, request.args.get('cursor'),
+                                            max(items_por_pagina, 1), descendente=descendente)
+        respuesta = {
+            'items': a_dicts(eventos),
+            'next_cursor': siguiente,
+            'items_por_pagina': items_por_pagina
+        }
+        if request.args.get('total') == '1':
+            respuesta['total'] = total_cacheado('eventos', filtros, base)
+        return respuesta
+
+    orden = (Evento.fecha_evento.desc(), Evento.id.desc()) if descendente else (Evento.fecha_evento.asc(), Evento.id.asc())
+    if 'pagina' in request.args:
+        pagina = max(request.args.get('pagina', 1, type=int), 1)
+        items_por_pagina = max(request.args.get('items_por_pagina', 20, type=int), 1)
+        eventos = q.order_by(*orden).limit(items_por_pagina).offset((pagina - 1) * items_por_pagina).all()
+        total = total_cacheado('eventos', filtros, base)
+        return {
+            'items': a_dicts(eventos),
+            'total': total,
+            'pagina_actual': pagina,
+            'items_por_pagina': items_por_pagina,
+            'total_paginas': math.ceil(total / items_por_pagina)
+        }
+
+    return a_dicts(q.order_by(*orden).all())
+
+
+# ─── CALENDARIO ──────────────────────────────────────────────────────────────
+
+def _periodo(columna, por_dia):
+    """Expresión SQL 'YYYY-MM-DD' (o 'YYYY-MM') de la columna según el motor"""
+    dialecto = db.engine.dialect.name
+    if dialecto in ('mysql', 'mariadb'):
+        return func.date_format(columna, '%Y-%m-%d' if por_dia else '%Y-%m')
+    if dialecto == 'postgresql':
+        return func.to_char(columna, 'YYYY-MM-DD' if por_dia else 'YYYY-MM')
+    return func.strftime('%Y-%m-%d' if por_dia else '%Y-%m', columna)
+
+
+@eventos_bp.route('/calendario', methods=['GET'])
+@solo_lectura
+@condicional('eventos', variar=lambda: date.today().strftime('%Y-%m'))   # mes por omisión
+def get_calendario():
+    """Cantidad de eventos por día de un mes (?mes=YYYY-MM) o por mes de un año (?anio=YYYY)
+
+    Solo conteos agrupados en SQL, sin serializar eventos. ?categoria= opcional.
+    """
+    try:
+        if request.args.get('anio'):
+            inicio = datetime(int(request.args['anio']), 1, 1)
+            fin, por_dia = inicio.replace(year=inicio.year + 1), False
+        else:
+            inicio = datetime.strptime(request.args.get('mes') or date.today().strftime('%Y-%m'), '%Y-%m')
+            fin, por_dia = (inicio + timedelta(days=32)).replace(day=1), True
+    except (ValueError, OverflowError):   # OverflowError: ?mes=9999-12
+        return jsonify({'detail': 'Usa ?mes=YYYY-MM o ?anio=YYYY'}), 400
+
+    cat = request.args.get('categoria', '')
+
+    def calcular():
+        periodo = _periodo(Evento.fecha_evento, por_dia)
+        q = db.session.query(periodo, func.count(Evento.id)) \
+            .filter(Evento.fecha_evento >= inicio, Evento.fecha_evento < fin)
+        if cat and cat != 'Todos':
+            q = q.filter(Evento.categoria == cat)
+        conteos = dict(q.group_by(periodo).order_by(periodo).all())
+        return {
+            'desde': inicio.date().isoformat(),
+            'hasta': (fin - timedelta(days=1)).date().isoformat(),
+            'agrupado_por': 'dia' if por_dia else 'mes',
+            'conteos': conteos,
+            'total': sum(conteos.values())
+        }
+
+    # El mes resuelto va en la clave: sin ?mes cambia con la fecha del servidor
+    clave = f'calendario:{inicio.date().isoformat()}?{clave_peticion()}'
+    return respuesta_cacheada('eventos', clave, ['eventos'], calcular)
 
 
 @eventos_bp.route('/<int:id>', methods=['GET'])
+@solo_lectura
+@condicional('evento:{id}', 'usuarios', 'imagenes', variar=lambda: date.today().isoformat())
 def get_evento(id):
-    evento = Evento.query.get_or_404(id)
+    evento = con_autores(Evento.query.filter_by(id=id), Evento).first_or_404()
     return jsonify(evento.to_dict()), 200
 
 
@@ -40,7 +197,7 @@ def crear_evento(usuario):
             return jsonify({'detail': f'Campo requerido: {c}'}), 400
 
     try:
-        fecha = datetime.fromisoformat(data['fecha_evento'].replace('Z', '+00:00'))
+        fecha = _utc(datetime.fromisoformat(data['fecha_evento'].replace('Z', '+00:00')))
     except Exception:
         return jsonify({'detail': 'Formato de fecha inválido (usa ISO 8601)'}), 400
 
@@ -74,7 +231,7 @@ def actualizar_evento(usuario, id):
     if 'lugar' in data:         evento.lugar = data['lugar']
     if 'fecha_evento' in data:
         try:
-            evento.fecha_evento = datetime.fromisoformat(data['fecha_evento'].replace('Z', '+00:00'))
+            evento.fecha_evento = _utc(datetime.fromisoformat(data['fecha_evento'].replace('Z', '+00:00')))
         except Exception:
             return jsonify({'detail': 'Formato de fecha inválido'}), 400
 
@@ -1,62 +1,147 @@
 from flask import Blueprint, request, jsonify
-from models import db, Noticia, Usuario, Notificacion, Comentario
-from auth import token_required, admin_required
-from sqlalchemy import or_
+from models import db, Noticia, ReaccionConteo
+from auth import token_required, admin_required, usuario_opcional
+from serializacion import con_autores, parsear_campos, proyectar, serializar
+from contadores import resumen_interacciones, parsear_incluir
+from tareas import encolar
+from busqueda import buscar
+from paginacion import modo_cursor, paginar_cursor, codificar_cursor, decodificar_cursor, total_cacheado
+from cache_http import condicional
+from cache import respuesta_cacheada, clave_peticion
+from replicas import solo_lectura
+import math
+import notificaciones
 
 noticias_bp = Blueprint('noticias', __name__)
 
 
+def _feed_por_contenido():
+    """La búsqueda mira comentarios e ?incluir= trae interacciones: sellos por noticia"""
+    return bool(request.args.get('busqueda') or request.args.get('incluir'))
+
+
 @noticias_bp.route('', methods=['GET'])
+@solo_lectura
+@condicional('noticias', 'usuarios', 'imagenes', por_contenido=_feed_por_contenido)
 def get_noticias():
-    """Obtener noticias con paginación y filtros (incluye búsqueda en comentarios)"""
+    """Obtener noticias con paginación y filtros (la búsqueda incluye comentarios)
+
+    ?incluir=reacciones,comentarios,mi_reaccion agrega a cada noticia sus
+    interacciones (mismo formato que /noticias/interacciones).
+    ?cursor= activa la paginación por cursor: devuelve next_cursor y solo
+    calcula total_items si se pide con ?total=1.
+    ?campos=id,titulo,imagen,autor_nombre devuelve solo esos campos.
+    El listado sin búsqueda ni incluir se sirve desde la caché de resultados.
+    """
     pagina = request.args.get('pagina', 1, type=int)
     items_por_pagina = request.args.get('items_por_pagina', 4, type=int)
     categoria = request.args.get('categoria', None)
     busqueda = request.args.get('busqueda', None)
+    cursor = request.args.get('cursor', '')
+
+    try:
+        incluir = parsear_incluir(request.args.get('incluir'))
+        campos = parsear_campos(Noticia, request.args.get('campos'))
+    except ValueError as e:
+        return jsonify({'detail': str(e)}), 400
+
+    if categoria == 'Todos':
+        categoria = None
+
+    def listar():
+        return _listar_noticias(pagina, items_por_pagina, categoria, busqueda, cursor, incluir, campos)
 
-    query = Noticia.query
+    try:
+        if busqueda or incluir:
+            return jsonify(listar()), 200
+        return respuesta_cacheada('feed', clave_peticion(), [f"feed:{categoria or '*'}", 'usuarios', 'imagenes'], listar)
+    except (ValueError, IndexError, TypeError):
+        return jsonify({'detail': 'Cursor inválido'}), 400
 
-    if categoria and categoria != 'Todos':
-        query = query.filter_by(categoria=categoria)
 
+def _listar_noticias(pagina, items_por_pagina, categoria, busqueda, cursor, incluir, campos=None):
+    """Página del listado; ValueError/IndexError/TypeError si el cursor es inválido
+
+    Con campos (?campos=) se leen solo esas columnas, sin instancias ORM.
+    """
+    siguiente = None
     if busqueda:
-        search_term = f'%{busqueda}%'
-        # Buscar en noticias Y en comentarios de esas noticias
-        noticias_con_comentario = db.session.query(Comentario.noticia_id)\
-            .filter(Comentario.texto.like(search_term)).subquery()
-
-        query = query.filter(
-            or_(
-                Noticia.titulo.like(search_term),
-                Noticia.descripcion.like(search_term),
-                Noticia.contenido.like(search_term),
-                Noticia.id.in_(noticias_con_comentario)
-            )
-        )
-
-    query = query.order_by(Noticia.fecha.desc())
-    paginacion = query.paginate(page=pagina, per_page=items_por_pagina, error_out=False)
-
-    return jsonify({
-        'items': [noticia.to_dict() for noticia in paginacion.items],
-        'total_items': paginacion.total,
-        'total_paginas': paginacion.pages,
-        'pagina_actual': paginacion.page,
+        # Índice de búsqueda con ranking: el orden y la página los da la consulta
+        items_por_pagina = max(items_por_pagina, 1)
+        if modo_cursor():
+            # El orden es por relevancia: el cursor es la posición
+            desde = int(decodificar_cursor(cursor)[0]) if cursor else 0
+        else:
+            pagina = max(pagina, 1)
+            desde = (pagina - 1) * items_por_pagina
+        ids_pagina, total = buscar(busqueda, categoria, items_por_pagina, desde)
+        hasta = desde + items_por_pagina
+        siguiente = codificar_cursor(hasta) if hasta < total else None
+
+        query = Noticia.query.filter(Noticia.id.in_(ids_pagina))
+        query = proyectar(query, Noticia, campos) if campos else con_autores(query, Noticia)
+        por_id = {n.id: n for n in query}
+        noticias = [por_id[i] for i in ids_pagina if i in por_id]
+        total_paginas = math.ceil(total / items_por_pagina)
+    else:
+        base = Noticia.query
+        if categoria:
+            base = base.filter_by(categoria=categoria)
+        query = proyectar(base, Noticia, campos, orden=(Noticia.fecha,)) if campos else con_autores(base, Noticia)
+
+        if modo_cursor():
+            noticias, siguiente = paginar_cursor(query, Noticia.fecha, Noticia.id, cursor, max(items_por_pagina, 1))
+            total = None
+            if request.args.get('total') == '1':
+                total = total_cacheado('noticias', categoria, base)
+        else:
+            paginacion = query.order_by(Noticia.fecha.desc(), Noticia.id.desc())\
+                .paginate(page=pagina, per_page=items_por_pagina, error_out=False, count=False)
+            noticias, pagina = paginacion.items, paginacion.page
+            total = total_cacheado('noticias', categoria, base)
+            total_paginas = math.ceil(total / paginacion.per_page)
+
+    if campos:
+        items = serializar(noticias, Noticia, campos)
+    else:
+        items = [noticia.to_dict() for noticia in noticias]
+    if incluir:
+        usuario = usuario_opcional() if 'mi_reaccion' in incluir else None
+        interacciones = resumen_interacciones([n['id'] for n in items], usuario, incluir)
+        for item in items:
+            item.update(interacciones.get(item['id'], {}))
+
+    if modo_cursor():
+        respuesta = {'items': items, 'next_cursor': siguiente, 'items_por_pagina': items_por_pagina}
+        if total is not None:
+            respuesta['total_items'] = total
+        return respuesta
+
+    return {
+        'items': items,
+        'total_items': total,
+        'total_paginas': total_paginas,
+        'pagina_actual': pagina,
         'items_por_pagina': items_por_pagina
-    }), 200
+    }
 
 
 @noticias_bp.route('/<int:id>', methods=['GET'])
+@solo_lectura
+@condicional('noticia:{id}', 'usuarios', 'imagenes')
 def get_noticia(id):
     """Obtener una noticia por ID"""
-    noticia = Noticia.query.get_or_404(id)
-    return jsonify(noticia.to_dict()), 200
+    def calcular():
+        noticia = con_autores(Noticia.query.filter_by(id=id), Noticia).first()
+        return noticia.to_dict() if noticia else None
+
+    return respuesta_cacheada('noticia', id, [f'noticia:{id}', 'usuarios', 'imagenes'], calcular)
 
 
 @noticias_bp.route('', methods=['POST'])
 @token_required
 def create_noticia(usuario):
-    """Crear una nueva noticia y notificar a todos los usuarios"""
+    """Crear una nueva noticia y encolar la notificación a todos los usuarios"""
     data = request.get_json()
 
     if not data or not data.get('titulo') or not data.get('descripcion'):
@@ -70,20 +155,16 @@ def create_noticia(usuario):
         imagen=data.get('imagen'),
         autor_id=usuario.id
     )
+    nueva_noticia.conteo_reacciones = ReaccionConteo()
 
     db.session.add(nueva_noticia)
     db.session.flush()  # Para obtener el ID antes del commit
 
-    # Crear notificaciones para todos los usuarios excepto el autor
-    todos_usuarios = Usuario.query.filter(Usuario.id != usuario.id).all()
-    mensaje = f'Nueva noticia: {nueva_noticia.titulo}'
-    for u in todos_usuarios:
-        notif = Notificacion(
-            usuario_id=u.id,
+    # La notificación se publica en segundo plano cuando se confirme la noticia
+    encolar('notificar_noticia',
             noticia_id=nueva_noticia.id,
-            mensaje=mensaje
-        )
-        db.session.add(notif)
+            autor_id=usuario.id,
+            mensaje=f'Nueva noticia: {nueva_noticia.titulo}')
 
     db.session.commit()
 
@@ -125,6 +206,7 @@ def delete_noticia(usuario, id):
     if noticia.autor_id != usuario.id and usuario.rol != 'admin':
         return jsonify({'detail': 'No tienes permiso para eliminar esta noticia'}), 403
 
+    notificaciones.retirar(noticia.notificaciones)   # sus notificaciones se borran en cascada
     db.session.delete(noticia)
     db.session.commit()
     return jsonify({'message': 'Noticia eliminada correctamente'}), 200
@@ -1,63 +1,123 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.utils import secure_filename
 import os
-import uuid
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from models import db, Imagen
+import archivos
+from imagenes import EXTENSIONES
+from limites import ip_cliente
+from subidas import SubidaInvalida, recibir_formulario, crear_sesion, estado_sesion, agregar_bloque, terminar_sesion
+from tareas import encolar
 
 upload_bp = Blueprint('upload', __name__)
 
-# Configuración
-UPLOAD_FOLDER = 'uploads'
-ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
-MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
-def allowed_file(filename):
-    """Verificar si el archivo tiene una extensión permitida"""
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def _registrar(temporal, hash_contenido, formato):
+    """Mover la subida a pendientes/<hash>.<ext> y encolar su procesamiento
+
+    Si ya existe una imagen con el mismo contenido se reutiliza; si no quedó
+    'lista' (falló o la tarea se perdió) se vuelve a encolar con esta copia.
+    """
+    unique_filename = f"{hash_contenido}.{EXTENSIONES[formato]}"
+    # Guardar SOLO la ruta relativa en la BD, no la URL absoluta
+    # Esto evita problemas de Mixed Content y dependencias de dominio
+    image_url = archivos.url(unique_filename)
+
+    imagen = Imagen.query.filter_by(url=image_url).first()
+    if imagen is None:
+        imagen = Imagen(url=image_url, formato=formato)
+        db.session.add(imagen)
+        try:
+            db.session.flush()
+        except IntegrityError:
+            # Otra subida idéntica ganó la carrera
+            db.session.rollback()
+            imagen = Imagen.query.filter_by(url=image_url).one()
+        else:
+            os.replace(temporal, archivos.ruta_pendiente(unique_filename))
+            temporal = None
+            encolar('procesar_imagen', imagen_id=imagen.id)
+            db.session.commit()
+    elif imagen.estado != 'lista':
+        os.replace(temporal, archivos.ruta_pendiente(unique_filename))
+        temporal = None
+        imagen.estado = 'pendiente'
+        encolar('procesar_imagen', imagen_id=imagen.id)
+        db.session.commit()
+
+    if temporal:
+        # Ya existía: se descarta la copia y se renueva el plazo de gracia del limpiador
+        os.remove(temporal)
+        for existente in (archivos.ruta(unique_filename), archivos.ruta_pendiente(unique_filename)):
+            if os.path.exists(existente):
+                os.utime(existente)
+
+    return {
+        'url': image_url,
+        'filename': unique_filename,
+        'imagen_id': imagen.id,
+        'message': 'Imagen subida exitosamente'
+    }
+
 
 @upload_bp.route('/upload', methods=['POST'])
 def upload_file():
-    """Subir una imagen"""
+    """Subir una imagen (se escribe en streaming; las variantes se generan en segundo plano)"""
     try:
-        # Verificar que se envió un archivo
-        if 'file' not in request.files:
-            return jsonify({'error': 'No se envió ningún archivo'}), 400
-        
-        file = request.files['file']
-        
-        # Verificar que el archivo tiene nombre
-        if file.filename == '':
-            return jsonify({'error': 'No se seleccionó ningún archivo'}), 400
-        
-        # Verificar extensión
-        if not allowed_file(file.filename):
-            return jsonify({'error': 'Tipo de archivo no permitido. Solo: ' + ', '.join(ALLOWED_EXTENSIONS)}), 400
-        
-        # Verificar tamaño (Flask ya limita, pero lo verificamos también)
-        file.seek(0, os.SEEK_END)
-        file_length = file.tell()
-        if file_length > MAX_FILE_SIZE:
-            return jsonify({'error': 'El archivo es demasiado grande. Máximo 5MB'}), 400
-        file.seek(0)
-        
-        # Generar nombre único para el archivo
-        filename = secure_filename(file.filename)
-        extension = filename.rsplit('.', 1)[1].lower()
-        unique_filename = f"{uuid.uuid4().hex}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
-        
-        # Guardar el archivo
-        filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
-        file.save(filepath)
-        
-        # Guardar SOLO la ruta relativa en la BD, no la URL absoluta
-        # Esto evita problemas de Mixed Content y dependencias de dominio
-        image_url = f"/uploads/{unique_filename}"
-        
-        return jsonify({
-            'url': image_url,
-            'filename': unique_filename,
-            'message': 'Imagen subida exitosamente'
-        }), 200
-        
+        temporal, hash_contenido, formato = recibir_formulario('file')
+        return jsonify(_registrar(temporal, hash_contenido, formato)), 200
+
+    except SubidaInvalida as e:
+        return jsonify({'error': e.detalle}), e.codigo
     except Exception as e:
         return jsonify({'error': f'Error al subir la imagen: {str(e)}'}), 500
+
+
+# ─── SUBIDAS REANUDABLES ─────────────────────────────────────────────────────
+
+@upload_bp.route('/upload/sesiones', methods=['POST'])
+def crear_sesion_subida():
+    """Iniciar una subida por partes: {'tamano': bytes, 'nombre': 'foto.jpg'}"""
+    data = request.get_json(silent=True) or {}
+    try:
+        sesion_id = crear_sesion(data.get('tamano'), data.get('nombre'), ip_cliente())
+    except SubidaInvalida as e:
+        return jsonify({'error': e.detalle}), e.codigo
+
+    respuesta = jsonify({'id': sesion_id, 'offset': 0, 'url': f'/api/upload/sesiones/{sesion_id}'})
+    respuesta.headers['Upload-Offset'] = '0'
+    return respuesta, 201
+
+
+@upload_bp.route('/upload/sesiones/<sesion_id>', methods=['HEAD'])
+def estado_sesion_subida(sesion_id):
+    """Hasta dónde llegó una subida (para reanudarla)"""
+    try:
+        offset, tamano = estado_sesion(sesion_id)
+    except SubidaInvalida as e:
+        return '', e.codigo
+    return '', 200, {'Upload-Offset': str(offset), 'Upload-Length': str(tamano), 'Cache-Control': 'no-store'}
+
+
+@upload_bp.route('/upload/sesiones/<sesion_id>', methods=['PATCH'])
+def enviar_bloque(sesion_id):
+    """Enviar un bloque: cuerpo binario a partir del header Upload-Offset"""
+    offset = request.headers.get('Upload-Offset', type=int)
+    if offset is None:
+        return jsonify({'error': 'Falta el header Upload-Offset'}), 400
+
+    try:
+        _, tamano = estado_sesion(sesion_id)
+        if request.content_length and offset + request.content_length > tamano:
+            # Se rechaza antes de leer el cuerpo
+            return jsonify({'error': 'El bloque supera el tamaño declarado'}), 400
+
+        offset, tamano = agregar_bloque(sesion_id, offset, request.stream)
+        if offset < tamano:
+            return jsonify({'offset': offset}), 200, {'Upload-Offset': str(offset)}
+
+        parcial, hash_contenido, formato = terminar_sesion(sesion_id)
+        return jsonify({'offset': offset, **_registrar(parcial, hash_contenido, formato)}), 200, \
+            {'Upload-Offset': str(offset)}
+
+    except SubidaInvalida as e:
+        return jsonify({'error': e.detalle}), e.codigo
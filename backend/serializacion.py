@@ -0,0 +1,184 @@
+from flask import current_app, request
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, selectinload, lazyload
+from models import Usuario, Noticia, Comentario, Evento, Imagen, IMAGEN_NOTICIA_POR_OMISION
+
+# Estrategias de carga disponibles para la relación autor/usuario
+ESTRATEGIAS = {
+    'joined': joinedload,      # LEFT JOIN en la misma consulta
+    'selectin': selectinload,  # una segunda consulta con IN (...) para todo el lote
+    'lazy': lazyload           # comportamiento original: un SELECT por fila
+}
+
+# Relación que lee cada to_dict() y las columnas de Usuario que necesita
+RELACIONES_AUTOR = {
+    Noticia: ('autor_obj', (Usuario.nombre,)),
+    Comentario: ('usuario_obj', (Usuario.nombre, Usuario.avatar)),
+    Evento: ('autor_obj', (Usuario.nombre,)),
+}
+
+# Variantes de la imagen (imagen_srcset en to_dict())
+RELACIONES_IMAGEN = {
+    Noticia: 'imagen_obj',
+    Evento: 'imagen_obj',
+}
+
+
+def estrategia_para(endpoint=None):
+    """Estrategia de carga configurada para un endpoint (o la global)"""
+    if endpoint is None and request:
+        endpoint = request.endpoint
+    por_endpoint = current_app.config.get('SERIALIZACION_ESTRATEGIAS', {})
+    estrategia = por_endpoint.get(endpoint) or current_app.config.get('SERIALIZACION_ESTRATEGIA', 'joined')
+
+    if estrategia not in ESTRATEGIAS:
+        raise ValueError(f'Estrategia de carga inválida: {estrategia}')
+    return estrategia
+
+
+def opciones_carga(modelo, estrategia=None):
+    """Opciones de carga de la relación autor/usuario de un modelo"""
+    estrategia = estrategia or estrategia_para()
+    nombre, columnas = RELACIONES_AUTOR[modelo]
+    relacion = inspect(modelo).relationships[nombre].class_attribute
+
+    opcion = ESTRATEGIAS[estrategia](relacion)
+    if estrategia != 'lazy':
+        # Solo las columnas que usa to_dict(), no password_hash ni email
+        opcion = opcion.load_only(*columnas)
+    return opcion
+
+
+def con_autores(query, modelo, estrategia=None):
+    """Aplicar la carga anticipada de autores (y de las imágenes) a una consulta de listado"""
+    estrategia = estrategia or estrategia_para()
+    opciones = [opciones_carga(modelo, estrategia)]
+    if modelo in RELACIONES_IMAGEN:
+        relacion = inspect(modelo).relationships[RELACIONES_IMAGEN[modelo]].class_attribute
+        opciones.append(ESTRATEGIAS[estrategia](relacion))
+    return query.options(*opciones)
+
+
+# ─── PROYECCIONES (?campos=) ─────────────────────────────────────────────────
+# Camino sin instancias ORM: se seleccionan solo las columnas de los campos
+# pedidos (el feed no trae 'contenido') y cada fila se convierte en dict con
+# los mismos nombres y formato que to_dict().
+#
+# Cada campo: (columnas que necesita, función(fila, contexto) -> valor, unión)
+# donde unión es None, 'autor' (LEFT JOIN usuarios) o 'imagen' (LEFT JOIN imagenes)
+
+_AUTOR_NOMBRE = Usuario.nombre.label('autor__nombre')
+_AUTOR_AVATAR = Usuario.avatar.label('autor__avatar')
+_IMAGEN = (Imagen.url.label('imagen__url'), Imagen.ancho.label('imagen__ancho'),
+           Imagen.alto.label('imagen__alto'), Imagen.estado.label('imagen__estado'),
+           Imagen.variantes.label('imagen__variantes'))
+
+
+def _columna(columna, formato=None):
+    nombre = columna.key
+    if formato is None:
+        return (columna,), lambda fila, ctx: getattr(fila, nombre), None
+    return (columna,), lambda fila, ctx: formato(getattr(fila, nombre)), None
+
+
+def _iso(valor):
+    return valor.isoformat() if valor else None
+
+
+def _nombre_autor(fila, ctx):
+    return fila.autor__nombre if fila.autor__nombre is not None else 'Desconocido'
+
+
+def _srcset(fila, ctx):
+    if fila.imagen__url is None:
+        return None
+    return Imagen.construir_srcset(fila.imagen__url, fila.imagen__ancho, fila.imagen__alto,
+                                   fila.imagen__estado, fila.imagen__variantes)
+
+
+PROYECCIONES = {
+    Noticia: {
+        'id': _columna(Noticia.id),
+        'titulo': _columna(Noticia.titulo),
+        'descripcion': _columna(Noticia.descripcion),
+        'contenido': _columna(Noticia.contenido, lambda v: v or ''),
+        'categoria': _columna(Noticia.categoria),
+        'imagen': _columna(Noticia.imagen, lambda v: v or IMAGEN_NOTICIA_POR_OMISION),
+        'fecha': _columna(Noticia.fecha, _iso),
+        'autor_id': _columna(Noticia.autor_id),
+        'autor_nombre': ((_AUTOR_NOMBRE,), _nombre_autor, 'autor'),
+        'imagen_srcset': (_IMAGEN, _srcset, 'imagen'),
+    },
+    Comentario: {
+        'id': _columna(Comentario.id),
+        'noticia_id': _columna(Comentario.noticia_id),
+        'usuario_id': _columna(Comentario.usuario_id),
+        'usuario_nombre': ((_AUTOR_NOMBRE,), _nombre_autor, 'autor'),
+        'usuario_avatar': ((_AUTOR_AVATAR,), lambda fila, ctx: fila.autor__avatar, 'autor'),
+        'texto': _columna(Comentario.texto),
+        'fecha': _columna(Comentario.fecha, _iso),
+    },
+    Evento: {
+        'id': _columna(Evento.id),
+        'titulo': _columna(Evento.titulo),
+        'descripcion': _columna(Evento.descripcion),
+        'categoria': _columna(Evento.categoria),
+        'fecha_evento': _columna(Evento.fecha_evento, _iso),
+        'imagen': _columna(Evento.imagen, lambda v: v or ''),
+        'lugar': _columna(Evento.lugar, lambda v: v or ''),
+        'autor_id': _columna(Evento.autor_id),
+        'autor': ((_AUTOR_NOMBRE,), _nombre_autor, 'autor'),
+        'created_at': _columna(Evento.created_at, _iso),
+        'dias_restantes': ((Evento.fecha_evento,),
+                           lambda fila, ctx: (fila.fecha_evento.date() - ctx['hoy']).days, None),
+        'imagen_srcset': (_IMAGEN, _srcset, 'imagen'),
+    },
+}
+
+# Cada unión: (tabla, su columna, columna que la referencia en cada modelo)
+UNIONES = {
+    'autor': (Usuario, Usuario.id,
+              {Noticia: Noticia.autor_id, Comentario: Comentario.usuario_id, Evento: Evento.autor_id}),
+    'imagen': (Imagen, Imagen.url, {Noticia: Noticia.imagen, Evento: Evento.imagen}),
+}
+
+
+def parsear_campos(modelo, valor):
+    """'id,titulo,...' -> tupla validada (siempre incluye id); None sin ?campos="""
+    if not valor:
+        return None
+    campos = [c.strip() for c in valor.split(',') if c.strip()]
+    invalidos = [c for c in campos if c not in PROYECCIONES[modelo]]
+    if invalidos:
+        raise ValueError(f"Campos inválidos: {', '.join(invalidos)}. "
+                         f"Disponibles: {', '.join(PROYECCIONES[modelo])}")
+    return tuple(dict.fromkeys(['id'] + campos))
+
+
+def proyectar(query, modelo, campos, orden=()):
+    """La misma consulta (filtros incluidos) devolviendo filas solo con las columnas de `campos`
+
+    orden: columnas que necesita el cursor de paginación aunque no se pidan.
+    No lleva con_autores(): el autor y la imagen salen de LEFT JOIN.
+    """
+    columnas, uniones = {}, []
+    for campo in campos:
+        necesarias, _, union = PROYECCIONES[modelo][campo]
+        for columna in necesarias:
+            columnas.setdefault(columna.key, columna)
+        if union and union not in uniones:
+            uniones.append(union)
+    for columna in orden:
+        columnas.setdefault(columna.key, columna)
+
+    query = query.with_entities(*columnas.values())
+    for union in uniones:
+        destino, columna, referencias = UNIONES[union]
+        query = query.outerjoin(destino, columna == referencias[modelo])
+    return query
+
+
+def serializar(filas, modelo, campos, **contexto):
+    """Filas de proyectar() -> lista de dicts (contexto: p. ej. hoy= para dias_restantes)"""
+    valores = [(campo, PROYECCIONES[modelo][campo][1]) for campo in campos]
+    return [{campo: valor(fila, contexto) for campo, valor in valores} for fila in filas]
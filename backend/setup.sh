@@ -34,6 +34,7 @@ echo "=================================================="
 echo ""
 echo "Próximos pasos:"
 echo "1. Edita el archivo .env con tus credenciales de MySQL"
-echo "2. Ejecuta el script SQL: mysql -u root -p < init_db.sql"
-echo "3. Inicia el servidor: python app.py"
+echo "2. Crea la base de datos: mysql -u root -p < init_db.sql"
+echo "3. Crea o actualiza las tablas: python migrar.py"
+echo "4. Inicia el servidor: python app.py"
 echo ""
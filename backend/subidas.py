@@ -0,0 +1,308 @@
+import hashlib
+import json
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from flask import current_app, request
+from werkzeug.formparser import FormDataParser
+import archivos
+from imagenes import detectar_tipo, BYTES_FIRMA
+
+# Recepción de imágenes en streaming: cada bloque que llega del cliente se
+# hashea, se cuenta y (el primero) se analiza por su firma mientras se
+# escribe junto a su destino final, sin que Werkzeug lo guarde antes en
+# memoria o en un temporal aparte. Una subida demasiado grande o que no es
+# imagen se corta en cuanto se detecta.
+#
+# Para clientes con conexiones lentas hay subidas reanudables por partes
+# (estilo tus): se crea una sesión con el tamaño total, se envían bloques
+# con PATCH + Upload-Offset y HEAD devuelve hasta dónde llegó. Las sesiones
+# abiertas tienen cupo por IP y total (SUBIDAS_* en config.py).
+
+EXTENSIONES_PERMITIDAS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+
+class SubidaInvalida(Exception):
+    """Error del cliente al subir (se responde con {'error': detalle})"""
+
+    def __init__(self, detalle, codigo=400):
+        super().__init__(detalle)
+        self.detalle = detalle
+        self.codigo = codigo
+
+
+def limite_archivo():
+    return current_app.config['UPLOAD_MAX_BYTES']
+
+
+def extension_permitida(nombre):
+    return '.' in nombre and nombre.rsplit('.', 1)[1].lower() in EXTENSIONES_PERMITIDAS
+
+
+def _mensaje_tamano():
+    return f'El archivo es demasiado grande. Máximo {limite_archivo() // (1024 * 1024)}MB'
+
+
+class ArchivoEntrante:
+    """Destino de los bloques de un archivo: hash, tamaño y tipo al vuelo"""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.tamano = 0
+        self.formato = None
+        self._cabecera = b''
+        self._hash = hashlib.sha256()
+        carpeta = os.path.join(archivos.carpeta(), archivos.CARPETA_PENDIENTES)
+        os.makedirs(carpeta, exist_ok=True)
+        self.temporal = os.path.join(carpeta, f'{uuid.uuid4().hex}.subiendo')
+        self._archivo = open(self.temporal, 'wb')
+
+    def write(self, datos):
+        self.tamano += len(datos)
+        if self.tamano > self.limite:
+            raise SubidaInvalida(_mensaje_tamano())
+
+        if self.formato is None:
+            self._cabecera += datos[:BYTES_FIRMA - len(self._cabecera)]
+            if len(self._cabecera) >= BYTES_FIRMA:
+                self._verificar_tipo()
+
+        self._hash.update(datos)
+        self._archivo.write(datos)
+        return len(datos)
+
+    def _verificar_tipo(self):
+        self.formato = detectar_tipo(self._cabecera)
+        if self.formato is None:
+            raise SubidaInvalida('El archivo no es una imagen válida')
+
+    # Werkzeug rebobina el contenedor al terminar cada archivo
+    def seek(self, *args):
+        return 0
+
+    def terminar(self):
+        """Cerrar y devolver (hash, formato); SubidaInvalida si no es imagen"""
+        self._archivo.close()
+        if self.formato is None:
+            self._verificar_tipo()
+        return self._hash.hexdigest(), self.formato
+
+    def descartar(self):
+        self._archivo.close()
+        try:
+            os.remove(self.temporal)
+        except FileNotFoundError:
+            pass
+
+
+def recibir_formulario(campo='file'):
+    """Leer un multipart/form-data escribiendo `campo` en streaming
+
+    Devuelve (ruta temporal, hash, formato); SubidaInvalida si falta el
+    archivo, la extensión no está permitida, es demasiado grande o no es imagen.
+    """
+    entrantes = []
+
+    def fabrica(total_content_length, content_type, filename, content_length=None):
+        if not filename:
+            raise SubidaInvalida('No se seleccionó ningún archivo')
+        if not extension_permitida(filename):
+            raise SubidaInvalida('Tipo de archivo no permitido. Solo: ' + ', '.join(sorted(EXTENSIONES_PERMITIDAS)))
+        if entrantes:
+            raise SubidaInvalida('Solo se permite un archivo por subida')
+        entrantes.append(ArchivoEntrante(limite_archivo()))
+        return entrantes[0]
+
+    parser = FormDataParser(stream_factory=fabrica, max_content_length=current_app.config['MAX_CONTENT_LENGTH'],
+                            max_form_memory_size=64 * 1024, silent=False)
+    try:
+        _, _, files = parser.parse(request.stream, request.mimetype, request.content_length,
+                                   request.mimetype_params)
+        if campo not in files:
+            raise SubidaInvalida('No se envió ningún archivo')
+        hash_contenido, formato = entrantes[0].terminar()
+    except Exception:
+        for entrante in entrantes:
+            entrante.descartar()
+        raise
+    return entrantes[0].temporal, hash_contenido, formato
+
+
+# ─── SUBIDAS REANUDABLES ─────────────────────────────────────────────────────
+# pendientes/<id>.parcial guarda los bytes y <id>.json el tamaño declarado y
+# la IP que la abrió; el offset actual es el tamaño del .parcial. Las sesiones
+# sin actividad en SUBIDAS_SESION_HORAS se borran al abrir otra (y si no,
+# limpiar_uploads.py las borra como cualquier otro archivo sin referencias).
+#
+# Los candados son archivos creados con O_EXCL (funciona igual en Windows y
+# entre workers); uno que quedó de un proceso caído vence en CANDADO_VENCE.
+
+CANDADO_VENCE = 120   # segundos sin renovar
+
+
+def _pendientes():
+    return os.path.join(archivos.carpeta(), archivos.CARPETA_PENDIENTES)
+
+
+def _borrar(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _tomar(ruta):
+    try:
+        os.close(os.open(ruta, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        return True
+    except FileExistsError:
+        try:
+            vencido = time.time() - os.path.getmtime(ruta) > CANDADO_VENCE
+        except FileNotFoundError:
+            vencido = True
+        if not vencido:
+            return False
+        _borrar(ruta)
+        return _tomar(ruta)
+
+
+@contextmanager
+def _candado(ruta, ocupado, esperar=0):
+    """Candado entre procesos; `ocupado` (SubidaInvalida) si no se obtiene en `esperar` segundos"""
+    hasta = time.monotonic() + esperar
+    while not _tomar(ruta):
+        if time.monotonic() >= hasta:
+            raise ocupado
+        time.sleep(0.01)
+    try:
+        yield ruta
+    finally:
+        _borrar(ruta)
+
+
+def _rutas_sesion(sesion_id):
+    if not sesion_id.isalnum():
+        raise SubidaInvalida('Sesión de subida no encontrada', 404)
+    base = os.path.join(_pendientes(), sesion_id)
+    return base + '.parcial', base + '.json'
+
+
+def _sesiones_abiertas():
+    """[(ip, tamano)] de las sesiones vigentes; las vencidas se borran"""
+    vence = time.time() - current_app.config['SUBIDAS_SESION_HORAS'] * 3600
+    abiertas = []
+    for nombre in os.listdir(_pendientes()):
+        if not nombre.endswith('.json'):
+            continue
+        sesion_id = nombre[:-len('.json')]
+        parcial, meta = _rutas_sesion(sesion_id)
+        try:
+            if os.path.getmtime(parcial) < vence:
+                _eliminar_sesion(sesion_id)
+                continue
+            with open(meta) as f:
+                datos = json.load(f)
+        except (FileNotFoundError, ValueError):
+            continue
+        abiertas.append((datos.get('cliente'), datos['tamano']))
+    return abiertas
+
+
+def _verificar_cupo(cliente, tamano):
+    config = current_app.config
+    abiertas = _sesiones_abiertas()
+    propias = [t for c, t in abiertas if c == cliente]
+    if len(propias) >= config['SUBIDAS_SESIONES_POR_IP'] or sum(propias) + tamano > config['SUBIDAS_BYTES_POR_IP']:
+        raise SubidaInvalida('Demasiadas subidas abiertas desde esta dirección', 429)
+    if (len(abiertas) >= config['SUBIDAS_SESIONES_TOTAL']
+            or sum(t for _, t in abiertas) + tamano > config['SUBIDAS_BYTES_TOTAL']):
+        raise SubidaInvalida('El servidor no admite más subidas por ahora', 507)
+
+
+def crear_sesion(tamano, nombre, cliente):
+    """Abrir una sesión para `cliente` (IP); 429/507 si se pasa del cupo"""
+    if not nombre or not extension_permitida(nombre):
+        raise SubidaInvalida('Tipo de archivo no permitido. Solo: ' + ', '.join(sorted(EXTENSIONES_PERMITIDAS)))
+    if not isinstance(tamano, int) or tamano <= 0:
+        raise SubidaInvalida('Tamaño inválido')
+    if tamano > limite_archivo():
+        raise SubidaInvalida(_mensaje_tamano())
+
+    os.makedirs(_pendientes(), exist_ok=True)
+    ocupado = SubidaInvalida('Servidor ocupado, reintentar', 503)
+    with _candado(os.path.join(_pendientes(), 'sesiones.candado'), ocupado, esperar=2):
+        _verificar_cupo(cliente, tamano)
+        sesion_id = uuid.uuid4().hex
+        parcial, meta = _rutas_sesion(sesion_id)
+        open(parcial, 'wb').close()
+        with open(meta, 'w') as f:
+            json.dump({'tamano': tamano, 'nombre': nombre, 'cliente': cliente}, f)
+    return sesion_id
+
+
+def _eliminar_sesion(sesion_id):
+    for ruta in _rutas_sesion(sesion_id):
+        _borrar(ruta)
+
+
+def estado_sesion(sesion_id):
+    """(offset, tamano total)"""
+    parcial, meta = _rutas_sesion(sesion_id)
+    try:
+        with open(meta) as f:
+            tamano = json.load(f)['tamano']
+        return os.path.getsize(parcial), tamano
+    except FileNotFoundError:
+        raise SubidaInvalida('Sesión de subida no encontrada', 404)
+
+
+def agregar_bloque(sesion_id, offset, stream):
+    """Anexar el cuerpo de la petición en `offset`; devuelve (offset nuevo, tamano)
+
+    Si se completa el archivo, la ruta hay que pedirla con terminar_sesion().
+    """
+    parcial, _ = _rutas_sesion(sesion_id)
+    actual, tamano = estado_sesion(sesion_id)
+
+    ocupado = SubidaInvalida('Hay otro bloque de esta subida en curso', 409)
+    with _candado(parcial[:-len('.parcial')] + '.candado', ocupado) as candado, open(parcial, 'ab') as archivo:
+        actual = os.path.getsize(parcial)   # releer con el candado tomado
+        if offset != actual:
+            raise SubidaInvalida(f'Upload-Offset incorrecto (el servidor tiene {actual})', 409)
+
+        for bloque in iter(lambda: stream.read(archivos.BLOQUE), b''):
+            if actual + len(bloque) > tamano:
+                raise SubidaInvalida('El bloque supera el tamaño declarado')
+            archivo.write(bloque)
+            archivo.flush()
+            os.utime(candado)   # sigue vivo aunque el cliente sea lento
+            antes, actual = actual, actual + len(bloque)
+
+            # La firma se revisa en cuanto están sus primeros bytes
+            if antes < BYTES_FIRMA and (actual >= BYTES_FIRMA or actual == tamano):
+                with open(parcial, 'rb') as f:
+                    if detectar_tipo(f.read(BYTES_FIRMA)) is None:
+                        break
+        else:
+            return actual, tamano
+
+    # Con el archivo ya cerrado (en Windows no se borra uno abierto)
+    _eliminar_sesion(sesion_id)
+    raise SubidaInvalida('El archivo no es una imagen válida')
+
+
+def terminar_sesion(sesion_id):
+    """Hashear el archivo completo: (ruta del .parcial, hash, formato)"""
+    parcial, meta = _rutas_sesion(sesion_id)
+    h = hashlib.sha256()
+    with open(parcial, 'rb') as f:
+        formato = detectar_tipo(f.read(BYTES_FIRMA))
+        f.seek(0)
+        for bloque in iter(lambda: f.read(archivos.BLOQUE), b''):
+            h.update(bloque)
+    os.remove(meta)
+    if formato is None:
+        os.remove(parcial)
+        raise SubidaInvalida('El archivo no es una imagen válida')
+    return parcial, h.hexdigest(), formato
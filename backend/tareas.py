@@ -0,0 +1,283 @@
+import json
+import os
+import random
+import socket
+import threading
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event, func
+from models import db, Tarea
+
+# Cola de trabajos persistida en la tabla `tareas`. Las rutas encolan con
+# encolar() dentro de su transacción; la tarea solo es visible para los
+# trabajadores cuando esa transacción se confirma.
+#
+# Mientras una tarea corre, un hilo actualiza latido_en cada TAREAS_TIMEOUT/3
+# segundos. rescatar_atascadas() solo devuelve a la cola las que llevan más
+# de TAREAS_TIMEOUT sin latido (el trabajador murió: OOM, segfault...), así
+# una tarea larga no se duplica; cada rescate gasta el intento que se perdió.
+
+_REGISTRO = {}
+_local = threading.local()
+
+
+def tarea(nombre, max_intentos=5):
+    """Decorador para registrar el manejador de un tipo de tarea"""
+    def registrar(fn):
+        _REGISTRO[nombre] = (fn, max_intentos)
+        return fn
+    return registrar
+
+
+def encolar(tipo, **datos):
+    """Agregar una tarea a la sesión actual (se publica con el commit)"""
+    if tipo not in _REGISTRO:
+        raise ValueError(f'Tipo de tarea no registrado: {tipo}')
+
+    nueva = Tarea(tipo=tipo, datos=json.dumps(datos), max_intentos=_REGISTRO[tipo][1])
+    db.session.add(nueva)
+    db.session.info['tareas_nuevas'] = True
+    return nueva
+
+
+# ─── EJECUCIÓN ───────────────────────────────────────────────────────────────
+
+def _reclamar(trabajador):
+    """Tomar la siguiente tarea disponible (UPDATE condicionado, sin bloqueos)"""
+    ahora = datetime.utcnow()
+    candidatas = Tarea.query.with_entities(Tarea.id)\
+        .filter(Tarea.estado == 'pendiente', Tarea.disponible_en <= ahora)\
+        .order_by(Tarea.disponible_en, Tarea.id).limit(5).all()
+
+    for (tarea_id,) in candidatas:
+        tomada = Tarea.query.filter(Tarea.id == tarea_id, Tarea.estado == 'pendiente').update({
+            'estado': 'en_proceso',
+            'iniciada_en': ahora,
+            'latido_en': ahora,
+            'intentos': Tarea.intentos + 1,
+            'trabajador': trabajador
+        }, synchronize_session=False)
+        db.session.commit()
+        if tomada:
+            return db.session.get(Tarea, tarea_id)
+    return None
+
+
+def _backoff(intentos):
+    base = current_app.config['TAREAS_REINTENTO_BASE']
+    espera = min(base * 2 ** (intentos - 1), current_app.config['TAREAS_REINTENTO_MAX'])
+    return espera * random.uniform(0.8, 1.2)
+
+
+class _Latido:
+    """Hilo que marca latido_en mientras la tarea corre (con su propia conexión:
+    la sesión es del manejador y su transacción sigue abierta)"""
+
+    def __init__(self, t):
+        self.engine = db.engine
+        self.tarea_id, self.trabajador = t.id, t.trabajador
+        self.intervalo = current_app.config['TAREAS_TIMEOUT'] / 3
+        self.fin = threading.Event()
+        self.hilo = threading.Thread(target=self._latir, name=f'latido-{t.id}', daemon=True)
+
+    def _latir(self):
+        while not self.fin.wait(self.intervalo):
+            try:
+                with self.engine.begin() as conexion:
+                    conexion.execute(Tarea.__table__.update()
+                                     .where(Tarea.id == self.tarea_id, Tarea.estado == 'en_proceso',
+                                            Tarea.trabajador == self.trabajador)
+                                     .values(latido_en=datetime.utcnow()))
+            except Exception:
+                pass   # sin latido, a lo sumo se rescata y se reintenta
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.fin.set()
+        self.hilo.join()
+
+
+def ejecutar(t):
+    """Ejecutar una tarea ya reclamada y registrar el resultado"""
+    manejador, _ = _REGISTRO.get(t.tipo, (None, None))
+    try:
+        if manejador is None:
+            raise LookupError(f'Tipo de tarea no registrado: {t.tipo}')
+        with _Latido(t):
+            manejador(**json.loads(t.datos))
+    except Exception:
+        db.session.rollback()
+        t = db.session.get(Tarea, t.id)
+        t.error = traceback.format_exc(limit=5)
+        if t.intentos >= t.max_intentos:
+            t.estado = 'fallida'
+            t.terminada_en = datetime.utcnow()
+            current_app.logger.error('Tarea %s (%s) falló definitivamente', t.id, t.tipo)
+        else:
+            t.estado = 'pendiente'
+            t.disponible_en = datetime.utcnow() + timedelta(seconds=_backoff(t.intentos))
+        db.session.commit()
+        return False
+
+    # El resultado se confirma junto con el trabajo del manejador
+    t = db.session.get(Tarea, t.id)
+    t.estado = 'completada'
+    t.error = None
+    t.terminada_en = datetime.utcnow()
+    db.session.commit()
+    return True
+
+
+def procesar_pendientes(trabajador=None, limite=None):
+    """Ejecutar tareas disponibles hasta vaciar la cola; devuelve cuántas se ejecutaron"""
+    trabajador = trabajador or f'{socket.gethostname()}:{os.getpid()}'
+    ejecutadas = 0
+    while limite is None or ejecutadas < limite:
+        t = _reclamar(trabajador)
+        if t is None:
+            break
+        ejecutar(t)
+        ejecutadas += 1
+    return ejecutadas
+
+
+def rescatar_atascadas():
+    """Devolver a la cola las tareas de trabajadores caídos y purgar las viejas
+
+    El intento se contó al reclamarla: al agotar max_intentos queda fallida
+    (una tarea que tumba al trabajador no vuelve a la cola para siempre).
+    """
+    ahora = datetime.utcnow()
+    limite = ahora - timedelta(seconds=current_app.config['TAREAS_TIMEOUT'])
+    caidas = Tarea.query.filter(Tarea.estado == 'en_proceso',
+                                func.coalesce(Tarea.latido_en, Tarea.iniciada_en) < limite)
+    error = 'El trabajador dejó de responder (sin latido en TAREAS_TIMEOUT)'
+    agotadas = caidas.filter(Tarea.intentos >= Tarea.max_intentos)\
+        .update({'estado': 'fallida', 'error': error, 'terminada_en': ahora}, synchronize_session=False)
+    rescatadas = caidas.filter(Tarea.intentos < Tarea.max_intentos)\
+        .update({'estado': 'pendiente', 'error': error, 'disponible_en': ahora}, synchronize_session=False)
+    if agotadas:
+        current_app.logger.error('%s tarea(s) fallaron definitivamente al caerse su trabajador', agotadas)
+
+    retencion = ahora - timedelta(hours=current_app.config['TAREAS_RETENCION_HORAS'])
+    Tarea.query.filter(Tarea.estado == 'completada', Tarea.terminada_en < retencion)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return rescatadas
+
+
+# ─── POOL DE TRABAJADORES ────────────────────────────────────────────────────
+
+class PoolTrabajadores:
+    """Hilos que sondean la cola; se despiertan antes si se encola algo localmente"""
+
+    def __init__(self, app, hilos=None, intervalo=None):
+        self.app = app
+        self.hilos = hilos if hilos is not None else app.config['TAREAS_HILOS']
+        self.intervalo = intervalo if intervalo is not None else app.config['TAREAS_INTERVALO']
+        self.despertar = threading.Event()
+        self.detener = threading.Event()
+        self._hilos = []
+
+    def iniciar(self):
+        for i in range(self.hilos):
+            nombre = f'{socket.gethostname()}:{os.getpid()}:{i}'
+            hilo = threading.Thread(target=self._ciclo, args=(nombre, i == 0), name=f'tareas-{i}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def parar(self, esperar=True):
+        self.detener.set()
+        self.despertar.set()
+        if esperar:
+            for hilo in self._hilos:
+                hilo.join()
+
+    def _ciclo(self, nombre, mantenimiento):
+        ultimo_rescate = None
+        while not self.detener.is_set():
+            self.despertar.clear()
+            try:
+                with self.app.app_context():
+                    if mantenimiento and (ultimo_rescate is None or
+                                          datetime.utcnow() - ultimo_rescate > timedelta(minutes=1)):
+                        rescatar_atascadas()
+                        ultimo_rescate = datetime.utcnow()
+                    procesar_pendientes(nombre)
+            except Exception:
+                self.app.logger.exception('Error en el trabajador de tareas %s', nombre)
+            self.despertar.wait(self.intervalo)
+
+
+def _pool_actual():
+    app = current_app._get_current_object()
+    return app.extensions.get('tareas_pool')
+
+
+_inicio_lock = threading.Lock()
+
+
+def iniciar_trabajadores(app):
+    """Arrancar el pool dentro del proceso web (modo 'hilos'), una sola vez"""
+    with _inicio_lock:
+        if app.extensions.get('tareas_pool') is None and app.config['TAREAS_HILOS'] > 0:
+            pool = PoolTrabajadores(app)
+            app.extensions['tareas_pool'] = pool
+            pool.iniciar()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _despues_de_commit(sesion):
+    if not sesion.info.pop('tareas_nuevas', False):
+        return
+
+    modo = current_app.config['TAREAS_MODO']
+    if modo == 'sincrono' and not getattr(_local, 'ejecutando', False):
+        # Contexto nuevo = sesión nueva; la del request ya confirmó
+        _local.ejecutando = True
+        try:
+            with current_app._get_current_object().app_context():
+                procesar_pendientes()
+        finally:
+            _local.ejecutando = False
+    elif modo == 'hilos':
+        pool = _pool_actual()
+        if pool:
+            pool.despertar.set()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _despues_de_rollback(sesion):
+    sesion.info.pop('tareas_nuevas', None)
+
+
+# ─── MONITOREO ───────────────────────────────────────────────────────────────
+
+def estadisticas(muestra=100):
+    """Profundidad de la cola y latencias recientes"""
+    por_estado = dict(db.session.query(Tarea.estado, func.count(Tarea.id)).group_by(Tarea.estado).all())
+    ahora = datetime.utcnow()
+
+    mas_antigua = db.session.query(func.min(Tarea.disponible_en))\
+        .filter(Tarea.estado == 'pendiente', Tarea.disponible_en <= ahora).scalar()
+
+    recientes = db.session.query(Tarea.creada_en, Tarea.iniciada_en, Tarea.terminada_en)\
+        .filter(Tarea.estado == 'completada')\
+        .order_by(Tarea.terminada_en.desc()).limit(muestra).all()
+    esperas = [(i - c).total_seconds() for c, i, _ in recientes if i]
+    duraciones = [(t - i).total_seconds() for _, i, t in recientes if i and t]
+
+    return {
+        'pendientes': por_estado.get('pendiente', 0),
+        'en_proceso': por_estado.get('en_proceso', 0),
+        'completadas': por_estado.get('completada', 0),
+        'fallidas': por_estado.get('fallida', 0),
+        'espera_max_segundos': (ahora - mas_antigua).total_seconds() if mas_antigua else 0,
+        'latencia_promedio_segundos': sum(esperas) / len(esperas) if esperas else 0,
+        'duracion_promedio_segundos': sum(duraciones) / len(duraciones) if duraciones else 0,
+        'muestra': len(recientes)
+    }
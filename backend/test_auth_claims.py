@@ -0,0 +1,36 @@
+import pytest
+
+from app import create_app
+from cache import CacheMemoriaCompartida
+from config import Config
+
+
+def test_claims_requiere_cache_compartida(monkeypatch):
+    monkeypatch.setattr(Config, 'AUTH_MODO', 'claims')
+    with pytest.raises(ValueError, match='CACHE_BACKEND'):
+        create_app()
+
+
+def test_auth_sin_consultas_y_revocacion(app, client, crear_usuario, contar_consultas):
+    # 'memoria' hace de redis: la versión de cada usuario se ve desde todos los procesos
+    app.config.update(AUTH_MODO='claims', CACHE_BACKEND='memoria')
+    app.extensions.pop('cache', None)
+    CacheMemoriaCompartida.vaciar()
+    admin, headers_admin = crear_usuario('admin@test.com', rol='admin')
+    usuario, headers = crear_usuario('vecino@test.com')
+
+    client.get('/api/auth/me', headers=headers)
+    respuesta, sentencias = contar_consultas(client.get, '/api/auth/me', headers=headers)
+    assert respuesta.get_json()['email'] == 'vecino@test.com'
+    assert sentencias == []
+
+    # Los cambios del perfil y del rol invalidan la caché
+    client.put('/api/auth/me', headers=headers, json={'nombre': 'Nuevo nombre'})
+    assert client.get('/api/auth/me', headers=headers).get_json()['nombre'] == 'Nuevo nombre'
+    client.patch(f'/api/auth/usuarios/{usuario.id}/rol', headers=headers_admin, json={'rol': 'moderador'})
+    assert client.get('/api/auth/me', headers=headers).get_json()['rol'] == 'moderador'
+
+    # Revocar invalida los tokens emitidos al momento
+    assert client.post(f'/api/auth/usuarios/{usuario.id}/revocar', headers=headers_admin).status_code == 200
+    respuesta = client.get('/api/auth/me', headers=headers)
+    assert respuesta.status_code == 401 and respuesta.get_json()['detail'] == 'Token revocado'
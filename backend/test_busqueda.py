@@ -0,0 +1,86 @@
+from types import SimpleNamespace
+
+import busqueda
+from busqueda import tokenizar, consulta_mysql
+
+
+def _buscar(client, texto, **params):
+    respuesta = client.get('/api/noticias', query_string={'busqueda': texto, **params})
+    assert respuesta.status_code == 200
+    return respuesta.get_json()
+
+
+def test_tokenizar_sin_acentos_ni_stopwords():
+    assert tokenizar('Las Noticias de Educación') == ['noticia', 'educacion']
+
+
+def test_busqueda_indice(client, crear_usuario):
+    _, headers = crear_usuario()
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Curso de Educación', 'descripcion': 'Computación básica', 'categoria': 'Educación'})
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Limpieza del parque', 'descripcion': 'Campaña', 'contenido': 'educación ambiental',
+        'categoria': 'Comunidad'})
+    posada = client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos'}).get_json()
+    client.post(f"/api/noticias/{posada['id']}/comentarios", headers=headers, json={'texto': 'Gran posada navideña'})
+
+    # Sin acentos, con ranking (título pesa más que contenido) y mismo formato de respuesta
+    resultado = _buscar(client, 'educacion')
+    assert [n['titulo'] for n in resultado['items']] == ['Curso de Educación', 'Limpieza del parque']
+    assert resultado['total_items'] == 2 and resultado['total_paginas'] == 1
+
+    assert _buscar(client, 'educ', categoria='Comunidad')['total_items'] == 1
+    assert [n['id'] for n in _buscar(client, 'navidena')['items']] == [posada['id']]
+
+    # El índice sigue a las ediciones
+    client.put('/api/noticias/1', headers=headers, json={'titulo': 'Taller de pintura'})
+    assert _buscar(client, 'curso')['total_items'] == 0
+    assert _buscar(client, 'pintura')['total_items'] == 1
+
+
+def test_consulta_mysql_sin_raiz():
+    # El índice FULLTEXT tiene las palabras del texto, no sus raíces
+    assert consulta_mysql('Las luces de Navidad') == '+luces* +navidad*'
+    assert consulta_mysql('ves') == '+ves*'
+    assert consulta_mysql('de la') == ''
+
+
+def test_sin_indices_nativos_usa_el_propio(app, monkeypatch):
+    conexion = SimpleNamespace(dialect=SimpleNamespace(name='mysql'), engine=SimpleNamespace(url='mysql://falsa'))
+    monkeypatch.setattr(busqueda, '_nativo', {})
+    monkeypatch.setattr(busqueda, '_indices_nativos', lambda c: {'ft_noticias'})
+    assert busqueda.motor(conexion) == 'indice'
+
+    # Se vuelve a mirar pasado REVISAR_NATIVO (la migración 0006 ya corrió)
+    monkeypatch.setattr(busqueda, '_indices_nativos', lambda c: set(busqueda.INDICES_NATIVOS))
+    assert busqueda.motor(conexion) == 'indice'
+    monkeypatch.setattr(busqueda, 'REVISAR_NATIVO', 0)
+    assert busqueda.motor(conexion) == 'mysql'
+
+
+def test_busqueda_paginada_en_sql(app, client, crear_usuario, contar_consultas):
+    _, headers = crear_usuario()
+    for i in range(5):
+        client.post('/api/noticias', headers=headers, json={
+            'titulo': f'Feria {i}', 'descripcion': 'Feria del barrio', 'categoria': 'Eventos'})
+
+    # Una consulta trae la página y el total, sin importar cuántos términos haya
+    with app.test_request_context():
+        (ids, total), sentencias = contar_consultas(busqueda.buscar, 'feria barrio', limite=2, desde=2)
+    assert ids == [3, 2] and total == 5
+    assert len([s for s in sentencias if 'busqueda_terminos' in s]) == 1
+
+    # Página fuera de rango: total igual, sin ids
+    with app.test_request_context():
+        assert busqueda.buscar('feria', limite=2, desde=10) == ([], 5)
+
+    primera = _buscar(client, 'feria', items_por_pagina=2, pagina=3)
+    assert [n['titulo'] for n in primera['items']] == ['Feria 0']
+    assert primera['total_items'] == 5 and primera['total_paginas'] == 3
+
+
+def test_terminos_de_consulta_acotados():
+    consulta = ' '.join(f'palabra{i}' for i in range(20))
+    assert len(busqueda.terminos_consulta(consulta)) == busqueda.MAX_TERMINOS_CONSULTA
+    assert busqueda.terminos_consulta('feria feria barrio') == ['feria', 'barrio']
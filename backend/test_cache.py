@@ -0,0 +1,61 @@
+import time
+
+from cache import Cache, CacheLocal, CacheMemoriaCompartida
+
+
+def test_lru_y_ttl():
+    cache = Cache(None, ttl=60)
+    cache.backend = CacheLocal(max_items=2, al_desalojar=cache.al_desalojar)
+    calcular = lambda: 'x'
+
+    for clave in ('a', 'b', 'a', 'c'):   # 'c' desaloja a 'b' (el menos usado)
+        cache.obtener_o_calcular('feed', clave, ['feed:*'], calcular)
+    stats = cache.estadisticas()['espacios']['feed']
+    assert (stats['aciertos'], stats['fallos'], stats['desalojos']) == (1, 3, 1)
+
+    cache.ttl = 0
+    cache.obtener_o_calcular('noticia', 1, ['noticia:1'], calcular)
+    time.sleep(0.01)
+    cache.obtener_o_calcular('noticia', 1, ['noticia:1'], calcular)
+    assert cache.estadisticas()['espacios']['noticia']['expiradas'] == 1
+
+
+def test_etiquetas_acotadas():
+    cache = Cache(CacheLocal(max_items=100, max_etiquetas=3), ttl=60)
+    cache.obtener_o_calcular('noticia', 1, ['noticia:1'], lambda: 'v1')
+    for i in range(2, 6):   # otras noticias desalojan la generación de noticia:1
+        cache.obtener_o_calcular('noticia', i, [f'noticia:{i}'], lambda: 'x')
+    info = cache.backend.info()
+    assert info['etiquetas'] == 3 and info['etiquetas_desalojadas'] == 2
+
+    # Sin su generación la entrada vieja no revive: se vuelve a calcular
+    assert cache.obtener_o_calcular('noticia', 1, ['noticia:1'], lambda: 'v2') == 'v2'
+
+
+def test_invalidacion_por_etiqueta():
+    CacheMemoriaCompartida.vaciar()
+    cache = Cache(CacheMemoriaCompartida(), ttl=60)
+    otro_proceso = Cache(CacheMemoriaCompartida(), ttl=60)
+
+    cache.obtener_o_calcular('feed', 'p1', ['feed:Educación'], lambda: 'viejo')
+    otro_proceso.invalidar(['feed:Educación'])
+    assert cache.obtener_o_calcular('feed', 'p1', ['feed:Educación'], lambda: 'nuevo') == 'nuevo'
+
+
+def test_feed_cacheado(client, crear_usuario, contar_consultas):
+    _, headers = crear_usuario()
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos'})
+
+    client.get('/api/noticias')
+    respuesta, sentencias = contar_consultas(client.get, '/api/noticias')
+    assert len(sentencias) == 1   # solo los sellos del ETag
+    assert respuesta.get_json()['total_items'] == 1
+
+    # Una noticia nueva invalida el feed general y el de su categoría
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Curso', 'descripcion': 'Computación', 'categoria': 'Educación'})
+    assert client.get('/api/noticias').get_json()['total_items'] == 2
+
+    stats = client.get('/api/cache/estado').get_json()['espacios']['feed']
+    assert stats['aciertos'] == 1 and stats['invalidaciones'] >= 1
@@ -0,0 +1,63 @@
+from models import db, VersionDatos
+
+
+def test_etag_y_304(client, crear_usuario, contar_consultas):
+    _, headers = crear_usuario()
+    noticia = client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos'}).get_json()
+    url = f"/api/noticias/{noticia['id']}/comentarios"
+
+    primera = client.get(url)
+    etag = primera.headers['ETag']
+    assert primera.status_code == 200 and primera.headers['Cache-Control'].startswith('public')
+    assert primera.headers['Last-Modified']
+
+    # Revalidación sin cambios: 304 sin cuerpo, con una sola consulta a los sellos
+    respuesta, sentencias = contar_consultas(client.get, url, headers={'If-None-Match': etag})
+    assert respuesta.status_code == 304 and respuesta.data == b''
+    assert len(sentencias) == 1
+
+    lm = client.get(url, headers={'If-Modified-Since': primera.headers['Last-Modified']})
+    assert lm.status_code == 304
+
+    # Un comentario nuevo cambia el ETag de esa noticia, no el del listado
+    feed = client.get('/api/noticias').headers['ETag']
+    client.post(url, headers=headers, json={'texto': 'Ahí estaremos'})
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 200
+    assert client.get('/api/noticias', headers={'If-None-Match': feed}).status_code == 304
+
+    # Con Authorization la respuesta es privada
+    privada = client.get(url, headers=headers)
+    assert privada.headers['Cache-Control'] == 'private, no-cache'
+
+
+def test_cambio_de_nombre_invalida(client, crear_usuario):
+    usuario, headers = crear_usuario()
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos'})
+    etag = client.get('/api/noticias').headers['ETag']
+
+    client.put('/api/auth/me', headers=headers, json={'nombre': 'Otro nombre'})
+    assert client.get('/api/noticias', headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_reacciones_solo_sellan_su_noticia(client, crear_usuario):
+    _, headers = crear_usuario()
+    noticia = client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos'}).get_json()
+    feed = client.get('/api/noticias').headers['ETag']
+    con_interacciones = client.get('/api/noticias?incluir=reacciones').headers['ETag']
+
+    client.post(f"/api/noticias/{noticia['id']}/reacciones", headers=headers, json={'tipo': 'like'})
+    client.post(f"/api/noticias/{noticia['id']}/comentarios", headers=headers, json={'texto': 'Ahí estaremos'})
+
+    claves = {v.clave for v in db.session.query(VersionDatos)}
+    assert not claves & {'reacciones', 'comentarios'}
+    assert {f"reacciones:{noticia['id']}", f"comentarios:{noticia['id']}"} <= claves
+
+    # El listado simple sigue válido; con ?incluir= el ETag sale del contenido
+    assert client.get('/api/noticias', headers={'If-None-Match': feed}).status_code == 304
+    respuesta = client.get('/api/noticias?incluir=reacciones', headers={'If-None-Match': con_interacciones})
+    assert respuesta.status_code == 200 and 'Last-Modified' not in respuesta.headers
+    etag = respuesta.headers['ETag']
+    assert client.get('/api/noticias?incluir=reacciones', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,68 @@
+import gzip
+
+from flask import Response, stream_with_context
+
+import compresion
+from models import db, Noticia
+
+GZIP = {'Accept-Encoding': 'gzip'}
+
+
+def _sembrar(usuario, n=10):
+    for i in range(n):
+        db.session.add(Noticia(titulo=f'Noticia {i}', descripcion='Reunión vecinal ' * 20, categoria='General',
+                               contenido='Texto de la noticia ' * 100, autor_obj=usuario))
+    db.session.commit()
+
+
+def _serie(origen):
+    return next((s for s in compresion.estadisticas()['series']
+                 if s['codificacion'] == 'gzip' and s['origen'] == origen), None)
+
+
+def test_feed_comprimido_una_vez(client, crear_usuario):
+    usuario, _ = crear_usuario()
+    _sembrar(usuario)
+    plano = client.get('/api/noticias')
+    assert 'Content-Encoding' not in plano.headers
+
+    antes = _serie('precomprimida')
+    antes = antes['respuestas'] if antes else 0
+    for _ in range(2):
+        respuesta = client.get('/api/noticias', headers=GZIP)
+        assert respuesta.headers['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in respuesta.headers['Vary']
+        assert gzip.decompress(respuesta.get_data()) == plano.get_data()
+
+    # El primero comprimió y guardó la variante; el segundo la leyó de la caché
+    stats = client.get('/api/cache/estado').get_json()['espacios']['feed.gzip']
+    assert (stats['fallos'], stats['aciertos']) == (1, 1)
+    precomprimida = _serie('precomprimida')
+    assert precomprimida['respuestas'] == antes + 1 and precomprimida['cpu_segundos'] == 0
+    assert precomprimida['bytes_ahorrados'] > 0
+
+    texto = client.get('/api/metrics').get_data(as_text=True)
+    assert 'webcomunitaria_compresion_bytes_ahorrados_total{codificacion="gzip",origen="precomprimida"}' in texto
+
+
+def test_middleware_umbral_y_stream(app, client):
+    def partes():
+        for i in range(50):
+            yield f'linea {i} ' * 20 + '\n'
+
+    app.add_url_rule('/prueba/stream', 'stream', lambda: Response(stream_with_context(partes()),
+                                                                  mimetype='text/plain'))
+    app.add_url_rule('/prueba/sse', 'sse', lambda: Response(partes(), mimetype='text/event-stream'))
+
+    # Por debajo de COMPRESION_MIN_BYTES no se comprime
+    assert 'Content-Encoding' not in client.get('/api/health', headers=GZIP).headers
+
+    respuesta = client.get('/prueba/stream', headers=GZIP)
+    assert respuesta.headers['Content-Encoding'] == 'gzip' and 'Content-Length' not in respuesta.headers
+    assert gzip.decompress(respuesta.get_data()).decode() == ''.join(partes())
+    assert _serie('stream')['bytes_ahorrados'] > 0
+
+    assert 'Content-Encoding' not in client.get('/prueba/sse', headers=GZIP).headers
+
+    app.config['COMPRESION_ACTIVA'] = False
+    assert 'Content-Encoding' not in client.get('/prueba/stream', headers=GZIP).headers
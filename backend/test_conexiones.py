@@ -0,0 +1,42 @@
+import sqlite3
+import pytest
+from sqlalchemy.exc import TimeoutError as TiempoAgotadoPool
+
+import conexiones
+from conexiones import QueuePoolMedido
+
+
+def test_opciones_por_dialecto():
+    config = {
+        'DB_POOL_SIZE': 6, 'DB_MAX_OVERFLOW': 2, 'DB_POOL_TIMEOUT': 5, 'DB_POOL_RECYCLE': 280,
+        'DB_POOL_PRE_PING': True, 'DB_CONNECT_TIMEOUT': 3, 'DB_STATEMENT_TIMEOUT_MS': 2000,
+    }
+
+    mysql = conexiones.opciones_motor({**config, 'SQLALCHEMY_DATABASE_URI': 'mysql+pymysql://u:p@h/db'})
+    assert mysql['poolclass'] is QueuePoolMedido
+    assert mysql['pool_size'] == 6 and mysql['pool_pre_ping'] is True
+    assert mysql['connect_args'] == {'connect_timeout': 3, 'init_command': 'SET SESSION max_execution_time=2000'}
+
+    postgres = conexiones.opciones_motor({**config, 'SQLALCHEMY_DATABASE_URI': 'postgresql://u:p@h/db'})
+    assert postgres['connect_args']['options'] == '-c statement_timeout=2000'
+
+    assert conexiones.opciones_motor({**config, 'SQLALCHEMY_DATABASE_URI': 'sqlite://'}) == {}
+
+
+def test_metricas_de_espera_y_saturacion():
+    pool = QueuePoolMedido(lambda: sqlite3.connect(':memory:'), pool_size=1, max_overflow=0, timeout=0.05)
+
+    primera = pool.connect()
+    with pytest.raises(TiempoAgotadoPool):
+        pool.connect()
+
+    resumen = pool.metricas.resumen(pool)
+    assert resumen['checkouts'] == 1 and resumen['timeouts'] == 1
+    assert resumen['en_uso'] == 1 and resumen['saturacion'] == 1
+    assert resumen['espera_max_ms'] >= 50
+    assert sum(resumen['histograma_espera'].values()) == 2
+
+    primera.close()
+    pool.dispose()
+    assert pool.recreate().metricas is pool.metricas
+    assert pool.metricas.resumen(pool)['en_uso'] == 0
@@ -0,0 +1,62 @@
+from models import db, Noticia, Reaccion, ReaccionConteo
+from contadores import resumen_reacciones, verificar_contadores
+
+
+def _noticia(client, headers):
+    return client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Feria', 'descripcion': 'Sábado', 'categoria': 'Eventos'}).get_json()['id']
+
+
+def test_reaccionar_cambiar_y_quitar(client, crear_usuario, contar_consultas):
+    _, headers = crear_usuario('ana@test.com')
+    _, otros = crear_usuario('beto@test.com')
+    noticia_id = _noticia(client, headers)
+    url = f'/api/noticias/{noticia_id}/reacciones'
+    conteo = lambda: client.get(url).get_json()
+
+    assert client.post(url, headers=headers, json={'tipo': 'like'}).status_code == 201
+    client.post(url, headers=otros, json={'tipo': 'like'})
+    assert conteo()['conteo']['like'] == 2 and conteo()['total'] == 2
+
+    # Cambiar de tipo mueve el conteo sin cambiar el total
+    client.post(url, headers=headers, json={'tipo': 'love'})
+    assert conteo()['conteo'] == {'like': 1, 'love': 1, 'wow': 0, 'sad': 0, 'angry': 0}
+    assert conteo()['total'] == 2
+
+    # El mismo tipo otra vez la quita (toggle); DELETE quita la del otro
+    assert client.post(url, headers=headers, json={'tipo': 'love'}).get_json()['tipo'] is None
+    client.delete(url, headers=otros)
+    client.delete(url, headers=otros)   # sin reacción: no descuenta de más
+    assert conteo()['total'] == 0 and conteo()['conteo']['like'] == 0
+
+    # El resumen es una sola consulta por PK, sin contar la tabla reacciones
+    resumen, sentencias = contar_consultas(resumen_reacciones, noticia_id)
+    assert resumen['total'] == 0 and len(sentencias) == 1
+    assert 'count(' not in sentencias[0].lower()
+    assert verificar_contadores() == []
+
+
+def test_verificar_detecta_y_repara(client, crear_usuario):
+    usuario, headers = crear_usuario()
+    noticia_id = _noticia(client, headers)
+    client.post(f'/api/noticias/{noticia_id}/reacciones', headers=headers, json={'tipo': 'wow'})
+
+    fila = db.session.get(ReaccionConteo, noticia_id)
+    fila.total_wow, fila.total = 7, 7   # deriva
+    # Noticia anterior a los contadores: reacciones sin fila de conteo
+    vieja = Noticia(titulo='Vieja', descripcion='Sin fila', categoria='General', autor_id=usuario.id)
+    db.session.add(vieja)
+    db.session.flush()
+    db.session.add(Reaccion(noticia_id=vieja.id, usuario_id=usuario.id, tipo='sad'))
+    db.session.commit()
+
+    diferencias = {d['noticia_id']: d for d in verificar_contadores()}
+    assert diferencias.keys() == {noticia_id, vieja.id}
+    assert diferencias[noticia_id]['actual']['total'] == 7
+    assert diferencias[noticia_id]['esperado']['conteo']['wow'] == 1
+    assert diferencias[vieja.id]['actual'] is None
+
+    verificar_contadores(reparar=True)
+    assert verificar_contadores() == []
+    assert resumen_reacciones(noticia_id)['conteo']['wow'] == 1
+    assert resumen_reacciones(vieja.id)['conteo']['sad'] == 1
@@ -0,0 +1,71 @@
+import threading
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS
+
+import contrasenas
+
+
+def test_rehash_al_iniciar_sesion(app, client, crear_usuario):
+    usuario, _ = crear_usuario()
+    assert usuario.password_hash.startswith('scrypt:32768:8:1$')
+
+    app.config['PASSWORD_METODO'] = 'pbkdf2:sha256:1000'
+    respuesta = client.post('/api/auth/login', json={'email': 'usuario@test.com', 'password': 'secreto123'})
+    assert respuesta.status_code == 200
+    assert usuario.password_hash.startswith('pbkdf2:sha256:1000$')
+
+    # El hash nuevo sigue siendo válido y ya no se recalcula
+    assert client.post('/api/auth/login',
+                       json={'email': 'usuario@test.com', 'password': 'secreto123'}).status_code == 200
+    assert not contrasenas.necesita_rehash(usuario.password_hash)
+
+
+def test_rehash_con_formas_cortas_y_sal(app):
+    app.config['PASSWORD_METODO'] = 'scrypt'
+    assert not contrasenas.necesita_rehash(contrasenas.hashear('clave'))   # 'scrypt:32768:8:1$...'
+    for corto in ('pbkdf2', 'pbkdf2:sha256'):
+        app.config['PASSWORD_METODO'] = corto
+        password_hash = contrasenas.hashear('clave')
+        assert password_hash.startswith(f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}$')
+        assert not contrasenas.necesita_rehash(password_hash)
+
+    # Cambiar solo el largo de la sal también recalcula
+    app.config['PASSWORD_SAL'] = 24
+    assert contrasenas.necesita_rehash(password_hash)
+    assert not contrasenas.necesita_rehash(contrasenas.hashear('clave'))
+
+
+def test_sin_lugar_responde_503(app, client, crear_usuario):
+    crear_usuario()
+    app.config.update(PASSWORD_MAX_EN_CURSO=1, PASSWORD_ESPERA=0.05)
+    contrasenas.cerrar()
+    _, semaforo = contrasenas._recursos()
+    semaforo.acquire()   # otro login ocupando el único lugar
+    try:
+        respuesta = client.post('/api/auth/login', json={'email': 'usuario@test.com', 'password': 'secreto123'})
+        assert respuesta.status_code == 503 and respuesta.headers['Retry-After'] == '2'
+    finally:
+        semaforo.release()
+        contrasenas.cerrar()
+    assert contrasenas.estadisticas()['rechazadas'] >= 1
+
+
+def test_pool_de_procesos(app):
+    app.config.update(PASSWORD_PROCESOS=1, PASSWORD_METODO='pbkdf2:sha256:1000')
+    contrasenas.cerrar()
+    try:
+        hashes = []
+
+        def hashear():
+            with app.app_context():
+                hashes.append(contrasenas.hashear('clave'))
+
+        hilos = [threading.Thread(target=hashear) for _ in range(3)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        assert len(set(hashes)) == 3
+        assert all(contrasenas.verificar(h, 'clave') for h in hashes)
+    finally:
+        contrasenas.cerrar()
@@ -0,0 +1,94 @@
+from datetime import datetime, date, time, timedelta
+from types import SimpleNamespace
+
+from models import db, Evento
+from routes import eventos_routes
+
+
+def _evento(autor_id, titulo, fecha, categoria='General'):
+    db.session.add(Evento(titulo=titulo, descripcion='Desc', categoria=categoria,
+                          fecha_evento=fecha, autor_id=autor_id))
+
+
+def test_estado_rango_y_paginas(client, crear_usuario):
+    autor, _ = crear_usuario()
+    mediodia = datetime.combine(date.today(), time(12))
+    for dias in (-10, -3, 0, 2, 30):
+        _evento(autor.id, f'Dia {dias}', mediodia + timedelta(days=dias))
+    db.session.commit()
+
+    titulos = lambda url: [e['titulo'] for e in client.get(url).get_json()]
+    assert titulos('/api/eventos?estado=proximos') == ['Dia 0', 'Dia 2', 'Dia 30']
+    assert titulos('/api/eventos?estado=pasados') == ['Dia -3', 'Dia -10']   # más reciente primero
+    assert titulos('/api/eventos?estado=hoy') == ['Dia 0']
+    hasta = (date.today() + timedelta(days=2)).isoformat()
+    assert titulos(f'/api/eventos?desde={date.today().isoformat()}&hasta={hasta}') == ['Dia 0', 'Dia 2']
+
+    pagina = client.get('/api/eventos?estado=proximos&pagina=2&items_por_pagina=2').get_json()
+    assert [e['titulo'] for e in pagina['items']] == ['Dia 30']
+    assert (pagina['total'], pagina['total_paginas'], pagina['items'][0]['dias_restantes']) == (3, 2, 30)
+
+    # Con zona se convierte a UTC (como se guarda fecha_evento): 07:00-05:00 son las 12:00
+    desde = f'{date.today().isoformat()}T07:00:00-05:00'
+    assert titulos(f'/api/eventos?desde={desde}&estado=proximos') == ['Dia 0', 'Dia 2', 'Dia 30']
+    desde = f'{date.today().isoformat()}T07:00:01-05:00'
+    assert titulos(f'/api/eventos?desde={desde}') == ['Dia 2', 'Dia 30']
+
+    assert client.get('/api/eventos?estado=manana').status_code == 400
+    assert client.get('/api/eventos?desde=ayer').status_code == 400
+
+
+def test_fecha_con_zona_se_guarda_en_utc(client, crear_usuario):
+    _, headers = crear_usuario(rol='admin')
+    creado = client.post('/api/eventos', headers=headers, json={
+        'titulo': 'Feria', 'descripcion': 'D', 'fecha_evento': '2026-03-10T19:00:00-05:00'}).get_json()
+    assert creado['fecha_evento'] == '2026-03-11T00:00:00'
+
+    editado = client.put(f"/api/eventos/{creado['id']}", headers=headers,
+                         json={'fecha_evento': '2026-03-10T08:30:00+02:00'}).get_json()
+    assert editado['fecha_evento'] == '2026-03-10T06:30:00'
+    assert client.get('/api/eventos/calendario?mes=2026-03').get_json()['conteos'] == {'2026-03-10': 1}
+
+
+def test_periodo_en_mariadb(app, monkeypatch):
+    motor = SimpleNamespace(engine=SimpleNamespace(dialect=SimpleNamespace(name='mariadb')))
+    monkeypatch.setattr(eventos_routes, 'db', motor)
+    assert 'date_format' in str(eventos_routes._periodo(Evento.fecha_evento, True))
+
+
+def test_calendario(client, crear_usuario):
+    autor, _ = crear_usuario()
+    for dia, categoria in ((3, 'Cultural'), (3, 'Deportivo'), (17, 'Cultural')):
+        _evento(autor.id, 'Evento', datetime(2026, 3, dia, 18), categoria)
+    _evento(autor.id, 'Otro mes', datetime(2026, 4, 1))
+    db.session.commit()
+
+    mes = client.get('/api/eventos/calendario?mes=2026-03').get_json()
+    assert mes['conteos'] == {'2026-03-03': 2, '2026-03-17': 1} and mes['total'] == 3
+    assert mes['hasta'] == '2026-03-31'
+    cultural = client.get('/api/eventos/calendario?mes=2026-03&categoria=Cultural').get_json()
+    assert cultural['total'] == 2
+
+    anio = client.get('/api/eventos/calendario?anio=2026').get_json()
+    assert anio['conteos'] == {'2026-03': 3, '2026-04': 1} and anio['agrupado_por'] == 'mes'
+    assert client.get('/api/eventos/calendario?mes=marzo').status_code == 400
+    assert client.get('/api/eventos/calendario?mes=9999-12').status_code == 400
+
+
+def test_calendario_sin_mes_sigue_a_la_fecha(client, crear_usuario, monkeypatch):
+    autor, _ = crear_usuario()
+    _evento(autor.id, 'Marzo', datetime(2026, 3, 10))
+    _evento(autor.id, 'Abril', datetime(2026, 4, 10))
+    db.session.commit()
+
+    def hoy(dia):
+        monkeypatch.setattr(eventos_routes, 'date', type('Fija', (date,), {'today': classmethod(lambda c: dia)}))
+
+    hoy(date(2026, 3, 31))
+    marzo = client.get('/api/eventos/calendario')
+    assert marzo.get_json()['conteos'] == {'2026-03-10': 1}
+
+    # Cambió el mes sin escrituras: ni 304 ni la entrada cacheada de marzo
+    hoy(date(2026, 4, 1))
+    abril = client.get('/api/eventos/calendario', headers={'If-None-Match': marzo.headers['ETag']})
+    assert abril.status_code == 200 and abril.get_json()['conteos'] == {'2026-04-10': 1}
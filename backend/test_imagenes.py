@@ -0,0 +1,181 @@
+import io
+import os
+
+from PIL import Image
+
+import archivos
+from imagenes import detectar_tipo
+
+
+def _png(ancho, alto):
+    datos = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 80, 40)).save(datos, 'PNG')
+    datos.seek(0)
+    return datos
+
+
+def test_detectar_tipo():
+    assert detectar_tipo(b'\xff\xd8\xff\xe0\x00\x10JFIF') == 'jpeg'
+    assert detectar_tipo(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'webp'
+    assert detectar_tipo(b'<script>alert') is None
+
+
+def test_subida_genera_variantes(client, crear_usuario):
+    # La extensión no manda: un texto renombrado a .png se rechaza
+    falso = client.post('/api/upload', data={'file': (io.BytesIO(b'no soy una imagen'), 'foto.png')})
+    assert falso.status_code == 400
+
+    subida = client.post('/api/upload', data={'file': (_png(1000, 500), 'foto.jpg')}).get_json()
+    assert subida['url'].endswith('.png')   # nombre según el tipo real
+
+    _, headers = crear_usuario()
+    noticia = client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos', 'imagen': subida['url']}).get_json()
+
+    srcset = client.get(f"/api/noticias/{noticia['id']}").get_json()['imagen_srcset']
+    assert (srcset['ancho'], srcset['alto']) == (1000, 500)
+    assert [parte.split()[1] for parte in srcset['srcset']['webp'].split(', ')] == ['400w', '800w', '1000w']
+    assert client.get(srcset['srcset']['png'].split()[0]).status_code == 200
+
+
+def test_uploads_por_contenido(app, client):
+    primera = client.post('/api/upload', data={'file': (_png(600, 300), 'a.png')}).get_json()
+    segunda = client.post('/api/upload', data={'file': (_png(600, 300), 'b.png')}).get_json()
+    assert primera['url'] == segunda['url'] and primera['imagen_id'] == segunda['imagen_id']
+
+    respuesta = client.get(primera['url'])
+    assert 'immutable' in respuesta.headers['Cache-Control']
+    etag = respuesta.headers['ETag']
+    assert not etag.startswith('W/')
+
+    assert client.get(primera['url'], headers={'If-None-Match': etag}).status_code == 304
+    parcial = client.get(primera['url'], headers={'Range': 'bytes=0-9'})
+    assert parcial.status_code == 206 and len(parcial.data) == 10
+
+    app.config['UPLOADS_OFFLOAD'] = 'x-accel'
+    offload = client.get(primera['url'])
+    assert offload.headers['X-Accel-Redirect'].endswith(primera['filename']) and offload.data == b''
+
+
+def test_limpiar_uploads(app, client, crear_usuario):
+    import os
+    from archivos import limpiar, ruta
+
+    usada = client.post('/api/upload', data={'file': (_png(500, 200), 'a.png')}).get_json()
+    huerfana = client.post('/api/upload', data={'file': (_png(500, 201), 'b.png')}).get_json()
+    _, headers = crear_usuario()
+    client.post('/api/noticias', headers=headers, json={
+        'titulo': 'Posada', 'descripcion': 'Fiesta', 'categoria': 'Eventos', 'imagen': usada['url']})
+
+    archivos, _, filas = limpiar(horas_gracia=0, borrar=True)
+    nombres = {os.path.basename(a) for a in archivos}
+    assert huerfana['filename'] in nombres and filas == 1
+    assert not any(n.startswith(usada['filename'].split('.')[0]) for n in nombres)
+    assert os.path.exists(ruta(usada['filename']))
+
+
+def test_subida_demasiado_grande(app, client):
+    app.config['UPLOAD_MAX_BYTES'] = 1000
+    respuesta = client.post('/api/upload', data={'file': (_png(400, 400), 'grande.png')})
+    assert respuesta.status_code == 400 and 'demasiado grande' in respuesta.get_json()['error']
+
+
+def test_subida_reanudable(client):
+    contenido = _png(700, 350).getvalue()
+    sesion = client.post('/api/upload/sesiones', json={'tamano': len(contenido), 'nombre': 'foto.png'}).get_json()
+    url = sesion['url']
+
+    mitad = len(contenido) // 2
+    parte = client.patch(url, data=contenido[:mitad], headers={'Upload-Offset': '0'})
+    assert parte.get_json()['offset'] == mitad
+
+    # Se cortó la conexión: el cliente pregunta por dónde seguir
+    assert client.head(url).headers['Upload-Offset'] == str(mitad)
+    assert client.patch(url, data=contenido[mitad:], headers={'Upload-Offset': '0'}).status_code == 409
+
+    final = client.patch(url, data=contenido[mitad:], headers={'Upload-Offset': str(mitad)}).get_json()
+    assert final['offset'] == len(contenido) and final['filename'].endswith('.png')
+    assert client.get(final['url']).status_code == 200
+
+    falsa = client.post('/api/upload/sesiones', json={'tamano': 20, 'nombre': 'x.jpg'}).get_json()
+    rechazo = client.patch(falsa['url'], data=b'<html>no es imagen', headers={'Upload-Offset': '0'})
+    assert rechazo.status_code == 400
+    assert client.head(falsa['url']).status_code == 404
+
+
+def test_pendientes_no_se_sirven(app, client):
+    import os
+    from archivos import ruta_pendiente
+    from models import db, Imagen
+
+    # Recién subida, sin procesar (metadatos incluidos): 404 sin cachear
+    nombre = 'a' * 64 + '.png'
+    os.makedirs(os.path.dirname(ruta_pendiente(nombre)), exist_ok=True)
+    with open(ruta_pendiente(nombre), 'wb') as f:
+        f.write(_png(10, 10).getvalue())
+    respuesta = client.get(f'/uploads/{nombre}')
+    assert respuesta.status_code == 404 and respuesta.headers['Cache-Control'] == 'no-store'
+    os.remove(ruta_pendiente(nombre))
+
+    # Con firma PNG pero corrupta: queda en error y se borra el original
+    corrupta = client.post('/api/upload', data={'file': (io.BytesIO(b'\x89PNG\r\n\x1a\n' + b'basura' * 10),
+                                                         'rota.png')}).get_json()
+    assert db.session.get(Imagen, corrupta['imagen_id']).estado == 'error'
+    assert not os.path.exists(ruta_pendiente(corrupta['filename']))
+    assert client.get(corrupta['url']).status_code == 404
+
+
+def test_resubir_una_imagen_que_fallo(app, client):
+    import os
+    from archivos import ruta
+    from models import db, Imagen
+
+    subida = client.post('/api/upload', data={'file': (_png(300, 150), 'a.png')}).get_json()
+    imagen = db.session.get(Imagen, subida['imagen_id'])
+    imagen.estado = 'error'   # p. ej. el trabajador murió procesándola
+    db.session.commit()
+    os.remove(ruta(subida['filename']))
+    assert client.get(subida['url']).status_code == 404
+
+    # Los mismos bytes otra vez: se vuelve a encolar en lugar de descartar la copia
+    otra = client.post('/api/upload', data={'file': (_png(300, 150), 'b.png')}).get_json()
+    assert otra['imagen_id'] == subida['imagen_id']
+    db.session.expire_all()
+    assert db.session.get(Imagen, subida['imagen_id']).estado == 'lista'
+    assert client.get(subida['url']).status_code == 200
+
+
+def test_cupo_de_subidas_reanudables(app, client):
+    app.config.update(SUBIDAS_SESIONES_POR_IP=2, SUBIDAS_BYTES_POR_IP=1000, SUBIDAS_SESIONES_TOTAL=3)
+
+    def abrir(tamano, ip='10.0.0.1'):
+        return client.post('/api/upload/sesiones', json={'tamano': tamano, 'nombre': 'foto.png'},
+                           environ_base={'REMOTE_ADDR': ip})
+
+    primera = abrir(400).get_json()
+    assert abrir(700).status_code == 429          # bytes reservados por IP
+    assert abrir(400).status_code == 201
+    assert abrir(10).status_code == 429           # sesiones por IP
+    assert abrir(10, '10.0.0.2').status_code == 201
+    assert abrir(10, '10.0.0.3').status_code == 507   # cupo total
+
+    # Las sesiones abandonadas vencen y liberan el cupo
+    parcial = os.path.join(app.config['UPLOAD_FOLDER'], archivos.CARPETA_PENDIENTES, primera['id'] + '.parcial')
+    os.utime(parcial, (0, 0))
+    assert abrir(10, '10.0.0.3').status_code == 201
+    assert client.head(primera['url']).status_code == 404
+
+
+def test_bloques_concurrentes_con_candado_portable(app, client):
+    contenido = _png(20, 20).getvalue()
+    sesion = client.post('/api/upload/sesiones', json={'tamano': len(contenido), 'nombre': 'foto.png'}).get_json()
+    candado = os.path.join(app.config['UPLOAD_FOLDER'], archivos.CARPETA_PENDIENTES, sesion['id'] + '.candado')
+
+    open(candado, 'w').close()   # otro worker está escribiendo esta sesión
+    assert client.patch(sesion['url'], data=contenido, headers={'Upload-Offset': '0'}).status_code == 409
+
+    # Un candado que quedó de un proceso caído vence
+    os.utime(candado, (0, 0))
+    final = client.patch(sesion['url'], data=contenido, headers={'Upload-Offset': '0'})
+    assert final.status_code == 200 and final.get_json()['offset'] == len(contenido)
+    assert not os.path.exists(candado)
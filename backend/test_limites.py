@@ -0,0 +1,46 @@
+from limites import Regla, cubeta, ventana, LimitesMemoriaCompartida, Limitador
+
+
+def test_cubeta_y_ventana():
+    estado, espera = None, 0
+    for _ in range(3):
+        estado, espera = cubeta(estado, 100.0, capacidad=3, por_segundo=0.5)
+        assert espera == 0
+    estado, espera = cubeta(estado, 100.0, 3, 0.5)
+    assert espera == 2                                    # un token cada 2 s
+    assert cubeta(estado, 102.0, 3, 0.5)[1] == 0
+
+    estado = None
+    for _ in range(2):
+        estado, espera = ventana(estado, 10.0, limite=2, segundos=10)
+        assert espera == 0
+    estado, espera = ventana(estado, 15.0, 2, 10)
+    assert espera == 5                                    # hasta la ventana siguiente
+    # A la mitad de la ventana siguiente las 2 anteriores pesan 1: cabe una más
+    estado, espera = ventana(estado, 25.0, 2, 10)
+    assert espera == 0 and ventana(estado, 25.0, 2, 10)[1] > 0
+
+
+def test_login_limitado_antes_del_hash(app, client, crear_usuario, contar_consultas):
+    crear_usuario()
+    app.config['LIMITES_AUTH'] = 'ip:100/60,email:2/60:ventana'
+    intento = {'email': 'Usuario@test.com', 'password': 'incorrecta'}
+    for _ in range(2):
+        assert client.post('/api/auth/login', json=intento).status_code == 401
+
+    respuesta, sentencias = contar_consultas(client.post, '/api/auth/login', json=intento)
+    assert respuesta.status_code == 429 and int(respuesta.headers['Retry-After']) > 0
+    assert sentencias == []
+    # Otro email desde la misma IP sigue pasando
+    assert client.post('/api/auth/login', json={'email': 'otro@test.com', 'password': 'x'}).status_code == 401
+
+    texto = client.get('/api/metrics').get_data(as_text=True)
+    assert 'webcomunitaria_limites_rechazadas_total{blueprint="auth",regla="email:2/60:ventana"} 1' in texto
+
+
+def test_backend_compartido():
+    LimitesMemoriaCompartida.vaciar()
+    regla = Regla('ip:1/60')
+    assert LimitesMemoriaCompartida().consumir('login|ip|1.2.3.4', regla) == 0
+    assert LimitesMemoriaCompartida().consumir('login|ip|1.2.3.4', regla) > 0   # otro proceso
+    assert Limitador(LimitesMemoriaCompartida()).estadisticas()['backend']['tipo'] == 'memoria'
@@ -0,0 +1,33 @@
+import json
+import logging
+
+
+def test_server_timing_y_prometheus(client):
+    respuesta = client.get('/api/noticias')
+    timing = respuesta.headers.getlist('Server-Timing')
+    assert timing[0].startswith('app;dur=') and 'consultas' in timing[1]
+
+    texto = client.get('/api/metrics').get_data(as_text=True)
+    assert ('webcomunitaria_http_duracion_segundos_bucket'
+            '{endpoint="noticias.get_noticias",metodo="GET",le="+Inf"} 1') in texto
+    assert 'webcomunitaria_http_respuestas_total{endpoint="noticias.get_noticias",metodo="GET",estado="200"} 1' in texto
+    assert 'webcomunitaria_http_consultas_sql_count{endpoint="noticias.get_noticias",metodo="GET"} 1' in texto
+    assert 'webcomunitaria_tareas{estado="pendientes"} 0' in texto
+    assert '# TYPE webcomunitaria_cache_aciertos_total counter' in texto
+
+
+def test_log_de_peticiones_lentas(app, client, caplog):
+    app.config['METRICAS_LENTA_MS'] = 0
+    with caplog.at_level(logging.WARNING, logger='lentas'):
+        client.get('/api/eventos')
+
+    registro = json.loads(caplog.records[-1].getMessage())
+    assert registro['endpoint'] == 'eventos.get_eventos' and registro['estado'] == 200
+    assert registro['consultas'] == len(registro['sentencias']) > 0
+    assert registro['sentencias'][0]['sql'].startswith('SELECT')
+
+
+def test_token_de_metricas(app, client):
+    app.config['METRICAS_TOKEN'] = 'prometeo'
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer prometeo'}).status_code == 200
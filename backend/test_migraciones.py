@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.pool import StaticPool
+
+import migraciones
+from migraciones import EsquemaDesactualizado
+
+
+def motor():
+    return create_engine('sqlite://', poolclass=StaticPool)
+
+
+def test_base_nueva_queda_en_la_ultima_version():
+    engine = motor()
+    with pytest.raises(EsquemaDesactualizado):
+        migraciones.verificar(engine)
+
+    aplicadas = migraciones.migrar(engine)
+    assert aplicadas == [v for v, _ in migraciones.migraciones()]
+    assert migraciones.verificar(engine) == migraciones.ultima_version()
+
+    indices = {i['name'] for i in inspect(engine).get_indexes('comentarios')}
+    assert 'ix_comentarios_noticia_fecha' in indices
+
+    # Repetir no hace nada
+    assert migraciones.migrar(engine) == []
+
+
+def test_migraciones_llegan_al_esquema_de_los_modelos():
+    # El DDL de las migraciones está congelado: al cambiar un modelo hace falta una nueva
+    from models import db
+    engine = motor()
+    migraciones.migrar(engine)
+    inspector = inspect(engine)
+    assert set(db.metadata.tables) <= set(inspector.get_table_names())
+    for nombre, tabla in db.metadata.tables.items():
+        assert {c['name'] for c in inspector.get_columns(nombre)} == set(tabla.columns.keys()), nombre
+        assert {i['name'] for i in inspector.get_indexes(nombre)} >= {i.name for i in tabla.indexes}, nombre
+
+
+def test_actualiza_una_base_de_init_db_sql():
+    engine = motor()
+    with engine.begin() as conexion:
+        conexion.execute(text(
+            'CREATE TABLE usuarios (id INTEGER PRIMARY KEY, nombre VARCHAR(100) NOT NULL, '
+            'email VARCHAR(120) NOT NULL UNIQUE, password_hash VARCHAR(255) NOT NULL, '
+            "rol VARCHAR(20) NOT NULL DEFAULT 'usuario', avatar VARCHAR(255), fecha_registro DATETIME)"))
+        conexion.execute(text(
+            "INSERT INTO usuarios (nombre, email, password_hash) VALUES ('Ana', 'ana@test.com', 'x')"))
+
+    migraciones.migrar(engine, hasta=2)
+    with pytest.raises(EsquemaDesactualizado):
+        migraciones.verificar(engine)
+
+    migraciones.migrar(engine)
+    with engine.connect() as conexion:
+        assert conexion.execute(text('SELECT token_version FROM usuarios')).scalar() == 0
+        assert migraciones.tiene_tabla(conexion, 'eventos')
+        assert migraciones.tiene_indice(conexion, 'eventos', 'ix_eventos_categoria_fecha')
+
+
+def test_rellena_contadores_de_reacciones():
+    engine = motor()
+    migraciones.migrar(engine, hasta=6)
+    with engine.begin() as conexion:
+        conexion.execute(text("INSERT INTO usuarios (id, nombre, email, password_hash, rol, token_version) "
+                              "VALUES (1, 'Ana', 'ana@test.com', 'x', 'usuario', 0), "
+                              "(2, 'Beto', 'beto@test.com', 'x', 'usuario', 0)"))
+        conexion.execute(text("INSERT INTO noticias (id, titulo, descripcion, categoria, autor_id) "
+                              "VALUES (1, 'N', 'D', 'General', 1), (2, 'M', 'D', 'General', 1)"))
+        conexion.execute(text("INSERT INTO reacciones (noticia_id, usuario_id, tipo) "
+                              "VALUES (1, 1, 'like'), (1, 2, 'wow'), (2, 1, 'like')"))
+        # La noticia 2 ya tenía su fila: no se pisa
+        conexion.execute(text("INSERT INTO reacciones_conteo VALUES (2, 1, 0, 0, 0, 0, 1)"))
+
+    migraciones.migrar(engine)
+    with engine.connect() as conexion:
+        filas = conexion.execute(text('SELECT noticia_id, total_like, total_wow, total '
+                                      'FROM reacciones_conteo ORDER BY noticia_id')).all()
+    assert [tuple(f) for f in filas] == [(1, 1, 1, 2), (2, 1, 0, 1)]
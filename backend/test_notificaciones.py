@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import db, Noticia, Notificacion, NotificacionConteo
+from migrar_notificaciones import migrar_notificaciones
+import notificaciones
+
+
+def test_contador_de_no_leidas(app, client, crear_usuario, contar_consultas):
+    autor, _ = crear_usuario('autor@test.com')
+    lector, headers = crear_usuario('lector@test.com')
+    resumen = lambda: client.get('/api/auth/notificaciones/resumen', headers=headers).get_json()['no_leidas']
+    assert resumen() == 0 and db.session.get(NotificacionConteo, lector.id) is None   # GET no escribe
+    registrado = client.post('/api/auth/register', json={
+        'nombre': 'Nuevo', 'email': 'nuevo@test.com', 'password': 'secreto123'}).get_json()
+    assert db.session.get(NotificacionConteo, registrado['usuario']['id']) is not None
+    notificaciones.iniciar_conteo(lector)
+    db.session.commit()
+
+    notificaciones.publicar('Difusión 1', autor_id=autor.id)
+    notificaciones.publicar('Difusión 2', autor_id=lector.id)   # la propia no cuenta
+    personal = notificaciones.publicar('Personal', usuario_id=lector.id)
+    db.session.commit()
+    assert resumen() == 2
+
+    respuesta, sentencias = contar_consultas(client.get, '/api/auth/notificaciones/resumen', headers=headers)
+    assert respuesta.get_json()['no_leidas'] == 2
+    assert not any('count(' in s.lower() for s in sentencias)   # solo la fila del contador
+
+    for _ in range(2):   # marcarla dos veces descuenta una sola
+        client.post(f'/api/auth/notificaciones/{personal.id}/leer', headers=headers)
+    assert resumen() == 1 == client.get('/api/auth/notificaciones', headers=headers).get_json()['no_leidas']
+
+    client.post('/api/auth/notificaciones/leer-todas', headers=headers)
+    notificaciones.publicar('Difusión 3', autor_id=autor.id)
+    db.session.commit()
+    assert resumen() == 1
+
+
+def test_verificar_y_reparar(app, client, crear_usuario):
+    autor, _ = crear_usuario('autor@test.com')
+    lector, headers = crear_usuario('lector@test.com')
+    notificaciones.publicar('Difusión', autor_id=autor.id)
+    db.session.commit()
+    assert notificaciones.no_leidas(lector) == 1   # sin fila: conteo exacto
+    notificaciones.verificar_no_leidas(reparar=True)   # crea las filas que faltan
+    assert db.session.get(NotificacionConteo, lector.id) is not None
+
+    db.session.get(NotificacionConteo, lector.id).ajuste += 5   # deriva
+    db.session.commit()
+    assert notificaciones.verificar_no_leidas() == [{'usuario_id': lector.id, 'esperado': 1, 'actual': 6}]
+    notificaciones.verificar_no_leidas(reparar=True)
+    assert notificaciones.verificar_no_leidas() == []
+    assert client.get('/api/auth/notificaciones/resumen', headers=headers).get_json()['no_leidas'] == 1
+
+
+def test_borrar_noticia_descuenta(app, client, crear_usuario):
+    autor, headers_autor = crear_usuario('autor@test.com')
+    sin_leer, headers = crear_usuario('lector@test.com')
+    suelta, _ = crear_usuario('suelta@test.com')
+    cursor, _ = crear_usuario('cursor@test.com')
+    for usuario in (autor, sin_leer, suelta, cursor):
+        notificaciones.iniciar_conteo(usuario)   # filas del contador
+    db.session.commit()
+
+    noticia_id = client.post('/api/noticias', headers=headers_autor, json={
+        'titulo': 'Feria', 'descripcion': 'Sábado', 'categoria': 'Eventos'}).get_json()['id']
+    client.post('/api/noticias', headers=headers_autor, json={
+        'titulo': 'Taller', 'descripcion': 'Domingo', 'categoria': 'Eventos'}).get_json()['id']
+    difusion = Notificacion.query.filter_by(noticia_id=noticia_id).one()
+    notificaciones.publicar('Personal', noticia_id=noticia_id, usuario_id=sin_leer.id)
+    notificaciones.marcar_leida(suelta, difusion.id)
+    notificaciones.marcar_todas(cursor)
+    db.session.commit()
+    recien, _ = crear_usuario('nuevo@test.com')   # se registró después: no la ve
+    notificaciones.iniciar_conteo(recien)
+    db.session.commit()
+    assert [notificaciones.no_leidas(u) for u in (autor, sin_leer, suelta, cursor, recien)] == [0, 3, 1, 0, 0]
+
+    assert client.delete(f'/api/noticias/{noticia_id}', headers=headers_autor).status_code == 200
+    assert [notificaciones.no_leidas(u) for u in (autor, sin_leer, suelta, cursor, recien)] == [0, 1, 1, 0, 0]
+    assert notificaciones.verificar_no_leidas() == []
+
+
+def test_migrar_filas_por_usuario(app, crear_usuario):
+    autor, _ = crear_usuario('autor@test.com')
+    usuarios = [crear_usuario(f'{n}@test.com')[0] for n in ('ana', 'beto', 'carla')]
+    hace = lambda dias: datetime.utcnow() - timedelta(days=dias)
+    for u in [autor] + usuarios:
+        u.fecha_registro = hace(10)
+    noticias = [Noticia(titulo=f'N{i}', descripcion='D', categoria='General', autor_obj=autor) for i in range(3)]
+    db.session.add_all(noticias)
+    db.session.commit()
+    notificaciones.iniciar_conteo(usuarios[0])   # contador creado antes de migrar
+    db.session.commit()
+
+    # Tabla anterior: una fila por usuario y publicación (el autor no recibe la suya)
+    db.session.execute(text('CREATE TABLE notificaciones (id INTEGER PRIMARY KEY, usuario_id INTEGER NOT NULL, '
+                            'noticia_id INTEGER, mensaje VARCHAR(300) NOT NULL, leida BOOLEAN NOT NULL, '
+                            'fecha DATETIME)'))
+    leidas = {usuarios[0].id: (True, True, False), usuarios[1].id: (False, True, True),
+              usuarios[2].id: (False, False, False)}
+    for i, noticia in enumerate(noticias):
+        for usuario_id, estados in leidas.items():
+            db.session.execute(text('INSERT INTO notificaciones (usuario_id, noticia_id, mensaje, leida, fecha) '
+                                    'VALUES (:u, :n, :m, :l, :f)'),
+                               {'u': usuario_id, 'n': noticia.id, 'm': f'Nueva: N{i}', 'l': estados[i], 'f': hace(3 - i)})
+    db.session.commit()
+
+    assert migrar_notificaciones(eliminar_anterior=True) == 3
+    db.session.expire_all()
+    for usuario in usuarios:
+        esperado = [(f'Nueva: N{i}', leidas[usuario.id][i]) for i in (2, 1, 0)]
+        assert [(n['mensaje'], n['leida']) for n in notificaciones.listar(usuario)] == esperado
+        assert notificaciones.no_leidas(usuario) == leidas[usuario.id].count(False)
+    assert notificaciones.listar(autor) == [] and notificaciones.no_leidas(autor) == 0
+
+    beto = usuarios[1]
+    primera = notificaciones.listar(beto)[-1]
+    assert notificaciones.marcar_leida(beto, primera['id'])
+    db.session.commit()
+    assert all(n['leida'] for n in notificaciones.listar(beto)) and notificaciones.no_leidas(beto) == 0
+    assert notificaciones.verificar_no_leidas() == []
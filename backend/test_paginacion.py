@@ -0,0 +1,87 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import text
+
+from models import db, Noticia, Comentario, Evento
+from paginacion import codificar_cursor, total_cacheado
+
+# Varias filas con la misma fecha (desempata el id); todas en el pasado para ?estado=pasados
+MISMA = datetime.combine(date.today() - timedelta(days=30), time(12))
+
+
+def _recorrer(client, url, items_por_pagina=2, **params):
+    """ids de todas las páginas siguiendo next_cursor"""
+    ids, cursor, paginas = [], '', 0
+    while cursor is not None:
+        datos = client.get(url, query_string={**params, 'cursor': cursor,
+                                              'items_por_pagina': items_por_pagina}).get_json()
+        assert len(datos['items']) <= items_por_pagina
+        ids += [i['id'] for i in datos['items']]
+        cursor, paginas = datos['next_cursor'], paginas + 1
+    return ids, paginas
+
+
+def _sembrar(autor):
+    fechas = [MISMA - timedelta(days=1), MISMA, MISMA, MISMA, MISMA + timedelta(days=1)]
+    noticias = [Noticia(titulo=f'N{i}', descripcion='D', categoria='General', fecha=f, autor_obj=autor)
+                for i, f in enumerate(fechas)]
+    db.session.add_all(noticias)
+    db.session.flush()
+    comentarios = [Comentario(noticia_id=noticias[0].id, usuario_id=autor.id, texto=f'C{i}', fecha=f)
+                   for i, f in enumerate(reversed(fechas))]
+    eventos = [Evento(titulo=f'E{i}', descripcion='D', categoria='General', fecha_evento=f, autor_id=autor.id)
+               for i, f in enumerate(fechas)]
+    db.session.add_all(comentarios + eventos)
+    db.session.commit()
+    return noticias, comentarios, eventos
+
+
+def _orden(filas, fecha, descendente):
+    return [f.id for f in sorted(filas, key=lambda f: (getattr(f, fecha), f.id), reverse=descendente)]
+
+
+def test_cursor_con_empates_en_los_tres_listados(client, crear_usuario):
+    autor, _ = crear_usuario()
+    noticias, comentarios, eventos = _sembrar(autor)
+
+    # Feed: (fecha, id) descendente; comentarios: ascendente
+    assert _recorrer(client, '/api/noticias') == (_orden(noticias, 'fecha', True), 3)
+    assert _recorrer(client, f'/api/noticias/{noticias[0].id}/comentarios') == \
+        (_orden(comentarios, 'fecha', False), 3)
+
+    # Eventos pasados: descendente (el más reciente primero); sin estado, ascendente
+    assert _recorrer(client, '/api/eventos', estado='pasados') == (_orden(eventos, 'fecha_evento', True), 3)
+    ids, _ = _recorrer(client, '/api/eventos', items_por_pagina=3)
+    assert ids == _orden(eventos, 'fecha_evento', False)
+
+
+def test_cursor_invalido_responde_400(client, crear_usuario):
+    autor, _ = crear_usuario()
+    noticias, _, _ = _sembrar(autor)
+    urls = ('/api/noticias', f'/api/noticias/{noticias[0].id}/comentarios', '/api/eventos')
+    for cursor in ('basura!', codificar_cursor('no-es-fecha', 1), codificar_cursor(MISMA)):
+        for url in urls:
+            assert client.get(url, query_string={'cursor': cursor}).status_code == 400, (url, cursor)
+
+
+def test_total_cacheado(app, client, crear_usuario):
+    autor, _ = crear_usuario()
+    noticias, comentarios, _ = _sembrar(autor)
+    url = f'/api/noticias/{noticias[0].id}/comentarios?cursor=&total=1'
+    assert client.get(url).get_json()['total'] == 5
+    assert client.get('/api/noticias?cursor=&total=1').get_json()['total_items'] == 5
+
+    # Un INSERT fuera del ORM no invalida: el conteo sigue cacheado hasta el TTL
+    db.session.execute(text("INSERT INTO noticias (titulo, descripcion, categoria, autor_id, fecha) "
+                            "VALUES ('Cruda', 'D', 'General', :a, :f)"), {'a': autor.id, 'f': MISMA})
+    db.session.commit()
+    assert total_cacheado('noticias', None, Noticia.query) == 5
+    app.config['PAGINACION_TOTAL_TTL'] = 0
+    assert total_cacheado('noticias', None, Noticia.query) == 6
+    app.config['PAGINACION_TOTAL_TTL'] = 60
+
+    # Un alta por el ORM invalida los totales de esa tabla al confirmar
+    db.session.add(Noticia(titulo='Nueva', descripcion='D', categoria='General', autor_obj=autor))
+    db.session.commit()
+    assert total_cacheado('noticias', None, Noticia.query) == 7
+    assert client.get('/api/noticias?cursor=&total=1').get_json()['total_items'] == 7
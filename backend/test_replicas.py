@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import create_engine, text
+
+import migraciones
+from app import create_app
+from auth import generate_token
+from config import Config
+from models import db, Usuario, Noticia
+
+
+@pytest.fixture
+def crear_app(monkeypatch, tmp_path):
+    """App con la primaria y la réplica en dos archivos SQLite distintos"""
+    apps = []
+
+    def _crear(replica=None):
+        if replica is None:
+            replica = f"sqlite:///{tmp_path / 'replica.db'}"
+            motor = create_engine(replica)
+            migraciones.migrar(motor)
+            motor.dispose()
+        monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'primaria.db'}")
+        monkeypatch.setattr(Config, 'DB_REPLICAS', [replica])
+        monkeypatch.setattr(Config, 'DB_REPLICA_INTERVALO', 0)
+        app = create_app()
+        apps.append(app)
+        return app
+
+    yield _crear
+    for app in apps:
+        with app.app_context():
+            for motor in db.engines.values():
+                motor.dispose()
+
+
+def _publicar():
+    """Usuario y noticia escritos solo en la primaria"""
+    usuario = Usuario(nombre='Ana', email='ana@test.com', rol='admin')
+    usuario.set_password('secreto123')
+    noticia = Noticia(titulo='Feria', descripcion='Sábado', categoria='Eventos', autor_obj=usuario)
+    db.session.add_all([usuario, noticia])
+    db.session.commit()
+    return noticia.id, {'Authorization': f'Bearer {generate_token(usuario)}'}
+
+
+def test_lecturas_en_replica_y_leer_lo_propio(crear_app):
+    app = crear_app()
+    client = app.test_client()
+    with app.app_context():
+        noticia_id, headers = _publicar()
+
+    # La réplica (vacía) va dentro del retraso permitido: se lee de ella
+    assert client.get('/api/noticias').get_json()['items'] == []
+    url = f'/api/noticias/{noticia_id}/comentarios'
+    assert client.get(url).status_code == 404
+
+    # Quien escribe lee de la primaria mientras dure la cookie
+    creado = client.post(url, headers=headers, json={'texto': 'Ahí estaré'})
+    assert 'lectura_primaria=1' in creado.headers['Set-Cookie']
+    assert client.get(url).get_json()['total'] == 1
+
+    # Sin la cookie: de nuevo la réplica
+    client.delete_cookie('lectura_primaria')
+    assert client.get(f'/api/noticias/{noticia_id}').status_code == 404
+
+
+def test_replica_atrasada_o_caida_usa_la_primaria(crear_app, tmp_path):
+    app = crear_app()
+    client = app.test_client()
+    with app.app_context():
+        _publicar()
+        db.session.execute(text('UPDATE versiones SET actualizado = :fecha'),
+                           {'fecha': datetime.utcnow() - timedelta(minutes=1)})
+        db.session.commit()
+
+    assert len(client.get('/api/noticias').get_json()['items']) == 1
+    estado = client.get('/api/db/estado').get_json()['replicas']
+    assert estado['lecturas_primaria'] == 1 and estado['replicas'][0]['retraso_segundos'] >= 60
+
+    caida = crear_app(replica=f"sqlite:///{tmp_path / 'no-existe' / 'replica.db'}")
+    client = caida.test_client()
+    assert len(client.get('/api/noticias').get_json()['items']) == 1
+    replica = client.get('/api/db/estado').get_json()['replicas']['replicas'][0]
+    assert replica['fallos'] == 1 and not replica['disponible']
@@ -0,0 +1,111 @@
+from datetime import datetime, timedelta
+import pytest
+from models import db, Usuario, Noticia, Comentario, Evento, Imagen
+
+
+@pytest.fixture
+def datos(app):
+    """Doce autores distintos, cada uno con una noticia, un comentario y un evento"""
+    app.config['PAGINACION_TOTAL_TTL'] = 0  # medir siempre con el COUNT incluido
+    noticia_base = None
+    for i in range(12):
+        autor = Usuario(nombre=f'Autor {i}', email=f'autor{i}@test.com', password_hash='x')
+        db.session.add(autor)
+        db.session.flush()
+
+        noticia = Noticia(titulo=f'Noticia {i}', descripcion='Desc', categoria='General',
+                          fecha=datetime(2026, 1, 1) + timedelta(hours=i), autor_id=autor.id)
+        db.session.add(noticia)
+        db.session.flush()
+        noticia_base = noticia_base or noticia
+
+        db.session.add(Comentario(noticia_id=noticia_base.id, usuario_id=autor.id, texto=f'Comentario {i}'))
+        db.session.add(Evento(titulo=f'Evento {i}', descripcion='Desc', autor_id=autor.id,
+                              fecha_evento=datetime(2026, 2, 1) + timedelta(days=i)))
+    db.session.commit()
+    noticia_id = noticia_base.id
+    db.session.expunge_all()
+    return noticia_id
+
+
+def _consultas_por_pagina(client, contar_consultas, url, tamanos=(2, 10)):
+    conteos = []
+    for tamano in tamanos:
+        db.session.expunge_all()
+        respuesta, sentencias = contar_consultas(client.get, f'{url}items_por_pagina={tamano}')
+        assert respuesta.status_code == 200
+        conteos.append(len(sentencias))
+    return conteos
+
+
+def test_noticias_consultas_constantes(client, contar_consultas, datos):
+    pequena, grande = _consultas_por_pagina(client, contar_consultas, '/api/noticias?')
+    assert pequena == grande
+
+
+def test_comentarios_consultas_constantes(client, contar_consultas, datos):
+    url = f'/api/noticias/{datos}/comentarios?'
+    pequena, grande = _consultas_por_pagina(client, contar_consultas, url)
+    assert pequena == grande
+
+
+def test_eventos_consultas_constantes(client, contar_consultas, datos):
+    respuesta, sentencias = contar_consultas(client.get, '/api/eventos')
+    assert respuesta.status_code == 200
+    assert len(respuesta.get_json()) == 12
+    assert len(sentencias) == 2   # sellos de versión (ETag) + eventos con autor
+
+
+@pytest.mark.parametrize('estrategia', ['joined', 'selectin'])
+def test_estrategia_por_endpoint(app, client, contar_consultas, datos, estrategia):
+    app.config['SERIALIZACION_ESTRATEGIAS'] = {'noticias.get_noticias': estrategia}
+    pequena, grande = _consultas_por_pagina(client, contar_consultas, '/api/noticias?')
+    assert pequena == grande
+
+    items = client.get('/api/noticias?items_por_pagina=3').get_json()['items']
+    assert [n['autor_nombre'] for n in items] == ['Autor 11', 'Autor 10', 'Autor 9']
+
+
+def test_estrategia_lazy_crece_con_la_pagina(app, client, contar_consultas, datos):
+    # Control: con carga perezosa el conteo sí crece, así la prueba detecta regresiones
+    app.config['SERIALIZACION_ESTRATEGIAS'] = {'noticias.get_noticias': 'lazy'}
+    pequena, grande = _consultas_por_pagina(client, contar_consultas, '/api/noticias?')
+    assert grande > pequena
+
+
+def test_feed_con_interacciones_consultas_constantes(client, contar_consultas, datos):
+    url = '/api/noticias?incluir=reacciones,comentarios&'
+    pequena, grande = _consultas_por_pagina(client, contar_consultas, url)
+    assert pequena == grande
+
+    items = client.get(f'{url}items_por_pagina=12').get_json()['items']
+    assert sum(n['total_comentarios'] for n in items) == 12
+
+
+def test_proyeccion_igual_a_to_dict(client, contar_consultas, datos):
+    """Con todos los campos la proyección devuelve lo mismo que to_dict() (autor e imagen incluidos)"""
+    from serializacion import PROYECCIONES
+    noticia = db.session.get(Noticia, datos)
+    noticia.imagen = '/uploads/a.jpg'
+    db.session.add(Imagen(url='/uploads/a.jpg', formato='jpeg', ancho=800, alto=600, estado='lista',
+                          variantes='[{"url": "/uploads/a-400.webp", "ancho": 400, "formato": "webp"}]'))
+    db.session.commit()
+
+    urls = (('/api/noticias?items_por_pagina=12', Noticia),
+            (f'/api/noticias/{datos}/comentarios?items_por_pagina=12', Comentario),
+            ('/api/eventos?pagina=1&items_por_pagina=12', Evento))
+    for url, modelo in urls:
+        completo = client.get(url).get_json()['items']
+        proyectado = client.get(f"{url}&campos={','.join(PROYECCIONES[modelo])}").get_json()['items']
+        assert proyectado == completo
+
+    db.session.expunge_all()
+    respuesta, sentencias = contar_consultas(client.get, '/api/noticias?cursor=&items_por_pagina=5&campos=titulo,autor_nombre')
+    items = respuesta.get_json()['items']
+    assert set(items[0]) == {'id', 'titulo', 'autor_nombre'} and items[0]['autor_nombre'] == 'Autor 11'
+    assert 'contenido' not in sentencias[-1] and len(sentencias) == 2   # sellos + la página con LEFT JOIN
+
+    siguiente = client.get(f"/api/noticias?cursor={respuesta.get_json()['next_cursor']}&items_por_pagina=5"
+                           "&campos=titulo").get_json()['items']
+    assert siguiente[0]['titulo'] == 'Noticia 6'
+    assert client.get('/api/noticias?campos=password_hash').status_code == 400
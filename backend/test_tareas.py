@@ -0,0 +1,106 @@
+import time
+from datetime import datetime, timedelta
+
+import tareas
+from models import db, Tarea
+
+llamadas = []
+
+
+@tareas.tarea('prueba_falla', max_intentos=3)
+def _falla(valor):
+    llamadas.append(valor)
+    raise RuntimeError(f'falló con {valor}')
+
+
+def _disponible_ya(tarea_id):
+    db.session.get(Tarea, tarea_id).disponible_en = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_reintentos_con_backoff_y_fallida(app):
+    app.config.update(TAREAS_REINTENTO_BASE=10, TAREAS_REINTENTO_MAX=15)
+    llamadas.clear()
+    nueva = tareas.encolar('prueba_falla', valor=7)
+    db.session.commit()   # TAREAS_MODO=sincrono: se ejecuta al confirmar
+    tarea_id = nueva.id
+
+    db.session.expire_all()
+    t = db.session.get(Tarea, tarea_id)
+    assert (t.estado, t.intentos, llamadas) == ('pendiente', 1, [7])
+    assert 'falló con 7' in t.error
+    espera = (t.disponible_en - datetime.utcnow()).total_seconds()
+    assert 7 < espera <= 12   # base * 2^0 con ±20%
+
+    # Todavía no está disponible: nadie la toma
+    assert tareas.procesar_pendientes() == 0
+
+    _disponible_ya(tarea_id)
+    assert tareas.procesar_pendientes() == 1
+    t = db.session.get(Tarea, tarea_id)
+    espera = (t.disponible_en - datetime.utcnow()).total_seconds()
+    assert t.intentos == 2 and 11 < espera <= 18   # base * 2^1 = 20, acotado a TAREAS_REINTENTO_MAX y ±20%
+
+    # Al agotar max_intentos queda fallida y no vuelve a la cola
+    _disponible_ya(tarea_id)
+    tareas.procesar_pendientes()
+    t = db.session.get(Tarea, tarea_id)
+    assert (t.estado, t.intentos, len(llamadas)) == ('fallida', 3, 3) and t.terminada_en is not None
+    _disponible_ya(tarea_id)
+    assert tareas.procesar_pendientes() == 0
+
+
+def test_rescate_y_estadisticas(app, client):
+    ahora = datetime.utcnow()
+    app.config['TAREAS_TIMEOUT'] = 60
+    atascada = Tarea(tipo='prueba_falla', estado='en_proceso', intentos=1, iniciada_en=ahora - timedelta(minutes=5))
+    vieja = Tarea(tipo='prueba_falla', estado='completada', creada_en=ahora - timedelta(days=3),
+                  iniciada_en=ahora - timedelta(days=3), terminada_en=ahora - timedelta(days=3))
+    db.session.add_all([atascada, vieja])
+    db.session.commit()
+    atascada_id = atascada.id
+
+    assert tareas.rescatar_atascadas() == 1
+    db.session.expunge_all()   # la purga fue un DELETE masivo
+    assert db.session.get(Tarea, atascada_id).estado == 'pendiente'
+    assert Tarea.query.filter_by(estado='completada').count() == 0   # purgada por TAREAS_RETENCION_HORAS
+
+    db.session.get(Tarea, atascada_id).disponible_en = ahora - timedelta(seconds=30)
+    db.session.add(Tarea(tipo='prueba_falla', estado='completada', creada_en=ahora - timedelta(seconds=12),
+                         iniciada_en=ahora - timedelta(seconds=10), terminada_en=ahora - timedelta(seconds=9)))
+    db.session.add(Tarea(tipo='prueba_falla', estado='pendiente', disponible_en=ahora + timedelta(hours=1)))
+    db.session.commit()
+
+    estado = client.get('/api/tareas/estado').get_json()
+    assert (estado['pendientes'], estado['en_proceso'], estado['completadas'], estado['fallidas']) == (2, 0, 1, 0)
+    assert 30 <= estado['espera_max_segundos'] < 40   # la reprogramada a futuro no cuenta
+    assert estado['latencia_promedio_segundos'] == 2 and estado['duracion_promedio_segundos'] == 1
+
+
+def test_rescate_respeta_latido_y_max_intentos(app):
+    ahora = datetime.utcnow()
+    app.config['TAREAS_TIMEOUT'] = 60
+    hace = lambda minutos: ahora - timedelta(minutes=minutos)
+    larga = Tarea(tipo='prueba_falla', estado='en_proceso', intentos=1, iniciada_en=hace(30), latido_en=hace(0))
+    mata = Tarea(tipo='prueba_falla', estado='en_proceso', intentos=3, max_intentos=3, iniciada_en=hace(5))
+    db.session.add_all([larga, mata])
+    db.session.commit()
+    larga_id, mata_id = larga.id, mata.id
+
+    # La larga sigue latiendo: no se duplica; la que tumbó al trabajador 3 veces no vuelve
+    assert tareas.rescatar_atascadas() == 0
+    db.session.expunge_all()
+    assert db.session.get(Tarea, larga_id).estado == 'en_proceso'
+    caida = db.session.get(Tarea, mata_id)
+    assert caida.estado == 'fallida' and 'latido' in caida.error and caida.terminada_en is not None
+
+
+def test_latido_mientras_corre(app):
+    app.config['TAREAS_TIMEOUT'] = 0.06   # late cada 20 ms
+    t = Tarea(tipo='prueba_falla', estado='en_proceso', trabajador='w', iniciada_en=datetime.utcnow())
+    db.session.add(t)
+    db.session.commit()
+    with tareas._Latido(t):
+        time.sleep(0.1)
+    db.session.expire_all()
+    assert db.session.get(Tarea, t.id).latido_en is not None
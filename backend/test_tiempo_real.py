@@ -0,0 +1,71 @@
+import json
+
+from auth import generate_stream_token
+from models import db
+import notificaciones
+
+
+def _eventos(trozos, cantidad):
+    """Leer del stream hasta juntar `cantidad` eventos (sin comentarios ni retry)"""
+    eventos = []
+    while len(eventos) < cantidad:
+        for bloque in next(trozos).split('\n\n'):
+            campos = dict(linea.split(': ', 1) for linea in bloque.split('\n') if ': ' in linea)
+            if 'event' in campos:
+                eventos.append((campos['event'], json.loads(campos['data']), campos.get('id')))
+    return eventos
+
+
+def test_stream_de_notificaciones(app, client, crear_usuario):
+    autor_id = crear_usuario('autor@test.com')[0].id
+    lector_id = crear_usuario('lector@test.com')[0].id   # el stream cierra la sesión compartida
+    token = client.post('/api/auth/login', json={'email': 'lector@test.com', 'password': 'secreto123'}) \
+        .get_json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+    stream_token = client.post('/api/auth/notificaciones/stream/token', headers=headers).get_json()['stream_token']
+
+    respuesta = client.get(f'/api/auth/notificaciones/stream?token={stream_token}', buffered=False)
+    assert respuesta.mimetype == 'text/event-stream'
+    trozos = (t.decode() for t in respuesta.response)
+    assert _eventos(trozos, 1) == [('no_leidas', {'no_leidas': 0}, None)]
+
+    notificaciones.publicar('Nueva noticia', autor_id=autor_id)
+    db.session.commit()
+    (tipo, datos, id), no_leidas = _eventos(trozos, 2)
+    assert (tipo, datos['mensaje'], datos['usuario_id']) == ('notificacion', 'Nueva noticia', lector_id)
+    assert no_leidas[1] == {'no_leidas': 1}
+
+    client.post('/api/auth/notificaciones/leer-todas', headers=headers)
+    assert _eventos(trozos, 1) == [('no_leidas', {'no_leidas': 0}, None)]
+    respuesta.close()
+
+    # Al reconectar con Last-Event-ID se reenvía lo que se perdió
+    notificaciones.publicar('Otra', autor_id=autor_id)
+    db.session.commit()
+    respuesta = client.get(f'/api/auth/notificaciones/stream?token={stream_token}', buffered=False,
+                           headers={'Last-Event-ID': id})
+    perdida, _ = _eventos((t.decode() for t in respuesta.response), 2)
+    assert perdida[0] == 'notificacion' and perdida[1]['mensaje'] == 'Otra' and int(perdida[2]) > int(id)
+    respuesta.close()
+
+
+def test_limite_de_conexiones(app, client, crear_usuario):
+    app.config['SSE_MAX_POR_USUARIO'] = 1
+    _, headers = crear_usuario()
+    abierta = client.get('/api/auth/notificaciones/stream', headers=headers, buffered=False)
+    assert client.get('/api/auth/notificaciones/stream', headers=headers).status_code == 429
+    abierta.close()
+    assert client.get('/api/auth/notificaciones/stream?token=invalido').status_code == 401
+
+
+def test_token_del_stream(app, client, crear_usuario):
+    usuario, headers = crear_usuario()
+    url = '/api/auth/notificaciones/stream'
+    stream_token = client.post(f'{url}/token', headers=headers).get_json()['stream_token']
+
+    # El token de sesión no va en la URL, y el del stream no sirve para el resto de la API
+    assert client.get(url, query_string={'token': headers['Authorization'][7:]}).status_code == 401
+    assert client.get('/api/auth/me', headers={'Authorization': f'Bearer {stream_token}'}).status_code == 401
+
+    vencido = generate_stream_token(usuario, -1)
+    assert client.get(url, query_string={'token': vencido}).status_code == 401
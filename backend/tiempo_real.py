@@ -0,0 +1,267 @@
+import json
+import logging
+import queue
+import threading
+import time
+from flask import current_app, has_app_context, request, stream_with_context
+from sqlalchemy import event
+from models import db, Usuario, Notificacion, NotificacionCursor, NotificacionLeida
+import notificaciones
+
+try:
+    import redis
+except ImportError:  # opcional: solo para SSE_BACKEND=redis
+    redis = None
+
+# Notificaciones en vivo por Server-Sent Events (en lugar de sondear
+# GET /api/auth/notificaciones).
+#
+# Al confirmar una transacción que crea notificaciones o marca lecturas se
+# publica un mensaje en el bus; cada conexión abierta tiene su cola y el
+# generador de la respuesta envía 'notificacion' y 'no_leidas'. El id de cada
+# evento es el de la notificación: al reconectar, EventSource manda
+# Last-Event-ID y se reenvía lo que se perdió.
+#
+# El bus 'local' solo llega a las conexiones del mismo proceso; con varios
+# workers (o con worker.py publicando) hace falta SSE_BACKEND=redis.
+#
+# Cada conexión ocupa un hilo con el worker gthread: SSE_MAX_CONEXIONES lo
+# acota por proceso. Con GUNICORN_WORKER_CLASS=gevent el límite puede ser alto.
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'webcomunitaria:sse'
+
+
+class DemasiadasConexiones(Exception):
+    """Se alcanzó SSE_MAX_POR_USUARIO (por_usuario=True) o SSE_MAX_CONEXIONES"""
+
+    def __init__(self, por_usuario):
+        super().__init__()
+        self.por_usuario = por_usuario
+
+
+class Suscripcion:
+    def __init__(self, usuario_id, tamano_cola):
+        self.usuario_id = usuario_id
+        self.cola = queue.Queue(tamano_cola)
+        self.desbordada = False   # cliente lento: se cierra y reconecta con Last-Event-ID
+
+
+# ─── BUS ─────────────────────────────────────────────────────────────────────
+
+class BusLocal:
+    """Pub/sub dentro del proceso"""
+
+    def __init__(self, max_por_usuario, max_conexiones, tamano_cola=100):
+        self.max_por_usuario = max_por_usuario
+        self.max_conexiones = max_conexiones
+        self.tamano_cola = tamano_cola
+        self._suscripciones = {}   # usuario_id -> set de Suscripcion
+        self._lock = threading.Lock()
+        self._stats = {'publicados': 0, 'entregados': 0, 'desbordadas': 0, 'rechazadas': 0}
+
+    def suscribir(self, usuario_id):
+        with self._lock:
+            propias = self._suscripciones.setdefault(usuario_id, set())
+            if len(propias) >= self.max_por_usuario or self.conexiones() >= self.max_conexiones:
+                self._stats['rechazadas'] += 1
+                if not propias:
+                    del self._suscripciones[usuario_id]
+                raise DemasiadasConexiones(por_usuario=len(propias) >= self.max_por_usuario)
+            suscripcion = Suscripcion(usuario_id, self.tamano_cola)
+            propias.add(suscripcion)
+            return suscripcion
+
+    def cancelar(self, suscripcion):
+        with self._lock:
+            propias = self._suscripciones.get(suscripcion.usuario_id, set())
+            propias.discard(suscripcion)
+            if not propias:
+                self._suscripciones.pop(suscripcion.usuario_id, None)
+
+    def conexiones(self):
+        return sum(len(s) for s in self._suscripciones.values())
+
+    def publicar(self, mensaje):
+        self._entregar(mensaje)
+
+    def _entregar(self, mensaje):
+        """mensaje['usuario_id'] None = difusión a todas las conexiones"""
+        with self._lock:
+            self._stats['publicados'] += 1
+            if mensaje.get('usuario_id') is None:
+                destinos = [s for propias in self._suscripciones.values() for s in propias]
+            else:
+                destinos = list(self._suscripciones.get(mensaje['usuario_id'], ()))
+            for suscripcion in destinos:
+                try:
+                    suscripcion.cola.put_nowait(mensaje)
+                    self._stats['entregados'] += 1
+                except queue.Full:
+                    if not suscripcion.desbordada:
+                        suscripcion.desbordada = True
+                        self._stats['desbordadas'] += 1
+
+    def estadisticas(self):
+        with self._lock:
+            return {**self._stats, 'conexiones': self.conexiones(), 'usuarios': len(self._suscripciones),
+                    'max_conexiones': self.max_conexiones, 'max_por_usuario': self.max_por_usuario,
+                    'backend': 'local'}
+
+
+class BusRedis(BusLocal):
+    """Publica en un canal de redis; un hilo por proceso reparte a sus conexiones"""
+
+    def __init__(self, url, *args, **kwargs):
+        if redis is None:
+            raise RuntimeError('SSE_BACKEND=redis requiere instalar el paquete redis')
+        super().__init__(*args, **kwargs)
+        self.cliente = redis.Redis.from_url(url, decode_responses=True)
+        self._hilo = None
+
+    def suscribir(self, usuario_id):
+        if self._hilo is None:
+            with self._lock:
+                if self._hilo is None:
+                    self._hilo = threading.Thread(target=self._escuchar, name='sse-redis', daemon=True)
+                    self._hilo.start()
+        return super().suscribir(usuario_id)
+
+    def publicar(self, mensaje):
+        self.cliente.publish(CANAL, json.dumps(mensaje))
+
+    def _escuchar(self):
+        while True:
+            try:
+                pubsub = self.cliente.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CANAL)
+                for recibido in pubsub.listen():
+                    self._entregar(json.loads(recibido['data']))
+            except Exception:
+                logger.exception('Se perdió la suscripción a redis; reintentando')
+                time.sleep(1)
+
+    def estadisticas(self):
+        return {**super().estadisticas(), 'backend': 'redis'}
+
+
+def crear_bus(config):
+    opciones = (config['SSE_MAX_POR_USUARIO'], config['SSE_MAX_CONEXIONES'])
+    if config['SSE_BACKEND'] == 'local':
+        return BusLocal(*opciones)
+    if config['SSE_BACKEND'] == 'redis':
+        return BusRedis(config['SSE_REDIS_URL'], *opciones)
+    raise ValueError(f"SSE_BACKEND desconocido: {config['SSE_BACKEND']}")
+
+
+def obtener_bus():
+    extensiones = current_app.extensions
+    if 'sse' not in extensiones:
+        extensiones['sse'] = crear_bus(current_app.config)
+    return extensiones['sse']
+
+
+# ─── PUBLICACIÓN AL CONFIRMAR ────────────────────────────────────────────────
+
+@event.listens_for(db.session, 'after_flush')
+def _registrar_mensajes(sesion, contexto):
+    mensajes = sesion.info.setdefault('sse_mensajes', [])
+    for obj in list(sesion.new) + list(sesion.dirty):
+        if isinstance(obj, Notificacion) and obj in sesion.new:
+            mensajes.append({'tipo': 'notificacion', 'id': obj.id, 'usuario_id': obj.usuario_id,
+                             'autor_id': obj.autor_id, 'datos': obj.to_dict()})
+        elif isinstance(obj, (NotificacionLeida, NotificacionCursor)):
+            mensajes.append({'tipo': 'leidas', 'usuario_id': obj.usuario_id})
+
+
+@event.listens_for(db.session, 'after_commit')
+def _publicar_tras_commit(sesion):
+    mensajes = sesion.info.pop('sse_mensajes', None)
+    if not mensajes or not has_app_context():
+        return
+    bus = obtener_bus()
+    for mensaje in mensajes:
+        try:
+            bus.publicar(mensaje)
+        except Exception:
+            logger.exception('No se pudo publicar el evento SSE')   # los clientes se ponen al día al reconectar
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _descartar_mensajes(sesion):
+    sesion.info.pop('sse_mensajes', None)
+
+
+# ─── STREAM ──────────────────────────────────────────────────────────────────
+
+def _evento(tipo, datos, id=None):
+    linea_id = f'id: {id}\n' if id is not None else ''
+    return f'{linea_id}event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n'
+
+
+def _no_leidas(usuario):
+    try:
+        return _evento('no_leidas', {'no_leidas': notificaciones.no_leidas(usuario)})
+    finally:
+        db.session.close()   # la conexión vuelve al pool mientras se espera
+
+
+def _perdidas(usuario, ultimo_id, limite=50):
+    """Notificaciones posteriores a Last-Event-ID (las más viejas primero)"""
+    try:
+        notifs = notificaciones.visibles(usuario).filter(Notificacion.id > ultimo_id) \
+            .order_by(Notificacion.id.desc()).limit(limite).all()
+        return [_evento('notificacion', n.to_dict(usuario_id=usuario.id), id=n.id) for n in reversed(notifs)]
+    finally:
+        db.session.close()
+
+
+def _le_corresponde(mensaje, usuario):
+    if mensaje['usuario_id'] is not None:
+        return mensaje['usuario_id'] == usuario.id
+    return mensaje['autor_id'] != usuario.id
+
+
+def stream(usuario):
+    """Respuesta text/event-stream para el usuario (DemasiadasConexiones si no hay lugar)"""
+    config = current_app.config
+    ultimo_id = request.headers.get('Last-Event-ID') or request.args.get('ultimo_id')
+    ultimo_id = int(ultimo_id) if ultimo_id and ultimo_id.isdigit() else None
+    bus = obtener_bus()
+    suscripcion = bus.suscribir(usuario.id)
+    # Copia sin sesión con lo que usa notificaciones.visibles(); la conexión vuelve al pool
+    usuario = Usuario(id=usuario.id, fecha_registro=usuario.fecha_registro)
+    db.session.close()
+
+    def generar():
+        try:
+            yield f"retry: {config['SSE_REINTENTO_MS']}\n\n"
+            if ultimo_id is not None:
+                yield from _perdidas(usuario, ultimo_id)
+            yield _no_leidas(usuario)
+
+            fin = time.monotonic() + config['SSE_DURACION_MAX']
+            while time.monotonic() < fin and not suscripcion.desbordada:
+                try:
+                    mensajes = [suscripcion.cola.get(timeout=config['SSE_HEARTBEAT'])]
+                except queue.Empty:
+                    yield ': ping\n\n'
+                    continue
+                while not suscripcion.cola.empty():   # una ráfaga = un solo conteo
+                    mensajes.append(suscripcion.cola.get_nowait())
+
+                propios = [m for m in mensajes if _le_corresponde(m, usuario)]
+                for mensaje in propios:
+                    if mensaje['tipo'] == 'notificacion':
+                        datos = {**mensaje['datos'], 'usuario_id': usuario.id}
+                        yield _evento('notificacion', datos, id=mensaje['id'])
+                if propios:
+                    yield _no_leidas(usuario)
+        finally:
+            bus.cancelar(suscripcion)
+
+    return current_app.response_class(stream_with_context(generar()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',   # nginx: no acumular la respuesta
+    })
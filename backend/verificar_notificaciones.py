@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Verificar los contadores de notificaciones no leídas contra el conteo exacto
+Ejecutar: python verificar_notificaciones.py [--reparar]
+"""
+import sys
+import argparse
+
+from app import create_app
+from notificaciones import verificar_no_leidas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verificar/reparar los contadores de no leídas')
+    parser.add_argument('--reparar', action='store_true', help='Corregir los contadores con diferencias')
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        diferencias = verificar_no_leidas(reparar=args.reparar)
+
+    if not diferencias:
+        print("✅ Los contadores de notificaciones están al día")
+        return True
+
+    for d in diferencias:
+        print(f"⚠️  Usuario {d['usuario_id']}: contador={d['actual']} real={d['esperado']}")
+
+    if args.reparar:
+        print(f"✅ Se repararon {len(diferencias)} contadores")
+        return True
+
+    print(f"❌ {len(diferencias)} contadores con diferencias (usa --reparar)")
+    return False
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
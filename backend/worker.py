@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Trabajador de tareas en segundo plano, separado de gunicorn
+Ejecutar: TAREAS_MODO=externo python worker.py [--hilos N] [--una-vez]
+(con TAREAS_MODO=externo el proceso web solo encola)
+"""
+import sys
+import signal
+import argparse
+
+from app import create_app
+from tareas import PoolTrabajadores, procesar_pendientes, rescatar_atascadas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Procesar la cola de tareas')
+    parser.add_argument('--hilos', type=int, default=None, help='Hilos trabajadores (default: TAREAS_HILOS)')
+    parser.add_argument('--intervalo', type=float, default=None, help='Segundos entre sondeos de la cola')
+    parser.add_argument('--una-vez', action='store_true', help='Vaciar la cola y terminar')
+    args = parser.parse_args()
+
+    app = create_app()
+
+    if args.una_vez:
+        with app.app_context():
+            rescatar_atascadas()
+            ejecutadas = procesar_pendientes()
+        print(f"✅ Se ejecutaron {ejecutadas} tareas")
+        return True
+
+    pool = PoolTrabajadores(app, hilos=args.hilos or max(app.config['TAREAS_HILOS'], 1),
+                            intervalo=args.intervalo)
+    signal.signal(signal.SIGTERM, lambda *_: pool.detener.set())
+
+    print(f"🔧 Procesando tareas con {pool.hilos} hilos (Ctrl+C para terminar)...")
+    pool.iniciar()
+    try:
+        while not pool.detener.wait(1):
+            pass
+    except KeyboardInterrupt:
+        pass
+
+    print("⏹  Esperando a que terminen las tareas en curso...")
+    pool.parar()
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)